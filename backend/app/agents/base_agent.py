@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
-from app.services.llm_service import LLMService
+from app.services.llm_service import LLMService, MODEL_NAMES
+from app.utils.prompt_builder import PromptBuilder
 from app.mcp.server import WizAIMCPServer
 from loguru import logger
 
@@ -43,6 +44,11 @@ def define_tools(self) -> List[Any]:
     async def execute(self, task: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute agent's primary task"""
         pass
+    def prompt_builder(self, task_type: str, max_tokens: int = 1000) -> PromptBuilder:
+        """Prompt builder budgeted for the model ``task_type`` is currently routed to"""
+        model = MODEL_NAMES[self.llm_service.route_model(task_type)]
+        return PromptBuilder(model, reserve_output=max_tokens)
+    
     def create_system_prompt(self) -> str:
         """Generate system prompt for agent"""
         return f"""
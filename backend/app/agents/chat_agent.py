@@ -1,6 +1,7 @@
 from app.agents.base_agent import BaseAgent
 from langchain.tools import Tool
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Tuple
+from app.utils.prompt_builder import BuiltPrompt
 
 class ChatAgent(BaseAgent):
     def __init__(self):
@@ -25,40 +26,108 @@ def define_tools(self) -> List[Tool]:
         ]
     async def execute(self, task: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Process conversational query with full context"""
-        user_id = context.get("user_id")
-        user_message = context.get("message")
-        chat_history = context.get("chat_history", [])
-        
-        # Retrieve relevant context via MCP
-        relevant_context = await self.mcp_server.search_context(user_id, user_message)
+        chat_prompt, relevant_context = await self._build_prompt(context)
         
-        chat_prompt = f"""
-        {self.create_system_prompt()}
-        
-        User Context (from RAG):
-        {relevant_context}
-        
-        Conversation History:
-        {self._format_chat_history(chat_history)}
-        
-        User Message: {user_message}
+        llm_call: Dict[str, Any] = {}
+        response = await self.llm_service.generate(
+            chat_prompt.text,
+            hedge=True,
+            task_type="quick_chat",
+            agent=self.name,
+            user_id=context.get("user_id"),
+            trace=llm_call
+        )
         
-        Provide a helpful, context-aware response. If the user wants to modify their schedule or tasks, use the available tools to make changes.
+        return {
+            "success": True,
+            "response": response,
+            "agent": self.name,
+            "context_used": chat_prompt.sections["context"]["items"],
+            "prompt_tokens": chat_prompt.token_count,
+            "retrieved_docs": self._retrieved_docs(relevant_context),
+            "llm_call": llm_call
+        }
+
+    async def execute_stream(self, task: str, context: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming ``execute``: yields a "context" event once retrieval is
+        done, a "token" event per response chunk and a final "done" event
+        carrying the full response
         """
+        chat_prompt, relevant_context = await self._build_prompt(context)
+        yield {"type": "context", "context_used": chat_prompt.sections["context"]["items"]}
         
-        response = await self.llm_service.generate(chat_prompt)
+        parts = []
+        llm_call: Dict[str, Any] = {}
+        chunks = self.llm_service.stream(
+            chat_prompt.text,
+            task_type="quick_chat",
+            agent=self.name,
+            user_id=context.get("user_id"),
+            trace=llm_call
+        )
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield {"type": "token", "text": chunk}
         
-        return {
+        yield {
+            "type": "done",
             "success": True,
-            "response": response,
+            "response": "".join(parts),
             "agent": self.name,
-            "context_used": len(relevant_context.get("results", []))
+            "context_used": chat_prompt.sections["context"]["items"],
+            "prompt_tokens": chat_prompt.token_count,
+            "retrieved_docs": self._retrieved_docs(relevant_context),
+            "llm_call": llm_call
         }
-    def _format_chat_history(self, history: List[Dict]) -> str:
-        formatted = []
-        for msg in history[-5:]:  # Last 5 messages
-            formatted.append(f"{msg['role']}: {msg['content']}")
-        return "\n".join(formatted)
+
+    async def _build_prompt(self, context: Dict[str, Any]) -> Tuple[BuiltPrompt, Dict[str, Any]]:
+        """
+        Retrieve relevant context and assemble the chat prompt within the
+        model's token budget: retrieved passages are dropped least relevant
+        first and history oldest first; the user message is always kept
+        """
+        user_id = context.get("user_id")
+        user_message = context.get("message")
+        chat_history = context.get("chat_history", [])
+        
+        # Retrieve relevant context via MCP (results come ranked best first)
+        relevant_context = await self.mcp_server.search_context(user_id, user_message)
+        
+        chat_prompt = (
+            self.prompt_builder("quick_chat")
+            .add("system", self.create_system_prompt())
+            .add(
+                "context",
+                items=[f"- {result['text']}" for result in relevant_context.get("results", [])],
+                strategy="relevance",
+                weight=2,
+                template="User Context (from RAG):\n{content}"
+            )
+            .add(
+                "history",
+                items=self._format_chat_history(chat_history),
+                strategy="recency",
+                template="Conversation History:\n{content}"
+            )
+            .add("input", f"User Message: {user_message}")
+            .add(
+                "instructions",
+                "Provide a helpful, context-aware response. If the user wants to modify their schedule or tasks, use the available tools to make changes."
+            )
+            .build()
+        )
+        return chat_prompt, relevant_context
+
+    @staticmethod
+    def _retrieved_docs(relevant_context: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [
+            {"id": result.get("id"), "distance": result.get("distance")}
+            for result in relevant_context.get("results", [])
+        ]
+
+    def _format_chat_history(self, history: List[Dict]) -> List[str]:
+        return [f"{msg['role']}: {msg['content']}" for msg in history]
     
     def _modify_schedule(self, modification: str) -> str:
         """Tool for schedule modifications"""
@@ -2,6 +2,8 @@
 from langchain.tools import Tool
 from typing import List, Dict, Any
 import json
+from app.utils.chunking import TextChunker
+from app.utils.prompt_builder import deadline_relevance
 class ExtractionAgent(BaseAgent):
     def __init__(self):
         super().__init__(
@@ -27,35 +29,51 @@ async def execute(self, task: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Extract structured information from documents"""
         document_text = context.get("document_text", "")
         
-        extraction_prompt = f"""
-        {self.create_system_prompt()}
-        
+        # Long documents keep the chunks most likely to hold assignments and
+        # dates (in document order) rather than only their beginning
+        chunks = TextChunker.chunk_by_sentences(document_text)
+        extraction_prompt = (
+            self.prompt_builder("extraction")
+            .add("system", self.create_system_prompt())
+            .add("instructions", """
         Extract all assignments, deadlines, and events from this document.
         Use chain-of-thought reasoning:
         
         1. Identify key phrases indicating assignments
         2. Extract associated deadlines and dates
         3. Determine course/subject information
-        4. Structure the information clearly
-        
-        Document:
-        {document_text}
-        
-        Return JSON with:
-        {{
-            "assignments": [{{"title": "", "deadline": "YYYY-MM-DD", "course": "", "priority": ""}}],
-            "events": [{{"title": "", "date": "YYYY-MM-DD", "time": "", "location": ""}}],
+        4. Structure the information clearly""")
+            .add(
+                "input",
+                items=chunks,
+                strategy="relevance",
+                scores=[deadline_relevance(chunk) for chunk in chunks],
+                template="Document:\n{content}",
+                keep_order=True
+            )
+            .add("format", """Return JSON with:
+        {
+            "assignments": [{"title": "", "deadline": "YYYY-MM-DD", "course": "", "priority": ""}],
+            "events": [{"title": "", "date": "YYYY-MM-DD", "time": "", "location": ""}],
             "confidence": 0-1
-        }}
-        """
-        response = await self.llm_service.generate(extraction_prompt)
+        }""")
+            .build()
+        )
+        response = await self.llm_service.generate(
+            extraction_prompt.text,
+            hedge=True,
+            task_type="extraction",
+            agent=self.name,
+            user_id=context.get("user_id")
+        )
         
         try:
             extracted_data = json.loads(response)
             return {
                 "success": True,
                 "data": extracted_data,
-                "agent": self.name
+                "agent": self.name,
+                "prompt_tokens": extraction_prompt.token_count
             }
         except json.JSONDecodeError:
             return {"success": False, "error": "Failed to parse extraction", "raw_response": response}
@@ -2,6 +2,7 @@
 from langchain.tools import Tool
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
+import json
 
 class PlannerAgent(BaseAgent):
     def __init__(self):
@@ -38,9 +39,13 @@ async def execute(self, task: str, context: Dict[str, Any]) -> Dict[str, Any]:
         tasks_data = await self.mcp_server.get_user_tasks(user_id, "pending")
         calendar_data = await self.mcp_server.get_calendar_events(user_id, target_date)
         
-        planning_prompt = f"""
-        {self.create_system_prompt()}
+        tasks = tasks_data.get("tasks", [])
+        events = calendar_data.get("events", [])
         
+        planning_prompt = (
+            self.prompt_builder("planning")
+            .add("system", self.create_system_prompt())
+            .add("instructions", f"""
         Create an optimal schedule for {target_date}.
         
         Use chain-of-thought reasoning:
@@ -52,13 +57,25 @@ async def execute(self, task: str, context: Dict[str, Any]) -> Dict[str, Any]:
            - Estimated duration
            - Optimal focus times
            - Regular breaks (every 90 minutes)
-        5. Detect and resolve conflicts
-        
-        Tasks: {tasks_data}
-        Calendar Events: {calendar_data}
-        User Preferences: {user_prefs}
-        
-        Return JSON:
+        5. Detect and resolve conflicts""")
+            .add(
+                "tasks",
+                items=[json.dumps(t, default=str) for t in tasks],
+                strategy="relevance",
+                scores=[self._urgency(t) for t in tasks],
+                weight=2,
+                template="Tasks:\n{content}",
+                keep_order=True
+            )
+            .add(
+                "calendar",
+                items=[json.dumps(e, default=str) for e in events],
+                strategy="relevance",
+                template="Calendar Events:\n{content}",
+                keep_order=True
+            )
+            .add("preferences", f"User Preferences: {json.dumps(user_prefs, default=str)}")
+            .add("format", f"""Return JSON:
         {{
             "date": "{target_date}",
             "schedule": [
@@ -67,17 +84,32 @@ async def execute(self, task: str, context: Dict[str, Any]) -> Dict[str, Any]:
             "conflicts": [],
             "reasoning": "Explain your scheduling decisions",
             "productivity_score": 0-100
-        }}
-        """
+        }}""")
+            .build()
+        )
         
-        response = await self.llm_service.generate(planning_prompt, temperature=0.3)
+        response = await self.llm_service.generate(
+            planning_prompt.text,
+            temperature=0.3,
+            task_type="planning",
+            agent=self.name,
+            user_id=user_id
+        )
         
         return {
             "success": True,
             "plan": json.loads(response),
-            "agent": self.name
+            "agent": self.name,
+            "prompt_tokens": planning_prompt.token_count
         }
     
+    def _urgency(self, task: Dict) -> float:
+        """Prompt relevance of a task: closest deadlines first, undated tasks last"""
+        try:
+            return float(self._calculate_priority(task))
+        except (KeyError, TypeError, ValueError):
+            return 0.0
+    
     def _calculate_priority(self, task: Dict) -> int:
         """Calculate priority score"""
         deadline = datetime.fromisoformat(task['deadline'])
@@ -45,10 +45,78 @@ class Settings(BaseSettings):
 
     # Paths & Config
     CHROMA_PERSIST_DIRECTORY: str = "./chroma_db"
+    EMBEDDING_MODEL_NAME: str = "all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "torch"  # torch, onnx, onnx-int8 (onnx needs onnxruntime, tokenizers, huggingface_hub)
+    EMBEDDING_ONNX_INT8_FILE: str = "onnx/model_quint8_avx2.onnx"
+    EMBEDDING_BATCH_SIZE: int = 64
+    EMBEDDING_BATCHER_MAX_BATCH_SIZE: int = 64
+    EMBEDDING_BATCHER_MAX_WAIT_MS: float = 5.0
+    EMBEDDING_CACHE_SIZE: int = 10000
+    EMBEDDING_CACHE_DISK_SIZE: int = 200000  # vectors kept on disk, least recently used evicted
+    EMBEDDING_CACHE_PATH: str = "./chroma_db/embedding_cache.sqlite3"
+    QUERY_CACHE_SIZE: int = 1000
+    QUERY_CACHE_TTL_SECONDS: int = 300
+    RECENT_CONTEXT_TTL_SECONDS: int = 60
+    RAG_WARM_START: bool = True
+    DOCUMENT_CHUNK_SIZE: int = 500  # characters per stored chunk
+    VECTOR_STORE_BACKEND: str = "chroma"  # chroma, numpy, pgvector
+    EMBEDDING_DIMENSION: int = 384  # pgvector column size, must match the model
+    RAG_SHARDING: str = "none"  # none, user, bucket (chroma only)
+    RAG_SHARD_BUCKETS: int = 64
+    RAG_RETENTION_TASK_DAYS: int = 14  # completed or cancelled tasks; open ones are kept
+    RAG_RETENTION_PLAN_DAYS: int = 30
+    RAG_RETENTION_DOCUMENT_DAYS: int = 180
+    RAG_SYNC_STATE_PATH: str = "./chroma_db/rag_sync_state.json"
+    RAG_SYNC_OVERLAP_SECONDS: int = 300  # incremental sync re-checks rows this far before the last run
     GOOGLE_CALENDAR_CREDENTIALS: str = "./credentials.json"
     GOOGLE_CALENDAR_TOKEN: str = "./token.json"
     N8N_WEBHOOK_URL: str = "https://your-n8n-instance.com/webhook/wizai"
-    RATE_LIMIT_PER_MINUTE: int = 60
+    RATE_LIMIT_PER_MINUTE: int = 60  # LLM requests per provider per worker (0 = unlimited)
+    LLM_TOKENS_PER_MINUTE_GEMINI: int = 1000000  # prompt + completion tokens (0 = unlimited)
+    LLM_TOKENS_PER_MINUTE_OPENAI: int = 200000
+    LLM_RATE_LIMIT_MAX_WAIT_SECONDS: float = 10  # longer queues fall back to the other provider
+    LLM_RATE_LIMIT_BURST_SECONDS: float = 10  # seconds of quota that may be spent at once
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 60.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_MAX_CONCURRENCY_GEMINI: int = 16  # in-flight requests per worker
+    LLM_MAX_CONCURRENCY_OPENAI: int = 16
+    OPENAI_MAX_CONNECTIONS: int = 32
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 16
+    LLM_DEADLINE_SECONDS: float = 45.0  # overall budget of one generate() call
+    LLM_ATTEMPT_DEADLINE_SHARE: float = 0.5  # of the time left, given to the preferred provider before falling back
+    LLM_HEDGING_ENABLED: bool = False  # default for generate(); chat and extraction opt in
+    LLM_HEDGE_PERCENTILE: float = 95
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 4.0  # until enough latencies are observed
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 0.5
+    LLM_HEDGE_MAX_DELAY_SECONDS: float = 15.0
+    LLM_LATENCY_WINDOW: int = 200
+    LLM_HEALTH_WINDOW_SECONDS: float = 60
+    LLM_BREAKER_ERROR_RATE: float = 0.5
+    LLM_BREAKER_MIN_CALLS: int = 5
+    LLM_BREAKER_CONSECUTIVE_FAILURES: int = 3
+    LLM_BREAKER_COOLDOWN_SECONDS: float = 30
+    LLM_ROUTING_SWITCH_RATIO: float = 1.5  # other provider must be this much faster on p95
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_SIZE: int = 1000
+    LLM_CACHE_DISK_SIZE: int = 20000
+    LLM_CACHE_TTL_SECONDS: int = 86400
+    LLM_CACHE_PATH: str = "./chroma_db/llm_cache.sqlite3"
+    PROMPT_TOKEN_BUDGET: int = 6000  # prompt tokens per LLM call
+    LLM_TELEMETRY_WINDOW: int = 500  # recent latencies kept per model/agent/endpoint
+    LLM_TELEMETRY_PERSIST: bool = False  # write every call to the llm_calls table
+    LLM_TELEMETRY_FLUSH_SIZE: int = 50
+    # Offline provider for load tests: "" (off), "scripted", "replay" (both serve
+    # every call locally, no API keys needed) or "record" (real calls, saved to the cassette)
+    LOCAL_LLM_MODE: str = ""
+    LOCAL_LLM_LATENCY_MEDIAN_SECONDS: float = 0.8
+    LOCAL_LLM_LATENCY_P95_SECONDS: float = 2.5
+    LOCAL_LLM_ERROR_RATE: float = 0.0
+    LOCAL_LLM_RATE_LIMIT_RATE: float = 0.0
+    LOCAL_LLM_STREAM_CHUNK_WORDS: int = 3
+    LOCAL_LLM_CASSETTE_PATH: str = "./cassettes/llm.jsonl"
+    LOCAL_LLM_REPLAY_TIMING: bool = False
+    LOCAL_LLM_SEED: int = 0
+    LLM_MAX_CONCURRENCY_LOCAL: int = 64
 
     # Portal credentials
     PORTAL_USERNAME: str = os.getenv("PORTAL_USERNAME", "encrypted_or_env_var")
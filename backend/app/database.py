@@ -1,7 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from backend.app.config import settings
+from app.config import settings
 from loguru import logger
 
 # Create database engine
@@ -84,7 +84,7 @@ def init_db():
     """Initialize database tables"""
     try:
         # Import all models to register them with Base
-        from app.models import User, Task, Plan, Document, ChatHistory
+        from app.models import User, Task, Plan, Document, ChatHistory, LLMCall
         
         logger.info("Creating database tables...")
         Base.metadata.create_all(bind=engine)
@@ -4,19 +4,28 @@
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from loguru import logger
+import asyncio
 import time
 import sys
 
-from backend.app.config import settings, get_cors_origins
-from backend.app.database import check_db_connection, init_db
-from backend.app.services.scheduler import start_scheduler, stop_scheduler
+from app.config import settings, get_cors_origins
+from app.database import check_db_connection, init_db
+from app.services.scheduler import start_scheduler, stop_scheduler
+from app.services.rag_service import (
+    shutdown_rag_service,
+    warm_up_rag_service,
+    get_rag_readiness
+)
+from app.services.llm_service import close_llm_clients, get_llm_metrics
+from app.services.llm_telemetry import set_endpoint, reset_endpoint
 
 # Import routers
-from backend.app.routers import auth
-from backend.app.routers import automation
-from backend.app.routers import document
-from backend.app.routers import tasks
-from backend.app.routers import plans
+from app.routers import auth
+from app.routers import automation
+from app.routers import document
+from app.routers import tasks
+from app.routers import plans
+from app.routers import chat
 
 
 # Configure logging
@@ -65,8 +74,12 @@ async def log_requests(request: Request, call_next):
     # Log request
     logger.info(f"➡️  {request.method} {request.url.path}")
     
-    # Process request
-    response = await call_next(request)
+    # Process request (LLM calls made meanwhile are attributed to this endpoint)
+    endpoint_token = set_endpoint(f"{request.method} {request.url.path}")
+    try:
+        response = await call_next(request)
+    finally:
+        reset_endpoint(endpoint_token)
     
     # Calculate processing time
     process_time = time.time() - start_time
@@ -139,6 +152,12 @@ async def startup_event():
             logger.error(f"❌ Failed to start scheduler: {e}")
 
     
+    # Warm the embedding model and vector store in the background;
+    # /ready reports not-ready until this finishes
+    if settings.RAG_WARM_START:
+        asyncio.create_task(asyncio.to_thread(warm_up_rag_service))
+        logger.info("🔥 RAG warm-up started")
+    
     logger.info("✅ WizAI API started successfully")
 
 
@@ -149,6 +168,10 @@ async def shutdown_event():
     logger.info("👋 Shutting down WizAI API...")
     stop_scheduler()
     logger.info("✅ Background scheduler stopped")
+    shutdown_rag_service()
+    logger.info("✅ RAG service released")
+    await close_llm_clients()
+    logger.info("✅ LLM clients closed")
 
 
 # Health check endpoint
@@ -175,6 +198,29 @@ async def health_check():
     }
 
 
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness probe - not ready until the RAG warm-up has finished"""
+    readiness = get_rag_readiness()
+    
+    if not settings.RAG_WARM_START:
+        return {"status": "ready", "rag": "lazy"}
+    
+    if not readiness["ready"]:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "warming_up", **readiness}
+        )
+    
+    return {"status": "ready", **readiness}
+
+
+@app.get("/metrics/llm", tags=["Health"])
+async def llm_metrics():
+    """LLM cache, coalescing, provider health, rate-limit and per-call telemetry counters"""
+    return get_llm_metrics()
+
+
 # Include routers
 app.include_router(
     auth.router,
@@ -207,7 +253,12 @@ async def health_check():
     tags=["Plans"]
 )
 
-# app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
+app.include_router(
+    chat.router,
+    prefix="/api/chat",
+    tags=["Chat"]
+)
+
 # app.include_router(calendar.router, prefix="/api/calendar", tags=["Calendar"])
 
 
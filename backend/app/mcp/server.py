@@ -1,14 +1,15 @@
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 from typing import Any
-from app.services.rag_service import RAGService
+from app.services.rag_service import get_rag_service
 from app.models.task import Task
 from app.database import SessionLocal
+from app.utils.context import invalidate_recent_context
 
 class WizAIMCPServer:
     def __init__(self):
         self.server = Server("wizai-mcp")
-        self.rag = RAGService()
+        self.rag = get_rag_service()
         self.db = SessionLocal()
         
         # Register tools
@@ -29,8 +30,7 @@ async def get_user_tasks(user_id: int, status: str = "pending") -> dict:
         @self.server.tool()
         async def search_context(user_id: int, query: str) -> dict:
             """Semantic search in user context"""
-            results = self.rag.query(user_id, query, top_k=3)
-            return {"results": results}
+            return await self.search_context(user_id, query)
         @self.server.tool()
         async def update_task_status(task_id: int, new_status: str) -> dict:
             """Update task status"""
@@ -38,6 +38,7 @@ async def update_task_status(task_id: int, new_status: str) -> dict:
             if task:
                 task.status = new_status
                 self.db.commit()
+                invalidate_recent_context(task.user_id)
                 return {"success": True, "task": task.to_dict()}
             return {"success": False, "error": "Task not found"}
         
@@ -48,3 +49,8 @@ async def get_calendar_events(user_id: int, date: str) -> dict:
             cal_service = CalendarService()
             events = await cal_service.get_events_for_date(user_id, date)
             return {"events": events}
+
+    async def search_context(self, user_id: int, query: str) -> dict:
+        """Semantic search in user context (also callable directly by agents)"""
+        results = await self.rag.aquery(user_id, query, top_k=3)
+        return {"results": results}
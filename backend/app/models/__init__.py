@@ -3,5 +3,6 @@
 from app.models.plan import Plan
 from app.models.document import Document
 from app.models.chat_history import ChatHistory
+from app.models.llm_call import LLMCall
 
-__all__ = ["User", "Task", "Plan", "Document", "ChatHistory"]
\ No newline at end of file
+__all__ = ["User", "Task", "Plan", "Document", "ChatHistory", "LLMCall"]
\ No newline at end of file
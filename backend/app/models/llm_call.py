@@ -0,0 +1,55 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+
+class LLMCall(Base):
+    """One LLM generate/stream call (written when LLM_TELEMETRY_PERSIST is on)"""
+    __tablename__ = "llm_calls"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # None for background jobs
+
+    # Where the call came from
+    agent = Column(String, nullable=False)
+    endpoint = Column(String, nullable=False)
+    task_type = Column(String, nullable=True)
+
+    # Who answered
+    provider = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    cache_hit = Column(Boolean, default=False)
+    fallback = Column(Boolean, default=False)  # answered by the non-preferred provider
+    success = Column(Boolean, default=True)
+    error = Column(String, nullable=True)
+
+    # Usage and timing
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    cost_usd = Column(Float, default=0.0)
+    ttfb_ms = Column(Float, nullable=True)
+    latency_ms = Column(Float, nullable=False)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    def to_dict(self):
+        """Convert call record to dictionary"""
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "agent": self.agent,
+            "endpoint": self.endpoint,
+            "task_type": self.task_type,
+            "provider": self.provider,
+            "model": self.model,
+            "cache_hit": self.cache_hit,
+            "fallback": self.fallback,
+            "success": self.success,
+            "error": self.error,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": self.cost_usd,
+            "ttfb_ms": self.ttfb_ms,
+            "latency_ms": self.latency_ms,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
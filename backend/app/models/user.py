@@ -1,5 +1,6 @@
 from sqlalchemy import Column, Integer, String, DateTime, JSON
 from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
 from app.database import Base
 
 class User(Base):
@@ -12,3 +13,9 @@ class User(Base):
     preferences = Column(JSON, default={})  # Study hours, break times, etc.
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    tasks = relationship("Task", back_populates="user")
+    plans = relationship("Plan", back_populates="user")
+    documents = relationship("Document", back_populates="user")
+    chat_history = relationship("ChatHistory", back_populates="user")
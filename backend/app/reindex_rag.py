@@ -0,0 +1,18 @@
+from app.config import settings
+from app.services.rag_service import RAGService
+
+def reindex_rag():
+    """Move stored vectors into the layout selected by RAG_SHARDING"""
+    print(f"Reindexing vector store for sharding mode '{settings.RAG_SHARDING}'...")
+    rag = RAGService(persist_directory=settings.CHROMA_PERSIST_DIRECTORY)
+    try:
+        stats = rag.reindex()
+    finally:
+        rag.close()
+    print(
+        f"✅ Reindex complete: {stats['moved']}/{stats['scanned']} vectors moved, "
+        f"{stats['collections_dropped']} empty collections dropped"
+    )
+
+if __name__ == "__main__":
+    reindex_rag()
@@ -0,0 +1,142 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Any, AsyncIterator, Dict, List, Optional
+from loguru import logger
+import json
+
+from app.database import get_db, SessionLocal
+from app.models.chat_history import ChatHistory
+from app.models.user import User
+from app.schemas.chat import ChatRequest, ChatResponse
+from app.utils.auth import get_current_user
+
+router = APIRouter()
+
+HISTORY_MESSAGES = 20  # ChatAgent keeps the newest of these that fit its token budget
+
+_chat_agent = None
+
+
+def get_chat_agent():
+    """Create the chat agent on first use (it loads the RAG runtime)"""
+    global _chat_agent
+    if _chat_agent is None:
+        from app.agents.chat_agent import ChatAgent
+        _chat_agent = ChatAgent()
+    return _chat_agent
+
+
+def _load_history(db: Session, user_id: int, session_id: Optional[str]) -> List[Dict[str, str]]:
+    """Last few messages of the user's conversation, oldest first"""
+    query = db.query(ChatHistory).filter(ChatHistory.user_id == user_id)
+    if session_id:
+        query = query.filter(ChatHistory.session_id == session_id)
+    messages = query.order_by(ChatHistory.created_at.desc()).limit(HISTORY_MESSAGES).all()
+    return [{"role": m.role, "content": m.content} for m in reversed(messages)]
+
+
+def _context_used(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Retrieved documents, model and token usage of an assistant reply"""
+    llm_call = result.get("llm_call") or {}
+    return {
+        "retrieved_docs": result.get("retrieved_docs", []),
+        "model_used": llm_call.get("model"),
+        "provider": llm_call.get("provider"),
+        "tokens": llm_call.get("prompt_tokens", 0) + llm_call.get("completion_tokens", 0),
+        "prompt_tokens": llm_call.get("prompt_tokens", 0),
+        "completion_tokens": llm_call.get("completion_tokens", 0),
+        "cache_hit": llm_call.get("cache_hit", False),
+        "latency_ms": llm_call.get("latency_ms")
+    }
+
+
+def _save_exchange(db: Session, user_id: int, request: ChatRequest, result: Dict[str, Any]):
+    """Store the user message and the assistant reply"""
+    db.add(ChatHistory(user_id=user_id, role="user", content=request.message, session_id=request.session_id))
+    db.add(ChatHistory(
+        user_id=user_id,
+        role="assistant",
+        content=result["response"],
+        context_used=_context_used(result),
+        agent_name=result["agent"],
+        session_id=request.session_id
+    ))
+    db.commit()
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/", response_model=ChatResponse)
+async def chat(
+    request: ChatRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    context = {
+        "user_id": current_user.id,
+        "message": request.message,
+        "chat_history": _load_history(db, current_user.id, request.session_id)
+    }
+    try:
+        result = await get_chat_agent().execute("chat", context)
+    except Exception as e:
+        logger.error(f"Chat failed for user {current_user.id}: {e}")
+        raise HTTPException(status_code=502, detail="Assistant is unavailable")
+
+    _save_exchange(db, current_user.id, request, result)
+    return ChatResponse(
+        response=result["response"],
+        agent=result["agent"],
+        session_id=request.session_id,
+        context_used=result["context_used"]
+    )
+
+
+@router.post("/stream")
+async def chat_stream(
+    request: ChatRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream the assistant reply as server-sent events
+
+    Emits ``context`` once retrieval is done, a ``token`` event per chunk,
+    then ``done`` with the full reply (or ``error``).
+    """
+    user_id = current_user.id
+    context = {
+        "user_id": user_id,
+        "message": request.message,
+        "chat_history": _load_history(db, user_id, request.session_id)
+    }
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in get_chat_agent().execute_stream("chat", context):
+                event_type = event.pop("type")
+                if event_type == "done":
+                    # The request's session is closed once streaming starts
+                    db_session = SessionLocal()
+                    try:
+                        _save_exchange(db_session, user_id, request, event)
+                    finally:
+                        db_session.close()
+                    # Usage details are kept in the history, not sent to the browser
+                    event.pop("llm_call", None)
+                    event.pop("retrieved_docs", None)
+                    event["session_id"] = request.session_id
+                yield _sse(event_type, event)
+        except Exception as e:
+            logger.error(f"Chat stream failed for user {user_id}: {e}")
+            yield _sse("error", {"detail": "Assistant is unavailable"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
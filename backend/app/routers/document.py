@@ -1,17 +1,40 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from app.services.ocr_service import OCRService
-from app.services.llm_service import LLMService, ModelProvider
+from app.services.llm_service import LLMService, MODEL_NAMES
+from app.services.rag_service import get_rag_service
 from app.schemas.document import DocumentResponse
+from app.models.user import User
+from app.utils.auth import get_current_user
+from app.utils.chunking import TextChunker
+from app.utils.prompt_builder import ChunkSelector, PromptBuilder, deadline_relevance
+from app.config import settings
 import aiofiles  # pyright: ignore[reportMissingModuleSource]
 from pathlib import Path
+from typing import Iterator, Tuple
+import asyncio
+import hashlib
 import uuid
 
 router = APIRouter()
 ocr_service = OCRService()
 llm_service = LLMService()
 
+UPLOAD_READ_SIZE = 1024 * 1024  # Stream uploads to disk 1 MB at a time
+
+
+def _select_chunks(pages: Iterator[Tuple[int, str]], selector: ChunkSelector) -> Iterator[Tuple[int, str]]:
+    """Pass pages through unchanged while offering their chunks to the extraction selector"""
+    for page_number, text in pages:
+        for _, _, chunk in TextChunker.iter_page_chunks([(page_number, text)]):
+            selector.add(chunk)
+        yield page_number, text
+
+
 @router.post("/upload", response_model=DocumentResponse)
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user)
+):
     """Upload and process document (PDF, image, DOCX)"""
     # Validate file type
     allowed_types = ["application/pdf", "image/png", "image/jpeg", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
@@ -23,41 +46,69 @@ async def upload_document(file: UploadFile = File(...)):
     file_path = Path(f"./uploads/{file_id}_{file.filename}")
     file_path.parent.mkdir(exist_ok=True)
     
+    # Hash the contents on the way so the document gets a stable id
+    content_hash = hashlib.sha256()
     async with aiofiles.open(file_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
-    # Extract text based on file type
+        while chunk := await file.read(UPLOAD_READ_SIZE):
+            content_hash.update(chunk)
+            await f.write(chunk)
+    # Extract text page by page and stream it into the vector store
     try:
-        if file.content_type == "application/pdf":
-            text = ocr_service.extract_from_pdf(str(file_path))
-        elif file.content_type in ["image/png", "image/jpeg"]:
-            text = ocr_service.extract_from_image(str(file_path))
-        else:
-            text = ocr_service.extract_from_docx(str(file_path))
+        model = MODEL_NAMES[llm_service.route_model("extraction")]
+        selector = ChunkSelector(settings.PROMPT_TOKEN_BUDGET, model)
+        pages = _select_chunks(
+            ocr_service.iter_pages(str(file_path), file.content_type),
+            selector
+        )
+        ingestion = await asyncio.to_thread(
+            get_rag_service().ingest_document,
+            current_user.id,
+            content_hash.hexdigest(),
+            file.filename,
+            pages
+        )
+        chunks = selector.selected()
         
         # Use LLM to extract structured info
-        extraction_prompt = f"""
+        extraction_prompt = (
+            PromptBuilder(model, reserve_output=1000)
+            .add("instructions", """
         Extract assignments, deadlines, and events from this text.
         Return JSON with format:
-        {{
+        {
             "assignments": [
-                {{"title": "...", "deadline": "YYYY-MM-DD", "course": "...", "description": "..."}}
+                {"title": "...", "deadline": "YYYY-MM-DD", "course": "...", "description": "..."}
             ],
             "events": [
-                {{"title": "...", "date": "YYYY-MM-DD", "time": "HH:MM", "location": "..."}}
+                {"title": "...", "date": "YYYY-MM-DD", "time": "HH:MM", "location": "..."}
             ]
-        }}
-Text:
-        {text[:4000]}  # Truncate for token limits
-        """
+        }""")
+            .add(
+                "input",
+                items=chunks,
+                strategy="relevance",
+                scores=[deadline_relevance(chunk) for chunk in chunks],
+                template="Text:\n{content}",
+                keep_order=True
+            )
+            .build()
+        )
+        text = "\n".join(chunks)
         
-        structured_data = await llm_service.generate(extraction_prompt, model_preference=ModelProvider.GEMINI)
+        structured_data = await llm_service.generate(
+            extraction_prompt.text,
+            hedge=True,
+            task_type="extraction",
+            agent="document_upload",
+            user_id=current_user.id
+        )
         
         return {
             "document_id": file_id,
             "filename": file.filename,
             "extracted_text": text[:500],  # Preview
-            "structured_data": structured_data
+            "structured_data": structured_data,
+            "chunks_indexed": ingestion["chunks"]
         }
     except Exception as e:
         raise HTTPException(500, f"Processing failed: {str(e)}")
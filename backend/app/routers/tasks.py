@@ -7,13 +7,12 @@
 from app.models.user import User
 from app.schemas.task import TaskCreate, TaskResponse
 from app.utils.auth import get_current_user
-from app.services.rag_service import RAGService
+from app.services.rag_service import get_rag_service
 from app.routers.automation import trigger_n8n_workflow
+from app.utils.context import invalidate_recent_context
 
 router = APIRouter()
 
-rag_service = RAGService()
-
 @router.post("/", response_model=TaskResponse)
 async def create_task(
     task: TaskCreate,
@@ -24,9 +23,11 @@ async def create_task(
     db_task = Task(**task.dict(), user_id=current_user.id)
     db.add(db_task)
     db.commit()
+    db.refresh(db_task)
     
     # Add to RAG system for context awareness
-    rag_service.add_task_to_context(current_user.id, db_task)
+    await get_rag_service().aadd_task_to_context(current_user.id, db_task.to_dict())
+    invalidate_recent_context(current_user.id)
     
     # Trigger workflow automation (n8n)
     await trigger_n8n_workflow("new_task", {
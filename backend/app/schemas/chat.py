@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class ChatRequest(BaseModel):
+    message: str = Field(..., min_length=1)
+    session_id: Optional[str] = None
+
+
+class ChatResponse(BaseModel):
+    response: str
+    agent: str
+    session_id: Optional[str] = None
+    context_used: int = 0
@@ -7,5 +7,6 @@ class DocumentResponse(BaseModel):
     filename: str
     extracted_text: Optional[str] = None
     structured_data: Optional[Any] = None
+    chunks_indexed: Optional[int] = None
 
 
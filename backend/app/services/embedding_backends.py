@@ -0,0 +1,133 @@
+"""
+Embedding backends for the RAG service
+The PyTorch SentenceTransformer path is the default; the ONNX Runtime
+backends run the same model (optionally int8-quantised) on CPU without
+loading torch at all
+"""
+
+from abc import ABC, abstractmethod
+from typing import List, Optional
+from loguru import logger
+import numpy as np
+
+
+class EmbeddingBackend(ABC):
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Identifier of model + backend, used to key cached embeddings"""
+        pass
+
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        """Encode texts into embedding vectors"""
+        pass
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """PyTorch SentenceTransformer (reference implementation)"""
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        logger.info(f"Loaded SentenceTransformer model {model_name}")
+
+    @property
+    def name(self) -> str:
+        return self.model_name
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        return self.model.encode(texts, batch_size=batch_size).tolist()
+
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """
+    ONNX Runtime export of a sentence-transformers model
+
+    Reproduces the SentenceTransformer pipeline (tokenise, transformer,
+    mean pooling, L2 normalisation) with ``tokenizers`` + ``onnxruntime``.
+    The model files are the ONNX exports published alongside the model on
+    the Hugging Face hub.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        onnx_file: str = "onnx/model.onnx",
+        max_seq_length: int = 256,
+        num_threads: Optional[int] = None
+    ):
+        super().__init__(model_name)
+        import onnxruntime as ort
+        from huggingface_hub import hf_hub_download
+        from tokenizers import Tokenizer
+
+        repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        self.onnx_file = onnx_file
+
+        self.tokenizer = Tokenizer.from_file(hf_hub_download(repo_id, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            hf_hub_download(repo_id, onnx_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        logger.info(f"Loaded ONNX embedding model {repo_id}/{onnx_file}")
+
+    @property
+    def name(self) -> str:
+        return f"{self.model_name}:{self.onnx_file}"
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+            inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self._input_names:
+                inputs["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+            token_embeddings = self.session.run(None, inputs)[0]
+
+            # Mean pooling over real tokens, then L2 normalisation
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.extend(pooled.tolist())
+
+        return vectors
+
+
+def create_embedding_backend(
+    backend: str,
+    model_name: str,
+    onnx_int8_file: str = "onnx/model_quint8_avx2.onnx"
+) -> EmbeddingBackend:
+    """
+    Build the embedding backend selected in settings
+
+    Args:
+        backend: "torch", "onnx" or "onnx-int8"
+        model_name: sentence-transformers model name
+        onnx_int8_file: Quantised ONNX file used by "onnx-int8"
+    """
+    if backend == "torch":
+        return SentenceTransformerBackend(model_name)
+    if backend == "onnx":
+        return OnnxEmbeddingBackend(model_name)
+    if backend == "onnx-int8":
+        return OnnxEmbeddingBackend(model_name, onnx_file=onnx_int8_file)
+    raise ValueError(f"Unknown embedding backend: {backend}")
@@ -0,0 +1,193 @@
+"""
+Content-addressed embedding cache for WizAI
+Keeps recently used vectors in an in-memory LRU backed by a SQLite store
+so identical strings are only ever encoded once per model. The disk level
+has its own lock, so memory lookups never wait behind a SQLite commit, and
+is capped at ``max_disk_entries`` least recently used vectors; last-used
+updates and eviction are batched every ``write_batch`` operations.
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+from threading import Lock
+from loguru import logger
+import numpy as np
+import asyncio
+import hashlib
+import sqlite3
+import time
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = 10000,
+        db_path: Optional[str] = None,
+        max_disk_entries: int = 200000,
+        write_batch: int = 100
+    ):
+        """
+        Args:
+            model_name: Embedding model name, part of every cache key
+            max_entries: Maximum number of vectors kept in memory
+            db_path: SQLite file for the persistent level (None = memory only)
+            max_disk_entries: Maximum number of vectors kept on disk
+            write_batch: Disk hits / written vectors between last_used flushes and evictions
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.write_batch = write_batch
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._db = None
+        self._db_lock = Lock()
+        self._touched: Dict[str, float] = {}
+        self._writes_since_eviction = 0
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL DEFAULT 0)"
+            )
+            # Caches written before eviction existed lack the column
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(embeddings)")}
+            if "last_used" not in columns:
+                self._db.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._evict()
+            self._db.commit()
+
+        logger.info(f"Embedding cache ready ({max_entries} in memory, disk: {db_path or 'disabled'})")
+
+    def _key(self, text: str) -> str:
+        """Hash model name and text into a cache key"""
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up vectors for texts, returning None for every miss"""
+        vectors, disk_lookup = self._memory_get_many(texts)
+        self._disk_get_many(vectors, disk_lookup)
+        return vectors
+
+    async def aget_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Async ``get_many``; memory hits are served inline, the disk lookup runs in a worker thread"""
+        vectors, disk_lookup = self._memory_get_many(texts)
+        if disk_lookup and self._db is not None:
+            await asyncio.to_thread(self._disk_get_many, vectors, disk_lookup)
+        else:
+            self._disk_get_many(vectors, disk_lookup)
+        return vectors
+
+    def _memory_get_many(self, texts: List[str]) -> Tuple[List[Optional[List[float]]], Dict[str, List[int]]]:
+        """Serve texts from the in-memory LRU; returns the vectors and the keys still to look up"""
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        disk_lookup: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = self._key(text)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    vectors[i] = self._memory[key]
+                    self._stats["memory_hits"] += 1
+                else:
+                    disk_lookup.setdefault(key, []).append(i)
+        return vectors, disk_lookup
+
+    def _disk_get_many(self, vectors: List[Optional[List[float]]], disk_lookup: Dict[str, List[int]]):
+        """Fill ``vectors`` from the disk level, promoting hits into memory"""
+        rows = []
+        if disk_lookup:
+            with self._db_lock:
+                if self._db is not None:
+                    placeholders = ",".join("?" * len(disk_lookup))
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                        list(disk_lookup)
+                    ).fetchall()
+                    # Recorded now, written with the next batch
+                    now = time.time()
+                    self._touched.update((key, now) for key, _ in rows)
+                    if len(self._touched) >= self.write_batch:
+                        self._flush_touched()
+                        self._db.commit()
+
+        with self._lock:
+            for key, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                self._remember(key, vector)
+                for i in disk_lookup.pop(key):
+                    vectors[i] = vector
+                    self._stats["disk_hits"] += 1
+            self._stats["misses"] += sum(len(indexes) for indexes in disk_lookup.values())
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        """Store freshly computed vectors in both cache levels"""
+        entries = [(self._key(text), vector) for text, vector in zip(texts, vectors)]
+
+        with self._lock:
+            for key, vector in entries:
+                self._remember(key, vector)
+
+        with self._db_lock:
+            if self._db is not None:
+                now = time.time()
+                self._flush_touched()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in entries]
+                )
+                self._writes_since_eviction += len(entries)
+                if self._writes_since_eviction >= self.write_batch:
+                    self._evict()
+                self._db.commit()
+
+    def _flush_touched(self):
+        """Write pending last_used updates (caller holds the disk lock)"""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        """Drop least recently used vectors beyond the disk cap (caller holds the disk lock)"""
+        self._db.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            "SELECT key FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+        self._writes_since_eviction = 0
+
+    def _remember(self, key: str, vector: List[float]):
+        """Insert into the in-memory LRU, evicting the oldest entries"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current memory footprint"""
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory)
+            }
+
+    def close(self):
+        """Close the on-disk store"""
+        with self._db_lock:
+            if self._db is not None:
+                self._flush_touched()
+                self._db.commit()
+                self._db.close()
+                self._db = None
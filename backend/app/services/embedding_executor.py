@@ -0,0 +1,100 @@
+"""
+Micro-batching embedding executor
+Collects encode requests that arrive within a few milliseconds of each
+other into one batch and runs it on a dedicated worker thread, so model
+inference never blocks the event loop and concurrent requests share a
+forward pass instead of each running a batch of one
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple, Optional
+from loguru import logger
+import asyncio
+
+
+class EmbeddingBatcher:
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0
+    ):
+        """
+        Args:
+            encode_fn: Blocking function encoding a list of texts
+            max_batch_size: Flush as soon as this many texts are queued
+            max_wait_ms: Maximum time the first queued request waits for company
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._pending: List[Tuple[List[str], asyncio.Future]] = []
+        self._pending_texts = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._stats = {"requests": 0, "batches": 0, "texts": 0}
+
+    async def encode(self, texts: List[str]) -> List[List[float]]:
+        """Queue texts for the next batch and wait for their vectors"""
+        if not texts:
+            return []
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((texts, future))
+        self._pending_texts += len(texts)
+        self._stats["requests"] += 1
+
+        if self._pending_texts >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Hand everything queued so far to the worker thread"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending, self._pending_texts = self._pending, [], 0
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[List[str], asyncio.Future]]):
+        """Encode one batch and resolve each caller's future"""
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        self._stats["batches"] += 1
+        self._stats["texts"] += len(texts)
+
+        try:
+            loop = asyncio.get_running_loop()
+            vectors = await loop.run_in_executor(self._executor, self.encode_fn, texts)
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(texts)} texts failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for request_texts, future in batch:
+            if not future.done():
+                future.set_result(vectors[offset:offset + len(request_texts)])
+            offset += len(request_texts)
+
+    def stats(self) -> dict:
+        """Request/batch counters and average batch size"""
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "avg_batch_size": self._stats["texts"] / batches if batches else 0.0
+        }
+
+    def close(self):
+        """Stop the worker thread"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,199 @@
+"""
+Persistent response cache for LLM completions
+Keyed by provider, model, a hash of the normalised prompt, temperature and
+max_tokens. Recent entries live in an in-memory LRU backed by a SQLite
+store, so cached answers survive restarts; both levels are size-bounded
+and every entry expires after a TTL.
+
+Async callers use ``aget``/``aput``, which answer from memory on the event
+loop and run SQLite work in a worker thread. Disk-hit ``last_used`` updates
+and size eviction are batched every ``write_batch`` operations, so the disk
+level may briefly hold up to that many rows over its limit.
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from threading import Lock
+from loguru import logger
+import asyncio
+import hashlib
+import sqlite3
+import time
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_disk_entries: int = 20000,
+        ttl_seconds: float = 86400,
+        db_path: Optional[str] = None,
+        write_batch: int = 100
+    ):
+        """
+        Args:
+            max_entries: Maximum number of responses kept in memory
+            max_disk_entries: Maximum number of responses kept on disk
+            ttl_seconds: Lifetime of a cached response
+            db_path: SQLite file for the persistent level (None = memory only)
+            write_batch: Disk hits / writes between last_used flushes and evictions
+        """
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.write_batch = write_batch
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+        # The disk level has its own lock so memory lookups never wait on SQLite
+        self._db = None
+        self._db_lock = Lock()
+        self._touched: Dict[str, float] = {}
+        self._writes_since_eviction = 0
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._db.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+
+        logger.info(f"LLM response cache ready ({max_entries} in memory, disk: {db_path or 'disabled'})")
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        """Hash provider, model, whitespace-normalised prompt and sampling parameters"""
+        normalised = " ".join(prompt.split())
+        prompt_hash = hashlib.sha256(normalised.encode("utf-8")).hexdigest()
+        return f"{provider}:{model}:{prompt_hash}:{float(temperature):.3f}:{int(max_tokens)}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None if missing or expired"""
+        response = self._memory_get(key)
+        return response if response is not None else self._disk_get(key)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Async ``get``; the disk lookup runs in a worker thread"""
+        response = self._memory_get(key)
+        if response is not None or self._db is None:
+            return response if response is not None else self._disk_get(key)
+        return await asyncio.to_thread(self._disk_get, key)
+
+    def put(self, key: str, response: str):
+        """Store a response in both cache levels, evicting least recently used entries"""
+        now, expires_at = self._memory_put(key, response)
+        self._disk_put(key, response, now, expires_at)
+
+    async def aput(self, key: str, response: str):
+        """Async ``put``; the disk write runs in a worker thread"""
+        now, expires_at = self._memory_put(key, response)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put, key, response, now, expires_at)
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        """Look a key up in the in-memory LRU (expired entries are dropped)"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] >= time.time():
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry[1]
+            self._memory.pop(key, None)
+            return None
+
+    def _memory_put(self, key: str, response: str) -> Tuple[float, float]:
+        """Insert into the in-memory LRU; returns (now, expires_at)"""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, response)
+            self._stats["writes"] += 1
+        return now, expires_at
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        """Look a key up on disk, promoting hits into memory"""
+        now = time.time()
+        row = None
+        with self._db_lock:
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None and row[1] >= now:
+                # Recorded now, written with the next batch
+                self._touched[key] = now
+                if len(self._touched) >= self.write_batch:
+                    self._flush_touched()
+                    self._db.commit()
+            else:
+                row = None
+
+        with self._lock:
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._remember(key, row[1], row[0])
+            self._stats["disk_hits"] += 1
+            return row[0]
+
+    def _disk_put(self, key: str, response: str, now: float, expires_at: float):
+        """Write a response to disk, evicting least recently used rows every ``write_batch`` writes"""
+        with self._db_lock:
+            if self._db is None:
+                return
+            self._flush_touched()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, expires_at, now)
+            )
+            self._writes_since_eviction += 1
+            if self._writes_since_eviction >= self.write_batch:
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,)
+                )
+                self._writes_since_eviction = 0
+            self._db.commit()
+
+    def _flush_touched(self):
+        """Write pending last_used updates (caller holds the disk lock)"""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE responses SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _remember(self, key: str, expires_at: float, response: str):
+        """Insert into the in-memory LRU, evicting the oldest entries"""
+        self._memory[key] = (expires_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current memory footprint"""
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hits": hits,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory)
+            }
+
+    def close(self):
+        """Flush pending updates and close the on-disk store"""
+        with self._db_lock:
+            if self._db is not None:
+                self._flush_touched()
+                self._db.commit()
+                self._db.close()
+                self._db = None
@@ -1,68 +1,766 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
 from enum import Enum
+import asyncio
+import time
 import google.generativeai as genai
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI
 from app.config import settings
+from app.services.llm_cache import LLMResponseCache
+from app.services.local_llm import LocalLLMProvider, SCRIPTED, RECORD, REPLAY
+from app.services.llm_telemetry import LLMTelemetry, current_endpoint, estimate_cost
+from app.services.provider_stats import ProviderStats
+from app.services.rate_limiter import ProviderRateLimiter
+from app.services.single_flight import SingleFlight
+from app.utils.prompt_builder import count_tokens
 from loguru import logger
 
 class ModelProvider(Enum):
     GEMINI = "gemini"
     OPENAI = "openai"
+    LOCAL = "local"  # offline scripted / replayed responses (LOCAL_LLM_MODE)
+
+MODEL_NAMES = {
+    ModelProvider.GEMINI: 'gemini-2.0-flash-exp',
+    ModelProvider.OPENAI: "gpt-4o-mini",
+    ModelProvider.LOCAL: "wizai-local"
+}
+
+class ProviderUnavailableError(Exception):
+    """Raised without calling a provider whose circuit breaker is open"""
+
+# Cancellation message of provider calls abandoned at a deadline (counted as failures)
+TIMED_OUT = "llm call timed out"
 
 class LLMService:
     def __init__(self):
         # Initialize clients
         genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.gemini = genai.GenerativeModel('gemini-2.0-flash-exp')
-        self.openai = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.gemini = genai.GenerativeModel(MODEL_NAMES[ModelProvider.GEMINI])
+        # Load tests run without API keys: no OpenAI client in the offline modes
+        self.openai = None if local_only() else get_openai_client()
+        self.local = get_local_llm()
+        self.cache = get_llm_cache()
         
     async def generate(
         self,
         prompt: str,
-        model_preference: ModelProvider = ModelProvider.GEMINI,
+        model_preference: Optional[ModelProvider] = None,
         temperature: float = 0.7,
         max_tokens: int = 1000,
+        use_cache: bool = True,
+        hedge: Optional[bool] = None,
+        deadline: Optional[float] = None,
+        task_type: Optional[str] = None,
+        agent: Optional[str] = None,
+        user_id: Optional[int] = None,
+        trace: Optional[Dict[str, Any]] = None,
         **kwargs
     ) -> str:
-        """Generate response with intelligent fallback"""
+        """
+        Generate response with intelligent fallback
+
+        Responses are served from / stored in the response cache per provider
+        unless ``use_cache`` is False (e.g. for prompts that must be fresh).
+        With ``hedge`` (default LLM_HEDGING_ENABLED) the fallback provider is
+        started as soon as the preferred one is slower than its usual tail
+        latency instead of after it fails. The whole call is bounded by
+        ``deadline`` seconds (default LLM_DEADLINE_SECONDS) and raises
+        asyncio.TimeoutError when it runs out; without hedging the preferred
+        provider gets LLM_ATTEMPT_DEADLINE_SHARE of it, so a hung provider
+        still leaves time for the fallback.
+
+        Without an explicit ``model_preference`` the provider is picked by
+        ``route_model(task_type)``; providers with an open circuit breaker
+        are skipped without waiting for them to fail. Each provider call
+        first queues for its per-minute request and token quota; a provider
+        whose queue is longer than LLM_RATE_LIMIT_MAX_WAIT_SECONDS is
+        treated as failed and the other one is tried.
+
+        Every call is recorded in the LLM telemetry under ``agent``, the
+        current endpoint and ``user_id``; pass a ``trace`` dict to receive
+        the call's record (provider, model, tokens, latency, ...).
+        """
+        if model_preference is None:
+            model_preference = self.route_model(task_type or "default")
+        fallback = _other(model_preference)
+        hedge = settings.LLM_HEDGING_ENABLED if hedge is None else hedge
+        call = _start_call(model_preference, task_type, agent, user_id)
+        request = (prompt, temperature, max_tokens, use_cache, task_type, call)
+        deadline = deadline or settings.LLM_DEADLINE_SECONDS
+        if hedge:
+            attempt = self._hedged_generate(model_preference, fallback, request)
+        else:
+            attempt = self._fallback_generate(model_preference, fallback, request, time.monotonic() + deadline)
         try:
-            if model_preference == ModelProvider.GEMINI:
-                return await self._gemini_generate(prompt, temperature, max_tokens)
-            else:
-                return await self._openai_generate(prompt, temperature, max_tokens)
+            response = await _within(attempt, deadline)
+        except BaseException as e:
+            _finish_call(call, trace, error=e)
+            raise
+        _finish_call(call, trace)
+        return response
+
+    async def _fallback_generate(
+        self,
+        primary: ModelProvider,
+        secondary: ModelProvider,
+        request: Tuple,
+        deadline_at: float
+    ) -> str:
+        """
+        Try the primary provider, then the secondary once it has failed or
+        used up its share of the time left before ``deadline_at``
+        """
+        remaining = max(0.0, deadline_at - time.monotonic())
+        attempt_timeout = min(remaining * settings.LLM_ATTEMPT_DEADLINE_SHARE, settings.LLM_REQUEST_TIMEOUT_SECONDS)
+        try:
+            return await _within(self._provider_generate(primary, *request), attempt_timeout)
         except Exception as e:
-            logger.error(f"{model_preference.value} failed: {e}, trying fallback")
+            logger.error(f"{primary.value} failed: {e}, trying fallback")
             # Fallback logic
-            if model_preference == ModelProvider.GEMINI:
-                return await self._openai_generate(prompt, temperature, max_tokens)
+            return await self._provider_generate(secondary, *request)
+
+    async def _hedged_generate(
+        self,
+        primary: ModelProvider,
+        secondary: ModelProvider,
+        request: Tuple
+    ) -> str:
+        """
+        Start the secondary provider if the primary has not answered within
+        its hedge delay (or fails earlier); return the first successful
+        answer and cancel the other request
+        """
+        _hedge_stats["hedged_calls"] += 1
+        pending = {asyncio.ensure_future(self._provider_generate(primary, *request))}
+        errors = []
+        cancel_reason = None  # plain cancel: the other request lost the race
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay(primary))
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                errors.append(task.exception())
+                logger.error(f"{primary.value} failed: {task.exception()}, trying fallback")
+
+            if not errors:
+                _hedge_stats["hedges_fired"] += 1
+                logger.info(f"{primary.value} slower than hedge delay, also asking {secondary.value}")
+            secondary_task = asyncio.ensure_future(self._provider_generate(secondary, *request))
+            pending.add(secondary_task)
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary_task and not errors:
+                            _hedge_stats["secondary_wins"] += 1
+                        return task.result()
+                    errors.append(task.exception())
+            raise errors[-1]
+        except asyncio.CancelledError as e:
+            # Pass the deadline on to both requests
+            cancel_reason = e.args[0] if e.args else None
+            raise
+        finally:
+            for task in pending:
+                task.cancel(cancel_reason)
+
+    async def _provider_generate(
+        self,
+        provider: ModelProvider,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        use_cache: bool = True,
+        task_type: Optional[str] = None,
+        call: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Call one provider, going through the response cache
+
+        Identical concurrent calls are coalesced into a single provider
+        request whose result (or error) every caller receives. Outcomes
+        feed the provider's health stats and circuit breaker; the first
+        successful provider fills in the telemetry ``call``.
+        """
+        cache_key = LLMResponseCache.make_key(provider.value, MODEL_NAMES[provider], prompt, temperature, max_tokens)
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                _answered(call, provider, cache_hit=True, usage=(0, 0))
+                return cached
+
+        async def execute() -> Tuple[str, Tuple[int, int]]:
+            limiter = rate_limiter(provider)
+            reserved = count_tokens(prompt, MODEL_NAMES[provider]) + max_tokens
+            await limiter.acquire(reserved)
+
+            health = _provider_stats[provider]
+            if not health.allow_request():
+                limiter.settle(reserved, 0)
+                raise ProviderUnavailableError(f"{provider.value} circuit breaker is open")
+
+            start = time.perf_counter()
+            try:
+                if provider == ModelProvider.GEMINI:
+                    response, usage = await self._gemini_generate(prompt, temperature, max_tokens)
+                elif provider == ModelProvider.OPENAI:
+                    response, usage = await self._openai_generate(prompt, temperature, max_tokens)
+                else:
+                    response, usage = await self._local_generate(prompt, temperature, max_tokens)
+            except asyncio.CancelledError as e:
+                # No completion was received: give back its share of the reservation
+                limiter.settle(reserved, reserved - max_tokens)
+                if e.args and e.args[0] == TIMED_OUT:
+                    # Abandoned at the caller's deadline: the provider hung
+                    health.record_failure()
+                else:
+                    # Lost a hedge, or the client went away
+                    health.record_cancelled()
+                raise
+            except Exception as e:
+                limiter.settle(reserved, reserved - max_tokens)
+                _record_failure(provider, e)
+                raise
+            latency = time.perf_counter() - start
+            health.record_success(latency)
+            if self.local is not None and provider != ModelProvider.LOCAL:
+                self.local.record(provider.value, MODEL_NAMES[provider], prompt, temperature, max_tokens, response, latency)
+            if usage is None:
+                # Provider did not report usage: estimate it
+                usage = (reserved - max_tokens, count_tokens(response or "", MODEL_NAMES[provider]))
+            limiter.settle(reserved, sum(usage))
+            if task_type:
+                _task_latency(provider, task_type).record_success(latency)
+            if use_cache and response:
+                await self.cache.aput(cache_key, response)
+            return response, usage
+
+        response, usage = await _single_flight.do(cache_key, execute)
+        _answered(call, provider, cache_hit=False, usage=usage)
+        return response
+    
+    async def stream(
+        self,
+        prompt: str,
+        model_preference: Optional[ModelProvider] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        use_cache: bool = True,
+        task_type: Optional[str] = None,
+        agent: Optional[str] = None,
+        user_id: Optional[int] = None,
+        trace: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        Yield the response in chunks as the provider produces them
+
+        Falls back to the other provider only if the preferred one fails
+        before emitting anything; a cached response is yielded as a single
+        chunk and a completed stream is written to the cache. Telemetry is
+        recorded as in ``generate``, with the time to the first chunk as TTFB.
+
+        ``deadline`` (default LLM_DEADLINE_SECONDS) bounds the time to the
+        first chunk, of which the preferred provider gets
+        LLM_ATTEMPT_DEADLINE_SHARE, and every gap between chunks; a stalled
+        stream raises asyncio.TimeoutError.
+        """
+        if model_preference is None:
+            model_preference = self.route_model(task_type or "default")
+        fallback = _other(model_preference)
+        call = _start_call(model_preference, task_type, agent, user_id)
+        deadline = deadline or settings.LLM_DEADLINE_SECONDS
+        deadline_at = time.monotonic() + deadline
+        first_timeout = min(deadline * settings.LLM_ATTEMPT_DEADLINE_SHARE, settings.LLM_REQUEST_TIMEOUT_SECONDS)
+        emitted = False
+        try:
+            try:
+                chunks = self._provider_stream(model_preference, prompt, temperature, max_tokens, use_cache, call)
+                async for chunk in _paced(chunks, first_timeout, deadline):
+                    if not emitted:
+                        call["first_byte"] = time.perf_counter()
+                    emitted = True
+                    yield chunk
+            except Exception as e:
+                if emitted:
+                    raise
+                logger.error(f"{model_preference.value} stream failed: {e!r}, trying fallback")
+                chunks = self._provider_stream(fallback, prompt, temperature, max_tokens, use_cache, call)
+                async for chunk in _paced(chunks, max(0.0, deadline_at - time.monotonic()), deadline):
+                    if not emitted:
+                        call["first_byte"] = time.perf_counter()
+                    emitted = True
+                    yield chunk
+        except BaseException as e:
+            _finish_call(call, trace, error=e)
+            raise
+        _finish_call(call, trace)
+
+    async def _provider_stream(
+        self,
+        provider: ModelProvider,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        use_cache: bool = True,
+        call: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Stream from one provider, going through the response cache"""
+        cache_key = None
+        if use_cache and self.cache is not None:
+            cache_key = self.cache.make_key(provider.value, MODEL_NAMES[provider], prompt, temperature, max_tokens)
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                _answered(call, provider, cache_hit=True, usage=(0, 0))
+                yield cached
+                return
+
+        limiter = rate_limiter(provider)
+        reserved = count_tokens(prompt, MODEL_NAMES[provider]) + max_tokens
+        await limiter.acquire(reserved)
+
+        health = _provider_stats[provider]
+        if not health.allow_request():
+            limiter.settle(reserved, 0)
+            raise ProviderUnavailableError(f"{provider.value} circuit breaker is open")
+
+        if provider == ModelProvider.GEMINI:
+            chunks = self._gemini_stream(prompt, temperature, max_tokens)
+        elif provider == ModelProvider.OPENAI:
+            chunks = self._openai_stream(prompt, temperature, max_tokens)
+        else:
+            chunks = self._local_stream(prompt, temperature, max_tokens)
+
+        parts = []
+        start = time.perf_counter()
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            limiter.settle(reserved, reserved - max_tokens + count_tokens("".join(parts), MODEL_NAMES[provider]))
+            _record_failure(provider, e)
+            raise
+        except BaseException as e:
+            limiter.settle(reserved, reserved - max_tokens + count_tokens("".join(parts), MODEL_NAMES[provider]))
+            if isinstance(e, asyncio.CancelledError) and e.args and e.args[0] == TIMED_OUT:
+                # Stalled past the stream deadline
+                health.record_failure()
             else:
-                return await self._gemini_generate(prompt, temperature, max_tokens)
+                # Cancelled, or the consumer stopped reading
+                health.record_cancelled()
+            raise
+        latency = time.perf_counter() - start
+        health.record_success(latency)
+        if self.local is not None and provider != ModelProvider.LOCAL:
+            self.local.record(provider.value, MODEL_NAMES[provider], prompt, temperature, max_tokens, "".join(parts), latency)
+        usage = (reserved - max_tokens, count_tokens("".join(parts), MODEL_NAMES[provider]))
+        limiter.settle(reserved, sum(usage))
+        _answered(call, provider, cache_hit=False, usage=usage)
+
+        if cache_key is not None and parts:
+            await self.cache.aput(cache_key, "".join(parts))
+
+    async def _gemini_generate(self, prompt: str, temperature: float, max_tokens: int) -> Tuple[str, Optional[Tuple[int, int]]]:
+        async with provider_slot(ModelProvider.GEMINI):
+            response = await self.gemini.generate_content_async(
+                prompt,
+                generation_config=genai.GenerationConfig(
+                    temperature=temperature,
+                    max_output_tokens=max_tokens
+                ),
+                request_options={"timeout": settings.LLM_REQUEST_TIMEOUT_SECONDS}
+            )
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return response.text, None
+        return response.text, (usage.prompt_token_count, usage.candidates_token_count)
     
-    async def _gemini_generate(self, prompt: str, temperature: float, max_tokens: int) -> str:
-        response = await self.gemini.generate_content_async(
-            prompt,
-            generation_config=genai.GenerationConfig(
+    async def _openai_generate(self, prompt: str, temperature: float, max_tokens: int) -> Tuple[str, Optional[Tuple[int, int]]]:
+        async with provider_slot(ModelProvider.OPENAI):
+            response = await self.openai.chat.completions.create(
+                model=MODEL_NAMES[ModelProvider.OPENAI],
+                messages=[{"role": "user", "content": prompt}],
                 temperature=temperature,
-                max_output_tokens=max_tokens
+                max_tokens=max_tokens
             )
-        )
-        return response.text
-    
-    async def _openai_generate(self, prompt: str, temperature: float, max_tokens: int) -> str:
-        response = self.openai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
-        return response.choices[0].message.content
+        usage = response.usage
+        if usage is None:
+            return response.choices[0].message.content, None
+        return response.choices[0].message.content, (usage.prompt_tokens, usage.completion_tokens)
+
+    async def _gemini_stream(self, prompt: str, temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        async with provider_slot(ModelProvider.GEMINI):
+            response = await self.gemini.generate_content_async(
+                prompt,
+                generation_config=genai.GenerationConfig(
+                    temperature=temperature,
+                    max_output_tokens=max_tokens
+                ),
+                stream=True,
+                request_options={"timeout": settings.LLM_REQUEST_TIMEOUT_SECONDS}
+            )
+            async for chunk in response:
+                # Chunks without text parts (e.g. safety metadata) raise on .text
+                if chunk.parts:
+                    yield chunk.text
+
+    async def _openai_stream(self, prompt: str, temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        async with provider_slot(ModelProvider.OPENAI):
+            stream = await self.openai.chat.completions.create(
+                model=MODEL_NAMES[ModelProvider.OPENAI],
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
     
+    async def _local_generate(self, prompt: str, temperature: float, max_tokens: int) -> Tuple[str, Optional[Tuple[int, int]]]:
+        async with provider_slot(ModelProvider.LOCAL):
+            return await self.local.generate(prompt, temperature, max_tokens), None
+
+    async def _local_stream(self, prompt: str, temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        async with provider_slot(ModelProvider.LOCAL):
+            async for chunk in self.local.stream(prompt, temperature, max_tokens):
+                yield chunk
+
     def route_model(self, task_type: str) -> ModelProvider:
-        """Intelligent routing based on task type"""
+        """
+        Intelligent routing based on task type and live provider health
+
+        The task-type table gives the preferred provider. Traffic moves to
+        the other provider while the preferred one's circuit breaker is
+        open, or while the other is clearly faster (by
+        LLM_ROUTING_SWITCH_RATIO) on this task type's recent p95 latency.
+        In the offline LOCAL_LLM_MODEs everything goes to the local provider.
+        """
+        if local_only():
+            return ModelProvider.LOCAL
+        preferred = self._preferred_provider(task_type)
+        other = _other(preferred)
+
+        preferred_up = _provider_stats[preferred].is_available()
+        other_up = _provider_stats[other].is_available()
+        if not preferred_up:
+            return other if other_up else preferred
+        if not other_up:
+            return preferred
+
+        preferred_p95 = _task_latency(preferred, task_type).latency_percentile(95)
+        other_p95 = _task_latency(other, task_type).latency_percentile(95)
+        if preferred_p95 is not None and other_p95 is not None:
+            if other_p95 * settings.LLM_ROUTING_SWITCH_RATIO < preferred_p95:
+                return other
+        return preferred
+
+    @staticmethod
+    def _preferred_provider(task_type: str) -> ModelProvider:
+        """Static task-type preference"""
         # Gemini for fast, structured tasks
         if task_type in ["extraction", "classification", "quick_chat"]:
             return ModelProvider.GEMINI
         # OpenAI for complex reasoning
         elif task_type in ["planning", "analysis", "creative"]:
             return ModelProvider.OPENAI
-        return ModelProvider.GEMINI  # Default
\ No newline at end of file
+        return ModelProvider.GEMINI  # Default
+
+
+# ============================================================================
+# Shared clients & concurrency limits
+# ============================================================================
+
+_openai_client: Optional[AsyncOpenAI] = None
+_llm_cache: Optional[LLMResponseCache] = None
+_local_llm: Optional[LocalLLMProvider] = None
+_telemetry = LLMTelemetry(
+    window=settings.LLM_TELEMETRY_WINDOW,
+    persist=settings.LLM_TELEMETRY_PERSIST,
+    flush_size=settings.LLM_TELEMETRY_FLUSH_SIZE
+)
+_single_flight = SingleFlight()
+_provider_stats: Dict[ModelProvider, ProviderStats] = {
+    provider: ProviderStats(
+        window=settings.LLM_LATENCY_WINDOW,
+        health_window_seconds=settings.LLM_HEALTH_WINDOW_SECONDS,
+        error_rate_threshold=settings.LLM_BREAKER_ERROR_RATE,
+        min_calls=settings.LLM_BREAKER_MIN_CALLS,
+        consecutive_failures=settings.LLM_BREAKER_CONSECUTIVE_FAILURES,
+        cooldown_seconds=settings.LLM_BREAKER_COOLDOWN_SECONDS
+    )
+    for provider in ModelProvider
+}
+_task_latencies: Dict[Tuple[ModelProvider, str], ProviderStats] = {}
+_hedge_stats = {"hedged_calls": 0, "hedges_fired": 0, "secondary_wins": 0}
+_provider_semaphores: Dict[ModelProvider, asyncio.Semaphore] = {}
+_rate_limiters: Dict[ModelProvider, ProviderRateLimiter] = {}
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """
+    Return the process-wide AsyncOpenAI client
+
+    All LLMService instances share one client, so connections to the API
+    are pooled and kept alive instead of being opened per agent.
+    """
+    global _openai_client
+    if _openai_client is None:
+        timeout = httpx.Timeout(settings.LLM_REQUEST_TIMEOUT_SECONDS, connect=settings.LLM_CONNECT_TIMEOUT_SECONDS)
+        _openai_client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            timeout=timeout,
+            http_client=httpx.AsyncClient(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS
+                )
+            )
+        )
+    return _openai_client
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Return the process-wide response cache (None when LLM_CACHE_ENABLED is off)"""
+    global _llm_cache
+    if _llm_cache is None and settings.LLM_CACHE_ENABLED:
+        _llm_cache = LLMResponseCache(
+            max_entries=settings.LLM_CACHE_SIZE,
+            max_disk_entries=settings.LLM_CACHE_DISK_SIZE,
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+            db_path=settings.LLM_CACHE_PATH or None
+        )
+    return _llm_cache
+
+
+def local_only() -> bool:
+    """Whether LOCAL_LLM_MODE serves every call without the real providers"""
+    return settings.LOCAL_LLM_MODE in (SCRIPTED, REPLAY)
+
+
+def get_local_llm() -> Optional[LocalLLMProvider]:
+    """Return the process-wide local provider (None when LOCAL_LLM_MODE is off)"""
+    global _local_llm
+    if _local_llm is None and settings.LOCAL_LLM_MODE in (SCRIPTED, RECORD, REPLAY):
+        _local_llm = LocalLLMProvider(
+            mode=settings.LOCAL_LLM_MODE,
+            latency_median_seconds=settings.LOCAL_LLM_LATENCY_MEDIAN_SECONDS,
+            latency_p95_seconds=settings.LOCAL_LLM_LATENCY_P95_SECONDS,
+            error_rate=settings.LOCAL_LLM_ERROR_RATE,
+            rate_limit_rate=settings.LOCAL_LLM_RATE_LIMIT_RATE,
+            stream_chunk_words=settings.LOCAL_LLM_STREAM_CHUNK_WORDS,
+            cassette_path=settings.LOCAL_LLM_CASSETTE_PATH,
+            replay_timing=settings.LOCAL_LLM_REPLAY_TIMING,
+            seed=settings.LOCAL_LLM_SEED
+        )
+    return _local_llm
+
+
+def _other(provider: ModelProvider) -> ModelProvider:
+    if provider == ModelProvider.LOCAL:
+        return ModelProvider.LOCAL
+    return ModelProvider.OPENAI if provider == ModelProvider.GEMINI else ModelProvider.GEMINI
+
+
+def _task_latency(provider: ModelProvider, task_type: str) -> ProviderStats:
+    """Latency window of one provider on one task type (used for routing only)"""
+    stats = _task_latencies.get((provider, task_type))
+    if stats is None:
+        stats = _task_latencies[(provider, task_type)] = ProviderStats(window=settings.LLM_LATENCY_WINDOW)
+    return stats
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Whether a provider error is a 429 / quota response"""
+    return (
+        getattr(error, "status_code", None) == 429
+        or getattr(error, "code", None) == 429
+        or type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+    )
+
+
+async def _within(awaitable, timeout: float):
+    """
+    Await with a timeout like asyncio.wait_for, but cancel the work with
+    TIMED_OUT so provider calls can tell a hang from a lost hedge
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+    except asyncio.CancelledError as e:
+        task.cancel(e.args[0] if e.args else None)
+        raise
+    if not done:
+        task.cancel(TIMED_OUT)
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+        raise asyncio.TimeoutError()
+    return task.result()
+
+
+def _record_failure(provider: ModelProvider, error: Exception):
+    """Feed a provider error to its breaker; a 429 also empties its rate-limit buckets"""
+    rate_limited = _is_rate_limited(error)
+    _provider_stats[provider].record_failure(rate_limited=rate_limited)
+    if rate_limited:
+        rate_limiter(provider).drain()
+
+
+def _start_call(
+    preferred: ModelProvider,
+    task_type: Optional[str],
+    agent: Optional[str],
+    user_id: Optional[int]
+) -> Dict[str, Any]:
+    """Telemetry state of one generate/stream call"""
+    return {
+        "preferred": preferred,
+        "task_type": task_type,
+        "agent": agent,
+        "user_id": user_id,
+        "endpoint": current_endpoint(),
+        "start": time.perf_counter(),
+        "first_byte": None,
+        "provider": None,
+        "cache_hit": False,
+        "usage": (0, 0)
+    }
+
+
+def _answered(call: Optional[Dict[str, Any]], provider: ModelProvider, cache_hit: bool, usage: Tuple[int, int]):
+    """Note the provider that answered a call (the first one wins under hedging)"""
+    if call is not None and call["provider"] is None:
+        call.update(provider=provider, cache_hit=cache_hit, usage=usage)
+
+
+def _finish_call(call: Dict[str, Any], trace: Optional[Dict[str, Any]], error: Optional[BaseException] = None):
+    """Record a finished call in the telemetry and copy the record into ``trace``"""
+    latency_ms = (time.perf_counter() - call["start"]) * 1000
+    provider = call["provider"] or call["preferred"]
+    model = MODEL_NAMES[provider]
+    prompt_tokens, completion_tokens = call["usage"]
+    first_byte = call["first_byte"]
+    record = {
+        "user_id": call["user_id"],
+        "agent": call["agent"] or "direct",
+        "endpoint": call["endpoint"],
+        "task_type": call["task_type"],
+        "provider": provider.value,
+        "model": model,
+        "cache_hit": call["cache_hit"],
+        "fallback": call["provider"] is not None and call["provider"] != call["preferred"],
+        "success": error is None,
+        "error": type(error).__name__ if error is not None else None,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cost_usd": estimate_cost(model, prompt_tokens, completion_tokens),
+        "ttfb_ms": (first_byte - call["start"]) * 1000 if first_byte is not None else latency_ms,
+        "latency_ms": latency_ms
+    }
+    _telemetry.record(record)
+    if trace is not None:
+        trace.update(record)
+
+
+async def _paced(chunks: AsyncIterator[str], first_timeout: float, gap_timeout: float) -> AsyncIterator[str]:
+    """
+    Re-yield a stream, raising asyncio.TimeoutError when the first chunk
+    takes longer than ``first_timeout`` or a later one than ``gap_timeout``
+    """
+    async def next_chunk() -> str:
+        return await chunks.__anext__()
+
+    timeout = first_timeout
+    try:
+        while True:
+            try:
+                chunk = await _within(next_chunk(), timeout)
+            except StopAsyncIteration:
+                return
+            yield chunk
+            timeout = gap_timeout
+    finally:
+        await chunks.aclose()
+
+
+def hedge_delay(provider: ModelProvider) -> float:
+    """
+    Seconds to wait for a provider before hedging: its observed
+    LLM_HEDGE_PERCENTILE latency, clamped to the configured bounds, or the
+    default delay until enough calls have been seen
+    """
+    observed = _provider_stats[provider].latency_percentile(settings.LLM_HEDGE_PERCENTILE)
+    if observed is None:
+        return settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+    return min(max(observed, settings.LLM_HEDGE_MIN_DELAY_SECONDS), settings.LLM_HEDGE_MAX_DELAY_SECONDS)
+
+
+def get_llm_metrics() -> Dict[str, Any]:
+    """Response cache, request coalescing, hedging, provider health, rate-limit and per-call telemetry counters"""
+    cache = get_llm_cache()
+    return {
+        "cache": cache.stats() if cache is not None else {"enabled": False},
+        "coalescing": _single_flight.stats(),
+        "hedging": {
+            **_hedge_stats,
+            "delays_seconds": {provider.value: hedge_delay(provider) for provider in ModelProvider}
+        },
+        "providers": {provider.value: stats.stats() for provider, stats in _provider_stats.items()},
+        "rate_limits": {provider.value: limiter.stats() for provider, limiter in _rate_limiters.items()},
+        "calls": _telemetry.stats(),
+        "routing": {
+            f"{provider.value}:{task_type}": stats.latency_percentile(95)
+            for (provider, task_type), stats in _task_latencies.items()
+        }
+    }
+
+
+def provider_slot(provider: ModelProvider) -> asyncio.Semaphore:
+    """Semaphore bounding in-flight requests to a provider (per worker)"""
+    semaphore = _provider_semaphores.get(provider)
+    if semaphore is None:
+        limits = {
+            ModelProvider.GEMINI: settings.LLM_MAX_CONCURRENCY_GEMINI,
+            ModelProvider.OPENAI: settings.LLM_MAX_CONCURRENCY_OPENAI,
+            ModelProvider.LOCAL: settings.LLM_MAX_CONCURRENCY_LOCAL
+        }
+        semaphore = _provider_semaphores[provider] = asyncio.Semaphore(limits[provider])
+    return semaphore
+
+
+def rate_limiter(provider: ModelProvider) -> ProviderRateLimiter:
+    """Request and token quota of a provider (per worker)"""
+    limiter = _rate_limiters.get(provider)
+    if limiter is None:
+        # The local provider has no quota to protect
+        tokens_per_minute = {
+            ModelProvider.GEMINI: settings.LLM_TOKENS_PER_MINUTE_GEMINI,
+            ModelProvider.OPENAI: settings.LLM_TOKENS_PER_MINUTE_OPENAI,
+            ModelProvider.LOCAL: 0
+        }
+        limiter = _rate_limiters[provider] = ProviderRateLimiter(
+            requests_per_minute=0 if provider == ModelProvider.LOCAL else settings.RATE_LIMIT_PER_MINUTE,
+            tokens_per_minute=tokens_per_minute[provider],
+            max_wait_seconds=settings.LLM_RATE_LIMIT_MAX_WAIT_SECONDS,
+            burst_seconds=settings.LLM_RATE_LIMIT_BURST_SECONDS
+        )
+    return limiter
+
+
+async def close_llm_clients():
+    """Close pooled connections and the response cache, flush telemetry (called on application shutdown)"""
+    global _openai_client, _llm_cache
+    await asyncio.to_thread(_telemetry.flush)
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+    if _llm_cache is not None:
+        await asyncio.to_thread(_llm_cache.close)
+        _llm_cache = None
@@ -0,0 +1,160 @@
+"""
+Per-call LLM telemetry
+Every generate/stream call produces one record: provider, model, calling
+agent, endpoint, user, prompt and completion tokens, estimated cost, time
+to first byte, total latency, cache hit and whether a fallback provider
+answered. Records are aggregated in memory for /metrics/llm and can be
+persisted to the llm_calls table (LLM_TELEMETRY_PERSIST) for per-user
+cost reports.
+"""
+
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import Dict, List, Optional, Any
+from threading import Lock
+from loguru import logger
+import asyncio
+
+# USD per million (prompt, completion) tokens
+MODEL_PRICES_PER_MILLION = {
+    "gemini-2.0-flash-exp": (0.10, 0.40),
+    "gpt-4o-mini": (0.15, 0.60),
+    "wizai-local": (0.0, 0.0),
+}
+
+_endpoint: ContextVar[str] = ContextVar("llm_endpoint", default="background")
+
+
+def set_endpoint(endpoint: str) -> Token:
+    """Attribute LLM calls made while handling a request to its endpoint"""
+    return _endpoint.set(endpoint)
+
+
+def reset_endpoint(token: Token):
+    _endpoint.reset(token)
+
+
+def current_endpoint() -> str:
+    """Endpoint of the request being handled ("background" for scheduler jobs)"""
+    return _endpoint.get()
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of a call at list prices"""
+    prompt_price, completion_price = MODEL_PRICES_PER_MILLION.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class _Aggregate:
+    """Counters and latency windows for one group of calls"""
+
+    def __init__(self, window: int):
+        self.counts = {
+            "calls": 0, "errors": 0, "cache_hits": 0, "fallbacks": 0,
+            "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0
+        }
+        self.latencies: "deque[float]" = deque(maxlen=window)
+        self.ttfbs: "deque[float]" = deque(maxlen=window)
+
+    def add(self, record: Dict[str, Any]):
+        self.counts["calls"] += 1
+        self.counts["errors"] += 0 if record["success"] else 1
+        self.counts["cache_hits"] += 1 if record["cache_hit"] else 0
+        self.counts["fallbacks"] += 1 if record["fallback"] else 0
+        self.counts["prompt_tokens"] += record["prompt_tokens"]
+        self.counts["completion_tokens"] += record["completion_tokens"]
+        self.counts["cost_usd"] += record["cost_usd"]
+        if record["success"]:
+            self.latencies.append(record["latency_ms"])
+            if record["ttfb_ms"] is not None:
+                self.ttfbs.append(record["ttfb_ms"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            "cost_usd": round(self.counts["cost_usd"], 6),
+            "latency_p50_ms": _percentile(self.latencies, 50),
+            "latency_p95_ms": _percentile(self.latencies, 95),
+            "ttfb_p50_ms": _percentile(self.ttfbs, 50),
+            "ttfb_p95_ms": _percentile(self.ttfbs, 95)
+        }
+
+
+def _percentile(values: "deque[float]", percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))], 1)
+
+
+class LLMTelemetry:
+    def __init__(self, window: int = 500, persist: bool = False, flush_size: int = 50):
+        """
+        Args:
+            window: Recent latencies kept per group for percentiles
+            persist: Write records to the llm_calls table
+            flush_size: Records buffered before a database write
+        """
+        self.window = window
+        self.persist = persist
+        self.flush_size = flush_size
+        self._groups: Dict[str, Dict[str, _Aggregate]] = {"model": {}, "agent": {}, "endpoint": {}}
+        self._total = _Aggregate(window)
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = Lock()
+
+    def record(self, record: Dict[str, Any]):
+        """Aggregate one call record and queue it for persistence"""
+        keys = {
+            "model": f"{record['provider']}:{record['model']}",
+            "agent": record["agent"],
+            "endpoint": record["endpoint"]
+        }
+        with self._lock:
+            self._total.add(record)
+            for dimension, key in keys.items():
+                group = self._groups[dimension].get(key)
+                if group is None:
+                    group = self._groups[dimension][key] = _Aggregate(self.window)
+                group.add(record)
+            if not self.persist:
+                return
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.flush_size
+
+        if full:
+            try:
+                asyncio.get_running_loop().run_in_executor(None, self.flush)
+            except RuntimeError:
+                self.flush()
+
+    def flush(self):
+        """Write buffered records to the llm_calls table"""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+
+        from app.database import SessionLocal
+        from app.models.llm_call import LLMCall
+
+        db = SessionLocal()
+        try:
+            db.add_all([LLMCall(**row) for row in rows])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to persist {len(rows)} LLM call records: {e}")
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals plus breakdowns by provider:model, agent and endpoint"""
+        with self._lock:
+            return {
+                "total": self._total.stats(),
+                **{
+                    f"by_{dimension}": {key: group.stats() for key, group in groups.items()}
+                    for dimension, groups in self._groups.items()
+                }
+            }
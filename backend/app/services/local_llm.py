@@ -0,0 +1,206 @@
+"""
+Offline LLM provider for load and performance testing
+Two modes stand in for Gemini/OpenAI without network access or API keys:
+
+- scripted: canned responses shaped like the ExtractionAgent/PlannerAgent
+  JSON (plain text for chat), returned after a simulated log-normal
+  latency, with configurable error and rate-limit rates
+- replay: responses recorded from the real providers (record mode) are
+  served back from a cassette file, optionally with their recorded timing
+
+Randomness comes from a seeded generator, so a run is reproducible.
+"""
+
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Any
+from threading import Lock
+from loguru import logger
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+
+SCRIPTED = "scripted"
+RECORD = "record"
+REPLAY = "replay"
+
+# Share of the simulated latency spent before the first streamed chunk
+STREAM_TTFB_FRACTION = 0.3
+
+
+class LocalProviderError(Exception):
+    """Simulated provider failure (``status_code`` 429 for simulated rate limits)"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LocalLLMProvider:
+    def __init__(
+        self,
+        mode: str = SCRIPTED,
+        latency_median_seconds: float = 0.8,
+        latency_p95_seconds: float = 2.5,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        stream_chunk_words: int = 3,
+        cassette_path: Optional[str] = None,
+        replay_timing: bool = False,
+        seed: int = 0
+    ):
+        """
+        Args:
+            mode: "scripted", "record" or "replay"
+            latency_median_seconds: Median simulated latency (scripted)
+            latency_p95_seconds: 95th percentile simulated latency (scripted)
+            error_rate: Fraction of calls failing with a 500 (scripted)
+            rate_limit_rate: Fraction of calls failing with a 429 (scripted)
+            stream_chunk_words: Words per streamed chunk
+            cassette_path: JSON-lines file written in record mode, read in replay mode
+            replay_timing: Sleep for the recorded latency when replaying
+            seed: Seed for latencies and injected failures
+        """
+        if mode not in (SCRIPTED, RECORD, REPLAY):
+            raise ValueError(f"Unknown local LLM mode: {mode}")
+        self.mode = mode
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stream_chunk_words = max(1, stream_chunk_words)
+        self.replay_timing = replay_timing
+        self.cassette_path = Path(cassette_path) if cassette_path else None
+
+        # Log-normal through the median and p95 (z = 1.645)
+        self._mu = math.log(max(latency_median_seconds, 1e-6))
+        self._sigma = max(0.0, math.log(max(latency_p95_seconds, 1e-6) / max(latency_median_seconds, 1e-6)) / 1.645)
+        self._random = random.Random(seed)
+        self._lock = Lock()
+        self._cassette: Dict[str, Dict[str, Any]] = {}
+
+        if mode == REPLAY:
+            if self.cassette_path is None or not self.cassette_path.exists():
+                raise ValueError(f"Replay cassette not found: {self.cassette_path}")
+            with open(self.cassette_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._cassette[entry["key"]] = entry
+            logger.info(f"Local LLM replaying {len(self._cassette)} responses from {self.cassette_path}")
+        elif mode == RECORD:
+            if self.cassette_path is None:
+                raise ValueError("Record mode needs a cassette path")
+            self.cassette_path.parent.mkdir(parents=True, exist_ok=True)
+            logger.info(f"Recording LLM responses to {self.cassette_path}")
+        else:
+            logger.info(f"Local LLM scripted (median {latency_median_seconds}s, p95 {latency_p95_seconds}s)")
+
+    @staticmethod
+    def make_key(prompt: str, temperature: float, max_tokens: int) -> str:
+        """Provider-independent key of a request"""
+        normalised = " ".join(prompt.split())
+        prompt_hash = hashlib.sha256(normalised.encode("utf-8")).hexdigest()
+        return f"{prompt_hash}:{float(temperature):.3f}:{int(max_tokens)}"
+
+    # ------------------------------------------------------------------------
+    # Serving
+    # ------------------------------------------------------------------------
+
+    async def generate(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        response, latency = self._respond(prompt, temperature, max_tokens)
+        await asyncio.sleep(latency)
+        return response
+
+    async def stream(self, prompt: str, temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        response, latency = self._respond(prompt, temperature, max_tokens)
+        words = response.split(" ")
+        chunks = [
+            " ".join(words[i:i + self.stream_chunk_words]) + (" " if i + self.stream_chunk_words < len(words) else "")
+            for i in range(0, len(words), self.stream_chunk_words)
+        ]
+        await asyncio.sleep(latency * STREAM_TTFB_FRACTION)
+        gap = latency * (1 - STREAM_TTFB_FRACTION) / max(1, len(chunks) - 1)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(gap)
+            yield chunk
+
+    def _respond(self, prompt: str, temperature: float, max_tokens: int):
+        """Response text and latency for a request, or a simulated failure"""
+        if self.mode == REPLAY:
+            entry = self._cassette.get(self.make_key(prompt, temperature, max_tokens))
+            if entry is None:
+                raise LocalProviderError("No cassette entry for this prompt", status_code=404)
+            return entry["response"], (entry.get("latency_seconds", 0.0) if self.replay_timing else 0.0)
+
+        with self._lock:
+            roll = self._random.random()
+            latency = self._random.lognormvariate(self._mu, self._sigma)
+        if roll < self.rate_limit_rate:
+            raise LocalProviderError("Simulated rate limit", status_code=429)
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise LocalProviderError("Simulated provider error")
+        return _scripted_response(prompt, max_tokens), latency
+
+    # ------------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------------
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        response: str,
+        latency_seconds: float
+    ):
+        """Append a real provider response to the cassette (record mode only)"""
+        if self.mode != RECORD or not response:
+            return
+        entry = {
+            "key": self.make_key(prompt, temperature, max_tokens),
+            "provider": provider,
+            "model": model,
+            "response": response,
+            "latency_seconds": round(latency_seconds, 4),
+            "recorded_at": time.time()
+        }
+        with self._lock, open(self.cassette_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+_DATE_IN_PROMPT = re.compile(r'"date": "(\d{4}-\d{2}-\d{2})"')
+
+
+def _scripted_response(prompt: str, max_tokens: int) -> str:
+    """Canned response matching the output format the prompt asks for"""
+    if '"schedule"' in prompt and "productivity_score" in prompt:
+        match = _DATE_IN_PROMPT.search(prompt)
+        return json.dumps({
+            "date": match.group(1) if match else "2025-01-01",
+            "schedule": [
+                {"start_time": "09:00", "end_time": "10:30", "activity": "Study session", "type": "study", "task_id": None},
+                {"start_time": "10:30", "end_time": "10:45", "activity": "Break", "type": "break", "task_id": None},
+                {"start_time": "10:45", "end_time": "12:15", "activity": "Assignment work", "type": "study", "task_id": None}
+            ],
+            "conflicts": [],
+            "reasoning": "Scripted plan from the local provider",
+            "productivity_score": 80
+        })
+    if '"assignments"' in prompt:
+        return json.dumps({
+            "assignments": [
+                {"title": "Problem Set 1", "deadline": "2025-01-15", "course": "MATH 101", "priority": "high", "description": ""}
+            ],
+            "events": [
+                {"title": "Midterm Exam", "date": "2025-02-01", "time": "09:00", "location": "Main Hall"}
+            ],
+            "confidence": 0.9
+        })
+    sentence = "This is a scripted response from the local WizAI test provider."
+    words = (sentence + " ") * 8
+    return " ".join(words.split()[:max(1, max_tokens)])
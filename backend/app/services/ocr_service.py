@@ -5,6 +5,7 @@
 import cv2
 import numpy as np
 from pathlib import Path
+from typing import Iterator, Tuple
 from loguru import logger
 
 class OCRService:
@@ -55,4 +56,29 @@ def extract_from_docx(docx_path: str) -> str:
         except Exception as e:
             logger.error(f"DOCX extraction failed: {e}")
             raise
-
+    
+    @staticmethod
+    def iter_pdf_pages(pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, text) one PDF page at a time"""
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                yield page.number + 1, page.get_text()
+    
+    @staticmethod
+    def iter_docx_pages(docx_path: str, paragraphs_per_page: int = 50) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, text) for groups of Word paragraphs (DOCX has no real pages)"""
+        doc = Document(docx_path)
+        paragraphs = doc.paragraphs
+        for start in range(0, len(paragraphs), paragraphs_per_page):
+            text = "\n".join(para.text for para in paragraphs[start:start + paragraphs_per_page])
+            yield start // paragraphs_per_page + 1, text
+    
+    @staticmethod
+    def iter_pages(file_path: str, content_type: str) -> Iterator[Tuple[int, str]]:
+        """Stream (page_number, text) for any supported upload type"""
+        if content_type == "application/pdf":
+            yield from OCRService.iter_pdf_pages(file_path)
+        elif content_type in ["image/png", "image/jpeg"]:
+            yield 1, OCRService.extract_from_image(file_path)
+        else:
+            yield from OCRService.iter_docx_pages(file_path)
@@ -0,0 +1,179 @@
+"""
+Rolling per-provider health statistics and circuit breaker
+Keeps the latencies of recent successful LLM calls plus the outcome of
+every call in a sliding time window. A provider whose calls keep failing,
+timing out or getting rate-limited is taken out of rotation for a
+cool-down period, after which a single probe request decides whether it
+comes back.
+"""
+
+from collections import deque
+from typing import Dict, Optional, Any
+from threading import Lock
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderStats:
+    def __init__(
+        self,
+        window: int = 200,
+        min_samples: int = 20,
+        health_window_seconds: float = 60,
+        error_rate_threshold: float = 0.5,
+        min_calls: int = 5,
+        consecutive_failures: int = 3,
+        cooldown_seconds: float = 30
+    ):
+        """
+        Args:
+            window: Number of recent latencies kept
+            min_samples: Percentiles are unknown (None) below this many samples
+            health_window_seconds: Sliding window for error and rate-limit rates
+            error_rate_threshold: Error rate that opens the breaker
+            min_calls: Calls in the window before the error rate is trusted
+            consecutive_failures: Failures in a row that open the breaker
+            cooldown_seconds: How long an open breaker sheds traffic
+        """
+        self.min_samples = min_samples
+        self.health_window_seconds = health_window_seconds
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.consecutive_failures = consecutive_failures
+        self.cooldown_seconds = cooldown_seconds
+
+        self._latencies: "deque[float]" = deque(maxlen=window)
+        self._outcomes: "deque[tuple]" = deque()  # (time, ok, rate_limited)
+        self._failures_in_row = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._times_opened = 0
+        self._lock = Lock()
+
+    # ------------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------------
+
+    def record_success(self, seconds: float):
+        """Record a successful call and its latency"""
+        with self._lock:
+            self._latencies.append(seconds)
+            self._add_outcome(ok=True, rate_limited=False)
+            self._failures_in_row = 0
+            if self._state == HALF_OPEN:
+                # Probe succeeded: forget the brownout
+                self._state = CLOSED
+                self._probe_in_flight = False
+                self._outcomes.clear()
+
+    def record_failure(self, rate_limited: bool = False):
+        """Record a failed call (error, timeout or rate-limit response)"""
+        with self._lock:
+            self._add_outcome(ok=False, rate_limited=rate_limited)
+            self._failures_in_row += 1
+            if self._state == HALF_OPEN:
+                self._open()
+            elif self._state == CLOSED and (
+                rate_limited
+                or self._failures_in_row >= self.consecutive_failures
+                or (len(self._outcomes) >= self.min_calls and self._error_rate() >= self.error_rate_threshold)
+            ):
+                self._open()
+
+    def record_cancelled(self):
+        """A call was abandoned (e.g. lost a hedge); frees the probe slot"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def _add_outcome(self, ok: bool, rate_limited: bool):
+        now = time.monotonic()
+        self._outcomes.append((now, ok, rate_limited))
+        while self._outcomes and self._outcomes[0][0] < now - self.health_window_seconds:
+            self._outcomes.popleft()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._times_opened += 1
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, ok, _ in self._outcomes if not ok) / len(self._outcomes)
+
+    # ------------------------------------------------------------------------
+    # Circuit breaker
+    # ------------------------------------------------------------------------
+
+    def allow_request(self) -> bool:
+        """
+        Whether a call may go to the provider now
+
+        An open breaker rejects calls until the cool-down has passed, then
+        lets exactly one probe through (half-open).
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                    return False
+                self._state = HALF_OPEN
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def is_available(self) -> bool:
+        """Whether allow_request() would currently admit a call (without claiming it)"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                return time.monotonic() - self._opened_at >= self.cooldown_seconds
+            return not self._probe_in_flight
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    # ------------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------------
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency percentile in seconds over the window, or None if too few samples"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def stats(self) -> Dict[str, Any]:
+        """Latency percentiles, windowed error/rate-limit counts and breaker state"""
+        with self._lock:
+            samples = len(self._latencies)
+            calls = len(self._outcomes)
+            errors = sum(1 for _, ok, _ in self._outcomes if not ok)
+            rate_limited = sum(1 for _, _, limited in self._outcomes if limited)
+            state = self._state
+            times_opened = self._times_opened
+        return {
+            "samples": samples,
+            "p50_seconds": self.latency_percentile(50),
+            "p95_seconds": self.latency_percentile(95),
+            "window_calls": calls,
+            "window_errors": errors,
+            "window_rate_limited": rate_limited,
+            "error_rate": errors / calls if calls else 0.0,
+            "breaker": state,
+            "times_opened": times_opened
+        }
@@ -0,0 +1,98 @@
+"""
+Per-user result cache for RAG queries
+Entries expire after a TTL, the cache is size-bounded (LRU) and all entries
+of a user are dropped whenever that user's vectors change. A per-user
+generation counter lets a search started before an invalidation skip
+caching its (now stale) results.
+"""
+
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, Set
+from threading import Lock
+import json
+import time
+
+
+class QueryResultCache:
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 300):
+        """
+        Args:
+            max_entries: Maximum number of cached result lists
+            ttl_seconds: Lifetime of a cached result list
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[Tuple]] = {}
+        self._generations: Dict[int, int] = {}
+        self._lock = Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @staticmethod
+    def make_key(user_id: int, query_text: str, top_k: int, filter_metadata: Optional[Dict]) -> Tuple:
+        """Build a key from user, normalised query text, top_k and filter"""
+        normalised = " ".join(query_text.lower().split())
+        filter_key = json.dumps(filter_metadata or {}, sort_keys=True, default=str)
+        return (user_id, normalised, top_k, filter_key)
+
+    def get(self, key: Tuple) -> Optional[List[Dict[str, Any]]]:
+        """Return cached results, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._discard(key)
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return list(entry[1])
+
+    def generation(self, user_id: int) -> int:
+        """Counter bumped by every invalidation of a user's results"""
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def put(self, key: Tuple, results: List[Dict[str, Any]], generation: Optional[int] = None):
+        """
+        Cache results for a key, evicting least recently used entries
+
+        Args:
+            generation: The user's ``generation()`` read before searching;
+                the put is skipped if the user was invalidated since
+        """
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key[0], 0):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, list(results))
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(key[0], set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached result belonging to a user"""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            keys = self._keys_by_user.pop(user_id, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            if keys:
+                self._stats["invalidations"] += 1
+
+    def _discard(self, key: Tuple):
+        """Remove a single entry (caller holds the lock)"""
+        self._entries.pop(key, None)
+        user_keys = self._keys_by_user.get(key[0])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._keys_by_user[key[0]]
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/invalidation counters and current size"""
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
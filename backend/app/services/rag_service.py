@@ -1,24 +1,120 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple, Iterable
 from loguru import logger
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+import hashlib
+import json
+import time
+import uuid
+from app.config import settings
+from app.services.embedding_backends import EmbeddingBackend, create_embedding_backend
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_executor import EmbeddingBatcher
+from app.services.query_cache import QueryResultCache
+from app.services.vector_store import VectorStore, create_vector_store
+from app.utils.chunking import TextChunker
+
+
+def format_task_text(task: Dict[str, Any]) -> str:
+    """Text representation of a task dict, as embedded and shown to agents"""
+    return f"Task: {task['title']}. Deadline: {task['deadline']}. Course: {task.get('course', 'N/A')}. Description: {task.get('description', '')}"
+
+
+def format_plan_text(plan: Dict[str, Any]) -> str:
+    """Text representation of a plan dict, as embedded and shown to agents"""
+    return f"Daily plan for {plan['date']}. Schedule: {plan['schedule_summary']}"
+
 
 class RAGService:
-    def __init__(self, persist_directory: str = "./chroma_db"):
-        # Initialize ChromaDB client (new API)
-        self.client = chromadb.PersistentClient(path=persist_directory)
-        
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(
+        self,
+        persist_directory: str = "./chroma_db",
+        batch_size: Optional[int] = None,
+        sharding: Optional[str] = None,
+        vector_store: Optional[VectorStore] = None,
+        embedding_backend: Optional[EmbeddingBackend] = None
+    ):
+        # Vector store (chroma, numpy or pgvector, see VECTOR_STORE_BACKEND)
+        self.persist_directory = persist_directory
+        self.store = vector_store or create_vector_store(
+            settings.VECTOR_STORE_BACKEND,
+            persist_directory,
+            sharding=sharding or settings.RAG_SHARDING,
+            shard_buckets=settings.RAG_SHARD_BUCKETS,
+            dimension=settings.EMBEDDING_DIMENSION
+        )
         
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name="user_context",
-            metadata={"description": "User tasks, plans, and preferences"}
+        # Initialize embedding model (torch, onnx or onnx-int8 backend)
+        self.embedding_model = embedding_backend or create_embedding_backend(
+            settings.EMBEDDING_BACKEND,
+            settings.EMBEDDING_MODEL_NAME,
+            onnx_int8_file=settings.EMBEDDING_ONNX_INT8_FILE
+        )
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.embedding_cache = EmbeddingCache(
+            self.embedding_model.name,
+            max_entries=settings.EMBEDDING_CACHE_SIZE,
+            db_path=settings.EMBEDDING_CACHE_PATH or None,
+            max_disk_entries=settings.EMBEDDING_CACHE_DISK_SIZE
+        )
+        self._batcher: Optional[EmbeddingBatcher] = None
+        self.query_cache = QueryResultCache(
+            max_entries=settings.QUERY_CACHE_SIZE,
+            ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS
         )
         
-        logger.info("RAG service initialized with ChromaDB")
+        logger.info(f"RAG service initialized with {type(self.store).__name__}")
+
+    @staticmethod
+    def _owners(records: List[Dict[str, Any]]) -> set:
+        """Users owning the given store records"""
+        return {(record["metadata"] or {}).get("user_id") for record in records}
+
+    def embed(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Encode texts, serving previously seen strings from the embedding cache"""
+        vectors = self.embedding_cache.get_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+        if missing:
+            encoded = self._encode_and_cache([texts[i] for i in missing], batch_size)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+
+        return vectors
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Async ``embed``: cache misses are micro-batched with concurrent
+        requests and encoded on the embedding worker thread; disk cache
+        lookups run in a worker thread too
+        """
+        vectors = await self.embedding_cache.aget_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+        if missing:
+            encoded = await self._get_batcher().encode([texts[i] for i in missing])
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+
+        return vectors
+
+    def _encode_and_cache(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Run the model on texts and store the vectors in the embedding cache"""
+        encoded = self.embedding_model.encode(texts, batch_size=batch_size or self.batch_size)
+        self.embedding_cache.put_many(texts, encoded)
+        return encoded
+
+    def _get_batcher(self) -> EmbeddingBatcher:
+        """Create the micro-batching executor on first async use"""
+        if self._batcher is None:
+            self._batcher = EmbeddingBatcher(
+                self._encode_and_cache,
+                max_batch_size=settings.EMBEDDING_BATCHER_MAX_BATCH_SIZE,
+                max_wait_ms=settings.EMBEDDING_BATCHER_MAX_WAIT_MS
+            )
+        return self._batcher
+
     def add_document(
         self,
         user_id: int,
@@ -31,22 +127,80 @@ def add_document(
             doc_id = f"user_{user_id}_{datetime.utcnow().timestamp()}"
         
         # Generate embedding
-        embedding = self.embedding_model.encode(text).tolist()
+        embedding = self.embed([text])[0]
         
-        # Add to collection
-        self.collection.add(
-            documents=[text],
+        self.store.upsert(
+            ids=[doc_id],
             embeddings=[embedding],
+            documents=[text],
             metadatas=[{
                 "user_id": user_id,
                 "timestamp": datetime.utcnow().isoformat(),
                 **metadata
-            }],
-            ids=[doc_id]
+            }]
         )
+        self.query_cache.invalidate_user(user_id)
         
         logger.info(f"Added document {doc_id} for user {user_id}")
         return doc_id
+
+    def add_documents_batch(
+        self,
+        documents: List[Dict[str, Any]],
+        batch_size: Optional[int] = None
+    ) -> List[str]:
+        """
+        Embed and upsert many documents at once
+
+        Each document is a dict with ``user_id``, ``text`` and optional
+        ``metadata`` / ``doc_id`` keys, mirroring the arguments of
+        ``add_document``. Texts are encoded in batches of ``batch_size`` and
+        every batch is written with a single store upsert, so
+        re-adding an existing id replaces it instead of failing.
+        """
+        batch_size = batch_size or self.batch_size
+        doc_ids = []
+
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            embeddings = self.embed([doc["text"] for doc in batch], batch_size=batch_size)
+            doc_ids.extend(self._upsert_batch(batch, embeddings, start))
+
+        logger.info(f"Upserted {len(doc_ids)} documents in batches of {batch_size}")
+        return doc_ids
+
+    async def aadd_documents_batch(self, documents: List[Dict[str, Any]]) -> List[str]:
+        """Async ``add_documents_batch`` that keeps encoding and writes off the event loop"""
+        doc_ids = []
+
+        for start in range(0, len(documents), self.batch_size):
+            batch = documents[start:start + self.batch_size]
+            embeddings = await self.aembed([doc["text"] for doc in batch])
+            doc_ids.extend(await asyncio.to_thread(self._upsert_batch, batch, embeddings, start))
+
+        return doc_ids
+
+    def _upsert_batch(self, batch: List[Dict[str, Any]], embeddings: List[List[float]], start: int = 0) -> List[str]:
+        """Write one batch of embedded documents to the vector store"""
+        timestamp = datetime.utcnow()
+
+        ids = [
+            doc.get("doc_id") or f"user_{doc['user_id']}_{timestamp.timestamp()}_{start + i}"
+            for i, doc in enumerate(batch)
+        ]
+        texts = [doc["text"] for doc in batch]
+        metadatas = [{
+            "user_id": doc["user_id"],
+            "timestamp": timestamp.isoformat(),
+            **doc.get("metadata", {})
+        } for doc in batch]
+
+        self.store.upsert(ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas)
+        for user_id in {doc["user_id"] for doc in batch}:
+            self.query_cache.invalidate_user(user_id)
+
+        return ids
+
     def query(
         self,
         user_id: int,
@@ -55,64 +209,196 @@ def query(
         filter_metadata: Optional[Dict] = None
     ) -> List[Dict[str, Any]]:
         """Semantic search for relevant context"""
-        # Generate query embedding
-        query_embedding = self.embedding_model.encode(query_text).tolist()
-        
-        # Prepare filter (user-specific)
-        where_filter = {"user_id": user_id}
-        if filter_metadata:
-            where_filter.update(filter_metadata)
-        
-        # Query collection
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            where=where_filter
+        return self.query_many([(user_id, query_text)], top_k=top_k, filter_metadata=filter_metadata)[0]
+
+    async def aquery(
+        self,
+        user_id: int,
+        query_text: str,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[Dict[str, Any]]:
+        """Async ``query`` for request handlers and agents"""
+        return (await self.aquery_many([(user_id, query_text)], top_k=top_k, filter_metadata=filter_metadata))[0]
+
+    def query_many(
+        self,
+        queries: List[Tuple[int, str]],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Semantic search for many (user_id, query_text) pairs at once
+
+        Cache misses are encoded in one batched forward pass and grouped by
+        user so each user costs a single store query no matter how
+        many queries they have. Results are returned in input order.
+        """
+        results, cache_keys, pending, generations = self._cached_results(queries, top_k, filter_metadata)
+
+        if pending:
+            # Generate all query embeddings in one pass
+            embeddings = self.embed([queries[i][1] for i in pending])
+            self._search(queries, pending, embeddings, results, cache_keys, generations, top_k, filter_metadata)
+
+        return results
+
+    async def aquery_many(
+        self,
+        queries: List[Tuple[int, str]],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Async ``query_many``; encoding is micro-batched, the search runs in a thread"""
+        results, cache_keys, pending, generations = self._cached_results(queries, top_k, filter_metadata)
+
+        if pending:
+            embeddings = await self.aembed([queries[i][1] for i in pending])
+            await asyncio.to_thread(
+                self._search, queries, pending, embeddings, results, cache_keys, generations, top_k, filter_metadata
+            )
+
+        return results
+
+    def _cached_results(
+        self,
+        queries: List[Tuple[int, str]],
+        top_k: int,
+        filter_metadata: Optional[Dict]
+    ) -> Tuple[List[Optional[List[Dict[str, Any]]]], List[Tuple], List[int], Dict[int, int]]:
+        """
+        Serve what we can from the query cache; return the indexes still
+        pending and the cache generation of each user with a pending query
+        """
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+        cache_keys = [
+            self.query_cache.make_key(user_id, query_text, top_k, filter_metadata)
+            for user_id, query_text in queries
+        ]
+
+        pending = []
+        generations: Dict[int, int] = {}
+        for i, cache_key in enumerate(cache_keys):
+            cached = self.query_cache.get(cache_key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append(i)
+                user_id = queries[i][0]
+                if user_id not in generations:
+                    generations[user_id] = self.query_cache.generation(user_id)
+
+        return results, cache_keys, pending, generations
+
+    def _search(
+        self,
+        queries: List[Tuple[int, str]],
+        pending: List[int],
+        embeddings: List[List[float]],
+        results: List[Optional[List[Dict[str, Any]]]],
+        cache_keys: List[Tuple],
+        generations: Dict[int, int],
+        top_k: int,
+        filter_metadata: Optional[Dict]
+    ):
+        """
+        Run the vector search for pending queries, one store query per user
+
+        Results are cached only if the user's vectors were not invalidated
+        since ``generations`` was read, so a write racing the search can't
+        leave stale results behind.
+        """
+        by_user: Dict[int, List[Tuple[int, List[float]]]] = {}
+        for i, embedding in zip(pending, embeddings):
+            by_user.setdefault(queries[i][0], []).append((i, embedding))
+
+        for user_id, group in by_user.items():
+            rows = self.store.query(
+                user_id,
+                [embedding for _, embedding in group],
+                top_k,
+                where=filter_metadata
+            )
+
+            for (i, _), formatted_results in zip(group, rows):
+                self.query_cache.put(cache_keys[i], formatted_results, generations[user_id])
+                results[i] = formatted_results
+
+        logger.info(
+            f"Retrieved results for {len(pending)} queries across {len(by_user)} users "
+            f"({len(queries) - len(pending)} served from cache)"
         )
-# Format results with relevance scores
-        formatted_results = []
-        for i in range(len(results['ids'][0])):
-            formatted_results.append({
-                "id": results['ids'][0][i],
-                "text": results['documents'][0][i],
-                "metadata": results['metadatas'][0][i],
-                "distance": results['distances'][0][i]  # Lower is better
-            })
-        
-        logger.info(f"Retrieved {len(formatted_results)} results for user {user_id}")
-        return formatted_results
-    
+
     def update_document(self, doc_id: str, text: str, metadata: Dict[str, Any]):
         """Update existing document"""
-        embedding = self.embedding_model.encode(text).tolist()
+        embedding = self.embed([text])[0]
         
-        self.collection.update(
-            ids=[doc_id],
-            documents=[text],
-            embeddings=[embedding],
-            metadatas=[metadata]
-        )
+        for record in self.store.get([doc_id], metadata.get("user_id")):
+            # Keep stored keys (user_id, timestamp, ...) the update leaves out
+            updated = {**record["metadata"], **metadata}
+            self.store.upsert(
+                ids=[doc_id],
+                embeddings=[embedding],
+                documents=[text],
+                metadatas=[updated]
+            )
+            self._invalidate_users(self._owners([record]) | {updated.get("user_id")})
         
         logger.info(f"Updated document {doc_id}")
     
-    def delete_document(self, doc_id: str):
+    def delete_document(self, doc_id: str, user_id: Optional[int] = None):
         """Remove document from vector DB"""
-        self.collection.delete(ids=[doc_id])
+        deleted = self.store.delete([doc_id], user_id)
+        self._invalidate_users(self._owners(deleted))
         logger.info(f"Deleted document {doc_id}")
-    def add_task_to_context(self, user_id: int, task: Dict[str, Any]):
-        """Add task to user's context"""
-        text = f"Task: {task['title']}. Deadline: {task['deadline']}. Course: {task.get('course', 'N/A')}. Description: {task.get('description', '')}"
+
+    def _invalidate_users(self, user_ids: set):
+        """Drop cached query results for every affected user"""
+        for user_id in user_ids:
+            if user_id is not None:
+                self.query_cache.invalidate_user(user_id)
+
+    @staticmethod
+    def _task_document(task: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the text and metadata stored for a task"""
+        text = format_task_text(task)
         metadata = {
             "type": "task",
             "task_id": task['id'],
             "deadline": task['deadline'],
-            "priority": task.get('priority', 'medium')
+            "priority": task.get('priority', 'medium'),
+            "status": task.get('status') or 'pending'
         }
-        return self.add_document(user_id, text, metadata, doc_id=f"task_{task['id']}")
+        # Fingerprint of what gets embedded, used to skip unchanged tasks on sync
+        fingerprint = json.dumps({"text": text, "metadata": metadata}, sort_keys=True, default=str)
+        metadata["content_hash"] = hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+        return {"text": text, "metadata": metadata, "doc_id": f"task_{task['id']}"}
+
+    def add_task_to_context(self, user_id: int, task: Dict[str, Any]):
+        """Add or replace a task in user's context"""
+        document = self._task_document(task)
+        return self.add_documents_batch([{"user_id": user_id, **document}])[0]
+
+    async def aadd_task_to_context(self, user_id: int, task: Dict[str, Any]):
+        """Async ``add_task_to_context`` for request handlers"""
+        document = self._task_document(task)
+        return (await self.aadd_documents_batch([{"user_id": user_id, **document}]))[0]
+
+    def add_tasks_to_context_batch(
+        self,
+        tasks: List[Dict[str, Any]],
+        batch_size: Optional[int] = None
+    ) -> List[str]:
+        """Add many tasks (dicts with ``user_id``) to context in batches"""
+        documents = [
+            {"user_id": task["user_id"], **self._task_document(task)}
+            for task in tasks
+        ]
+        return self.add_documents_batch(documents, batch_size=batch_size)
     
     def add_plan_to_context(self, user_id: int, plan: Dict[str, Any]):
         """Add daily plan to context"""
-        text = f"Daily plan for {plan['date']}. Schedule: {plan['schedule_summary']}"
+        text = format_plan_text(plan)
         metadata = {
             "type": "plan",
             "plan_id": plan['id'],
@@ -120,3 +406,302 @@ def add_plan_to_context(self, user_id: int, plan: Dict[str, Any]):
         }
         return self.add_document(user_id, text, metadata, doc_id=f"plan_{plan['id']}")
 
+    def ingest_document(
+        self,
+        user_id: int,
+        document_id: str,
+        filename: str,
+        pages: Iterable[Tuple[int, str]],
+        max_chunk_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Stream an uploaded document's text into the vector DB as chunks
+
+        Pages are chunked one at a time and embedded/upserted in batches,
+        so memory stays flat however long the document is. Chunks are keyed
+        by user and ``document_id`` (a stable id such as a hash of the file
+        contents), so different files with the same name coexist and
+        re-uploading a file replaces its chunks. Chunks of a previous ingest
+        are dropped only after the new ones are written; a failed ingest
+        removes what it wrote and leaves the previous version in place.
+        """
+        max_chunk_size = max_chunk_size or settings.DOCUMENT_CHUNK_SIZE
+        document_key = hashlib.sha1(f"{user_id}:{document_id}".encode("utf-8")).hexdigest()[:16]
+        # New chunks get their own ids so they never overwrite the previous version
+        ingest_id = uuid.uuid4().hex[:12]
+
+        buffer: List[Dict[str, Any]] = []
+        chunk_count = 0
+        page_count = 0
+        try:
+            for page_number, chunk_index, chunk in TextChunker.iter_page_chunks(pages, max_chunk_size):
+                page_count = max(page_count, page_number)
+                buffer.append({
+                    "user_id": user_id,
+                    "text": chunk,
+                    "doc_id": f"doc_{document_key}_{ingest_id}_p{page_number}_{chunk_index}",
+                    "metadata": {
+                        "type": "document",
+                        "document_key": document_key,
+                        "ingest_id": ingest_id,
+                        "filename": filename,
+                        "page": page_number,
+                        "chunk": chunk_index
+                    }
+                })
+                if len(buffer) >= self.batch_size:
+                    chunk_count += len(self.add_documents_batch(buffer))
+                    buffer = []
+
+            if buffer:
+                chunk_count += len(self.add_documents_batch(buffer))
+        except Exception:
+            self.store.delete_where(user_id, {"document_key": document_key, "ingest_id": ingest_id})
+            self.query_cache.invalidate_user(user_id)
+            raise
+
+        # Now that the new version is complete, drop the previous one
+        stale = [
+            record["id"]
+            for record in self.store.scan(where={"user_id": user_id, "document_key": document_key})
+            if record["metadata"].get("ingest_id") != ingest_id
+        ]
+        for start in range(0, len(stale), self.batch_size):
+            self.store.delete(stale[start:start + self.batch_size], user_id)
+        self.query_cache.invalidate_user(user_id)
+
+        logger.info(f"Ingested {filename} for user {user_id}: {chunk_count} chunks from {page_count} pages")
+        return {"document_key": document_key, "chunks": chunk_count, "pages": page_count}
+
+    def get_task_hashes(self, task_ids: List[int], user_id: Optional[int] = None) -> Dict[int, str]:
+        """Return the stored content hash for each task that is already indexed"""
+        if not task_ids:
+            return {}
+
+        hashes = {}
+        for record in self.store.get([f"task_{task_id}" for task_id in task_ids], user_id):
+            metadata = record["metadata"]
+            if metadata and metadata.get("content_hash"):
+                hashes[metadata["task_id"]] = metadata["content_hash"]
+        return hashes
+
+    def get_indexed_task_ids(self) -> List[int]:
+        """List the ids of all tasks currently stored in the vector DB"""
+        return [int(record["id"][len("task_"):]) for record in self.store.scan(where={"type": "task"})]
+
+    def delete_tasks_from_context(self, task_ids: List[int], user_id: Optional[int] = None) -> int:
+        """Remove task vectors (e.g. completed, cancelled or deleted tasks)"""
+        if not task_ids:
+            return 0
+
+        deleted = self.store.delete([f"task_{task_id}" for task_id in task_ids], user_id)
+        self._invalidate_users(self._owners(deleted))
+
+        logger.info(f"Deleted {len(deleted)} tasks from context")
+        return len(deleted)
+
+    def sync_tasks(self, tasks: List[Dict[str, Any]], retention_days: int = 0) -> int:
+        """
+        Upsert only the tasks whose content changed since they were indexed
+
+        Args:
+            tasks: Task dicts with ``user_id``
+            retention_days: Task retention window; tasks ``apply_retention``
+                would drop (finished ones past the window) are skipped so sync and
+                compaction don't delete and re-embed them every night
+
+        Returns the number of tasks that were (re-)embedded.
+        """
+        documents = [
+            {"user_id": task["user_id"], **self._task_document(task)}
+            for task in tasks
+        ]
+        if retention_days > 0:
+            cutoff = datetime.utcnow() - timedelta(days=retention_days)
+            documents = [doc for doc in documents if not self._is_expired("task", doc["metadata"], cutoff)]
+
+        # Look stored hashes up per user so sharded stores hit one shard each
+        stored_hashes: Dict[int, str] = {}
+        by_user: Dict[int, List[int]] = {}
+        for task in tasks:
+            by_user.setdefault(task["user_id"], []).append(task["id"])
+        for user_id, task_ids in by_user.items():
+            stored_hashes.update(self.get_task_hashes(task_ids, user_id))
+
+        changed = [
+            doc for doc in documents
+            if stored_hashes.get(doc["metadata"]["task_id"]) != doc["metadata"]["content_hash"]
+        ]
+        if changed:
+            self.add_documents_batch(changed)
+        return len(changed)
+
+    def reindex(self, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """Move stored vectors into the layout the store is configured for"""
+        stats = self.store.reindex(batch_size or self.batch_size)
+        self.query_cache = QueryResultCache(
+            max_entries=self.query_cache.max_entries,
+            ttl_seconds=self.query_cache.ttl_seconds
+        )
+        logger.info(f"Reindexed vector store: {stats}")
+        return stats
+
+    def count(self) -> int:
+        """Total number of stored vectors"""
+        return self.store.count()
+
+    def disk_usage(self) -> int:
+        """Bytes used by the vector store on disk"""
+        return self.store.disk_usage()
+
+    def apply_retention(self, retention_days: Dict[str, int], now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Delete vectors that fell out of their type's retention window
+
+        Args:
+            retention_days: Days to keep per metadata type; "task" applies to
+                completed/cancelled tasks only, "plan" to the plan
+                date and every other type to the write timestamp. Values of
+                0 or less disable that policy.
+            now: Reference time (defaults to utcnow)
+
+        Returns:
+            Before/after vector counts and disk usage plus deletions per type
+        """
+        now = now or datetime.utcnow()
+        report = {
+            "vectors_before": self.count(),
+            "bytes_before": self.disk_usage(),
+            "deleted": {}
+        }
+
+        # Group by user so sharded stores delete from one shard at a time
+        expired: Dict[Any, List[str]] = {}
+        for record in self.store.scan():
+            metadata = record["metadata"] or {}
+            doc_type = metadata.get("type", "document")
+            days = retention_days.get(doc_type, retention_days.get("document", 0))
+            if days > 0 and self._is_expired(doc_type, metadata, now - timedelta(days=days)):
+                expired.setdefault(metadata.get("user_id"), []).append(record["id"])
+                report["deleted"][doc_type] = report["deleted"].get(doc_type, 0) + 1
+
+        for user_id, doc_ids in expired.items():
+            for start in range(0, len(doc_ids), self.batch_size):
+                self.store.delete(doc_ids[start:start + self.batch_size], user_id)
+        self._invalidate_users(set(expired))
+
+        report["vectors_after"] = self.count()
+        report["bytes_after"] = self.disk_usage()
+        logger.info(f"Applied RAG retention: {report}")
+        return report
+
+    @staticmethod
+    def _is_expired(doc_type: str, metadata: Dict[str, Any], cutoff: datetime) -> bool:
+        """Whether a vector is older than the cutoff under its type's policy"""
+        def parse(value) -> Optional[datetime]:
+            try:
+                parsed = datetime.fromisoformat(str(value))
+            except (TypeError, ValueError):
+                return None
+            # Metadata mixes naive UTC timestamps and aware deadlines
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            return parsed
+
+        if doc_type == "task":
+            # Open tasks stay however overdue: the user still has to act on them
+            if metadata.get("status") not in ("completed", "cancelled"):
+                return False
+            written = parse(metadata.get("timestamp"))
+            deadline = parse(metadata.get("deadline"))
+            return any(moment is not None and moment < cutoff for moment in (written, deadline))
+
+        if doc_type == "plan":
+            plan_date = parse(metadata.get("date"))
+            return plan_date is not None and plan_date < cutoff
+
+        written = parse(metadata.get("timestamp"))
+        return written is not None and written < cutoff
+
+    def warm_up(self):
+        """Trigger lazy allocations: one uncached encode plus a store touch"""
+        self.embedding_model.encode(["WizAI warm-up"] * 2, batch_size=2)
+        self.store.warm_up()
+
+    def close(self):
+        """Release resources held by the service"""
+        if self._batcher is not None:
+            self._batcher.close()
+        self.embedding_cache.close()
+        self.store.close()
+        logger.info("RAG service closed")
+
+
+# ============================================================================
+# Shared runtime
+# ============================================================================
+
+_rag_service: Optional[RAGService] = None
+_rag_service_lock = Lock()
+
+
+def get_rag_service() -> RAGService:
+    """
+    Return the process-wide RAG service, creating it on first use
+
+    The embedding model and vector store are loaded once per worker and
+    shared by routers, agents, context helpers and scheduled jobs.
+    """
+    global _rag_service
+    if _rag_service is None:
+        with _rag_service_lock:
+            if _rag_service is None:
+                _rag_service = RAGService(persist_directory=settings.CHROMA_PERSIST_DIRECTORY)
+    return _rag_service
+
+
+def shutdown_rag_service():
+    """Close the shared RAG service (called on application shutdown)"""
+    global _rag_service
+    with _rag_service_lock:
+        if _rag_service is not None:
+            _rag_service.close()
+            _rag_service = None
+
+
+# ============================================================================
+# Warm start & readiness
+# ============================================================================
+
+_readiness: Dict[str, Any] = {"ready": False, "error": None, "metrics": {}}
+
+
+def warm_up_rag_service() -> Dict[str, float]:
+    """
+    Load the model, run a dummy encode and open the vector store ahead of traffic
+
+    Meant to run once at startup (in a worker thread); marks the service
+    ready when done and records how long each phase took.
+    """
+    metrics = {}
+    try:
+        start = time.perf_counter()
+        rag = get_rag_service()
+        metrics["load_seconds"] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        rag.warm_up()
+        metrics["warm_up_seconds"] = round(time.perf_counter() - start, 3)
+
+        metrics["total_seconds"] = round(metrics["load_seconds"] + metrics["warm_up_seconds"], 3)
+        _readiness.update(ready=True, error=None, metrics=metrics)
+        logger.info(f"RAG service warm: {metrics}")
+    except Exception as e:
+        _readiness.update(ready=False, error=str(e), metrics=metrics)
+        logger.error(f"RAG warm-up failed: {e}")
+    return metrics
+
+
+def get_rag_readiness() -> Dict[str, Any]:
+    """Readiness flag, last warm-up error and startup timings"""
+    return dict(_readiness)
@@ -0,0 +1,162 @@
+"""
+Async token-bucket rate limiting for LLM providers
+Each provider gets one bucket for requests per minute and one for tokens
+per minute. Callers wait in a FIFO queue until both buckets can cover
+their request, so throughput stays at the quota instead of bursting into
+429s; a caller that would wait longer than the bounded wait is turned
+away immediately so it can fall back to another provider.
+"""
+
+from collections import deque
+from typing import Dict, Any
+import asyncio
+import time
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request would have to wait longer than the limiter allows"""
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst_seconds: float):
+        """
+        Args:
+            per_minute: Refill rate (0 = unlimited)
+            burst_seconds: Capacity expressed as seconds of refill
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.available = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def cost(self, amount: float) -> float:
+        """Amount actually charged (requests larger than the bucket take it whole)"""
+        return min(amount, self.capacity)
+
+    def seconds_until(self, amount: float) -> float:
+        """Seconds until ``amount`` is available, assuming nothing else is taken"""
+        if self.unlimited:
+            return 0.0
+        return max(0.0, (self.cost(amount) - self.available) / self.rate)
+
+
+class ProviderRateLimiter:
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_wait_seconds: float = 10,
+        burst_seconds: float = 10,
+        window: int = 500
+    ):
+        """
+        Args:
+            requests_per_minute: Request quota (0 = unlimited)
+            tokens_per_minute: Prompt + completion token quota (0 = unlimited)
+            max_wait_seconds: Longest a caller may queue before RateLimitExceeded
+            burst_seconds: How many seconds of quota may be spent at once
+            window: Number of recent wait times kept for percentiles
+        """
+        self.max_wait_seconds = max_wait_seconds
+        self._requests = TokenBucket(requests_per_minute, burst_seconds)
+        self._tokens = TokenBucket(tokens_per_minute, burst_seconds)
+        # asyncio.Lock wakes waiters in arrival order: the holder is the head of the queue
+        self._turn = asyncio.Lock()
+        self._queued_requests = 0
+        self._queued_tokens = 0
+        self._waits: "deque[float]" = deque(maxlen=window)
+        self._stats = {"admitted": 0, "rejected": 0, "max_queue_depth": 0}
+
+    async def acquire(self, tokens: int):
+        """
+        Wait for quota for one request of ``tokens`` tokens
+
+        Raises:
+            RateLimitExceeded: If the queue ahead plus this request cannot be
+                served within max_wait_seconds
+        """
+        if not self._tokens.unlimited:
+            tokens = int(self._tokens.cost(tokens))
+        if self._expected_wait(tokens) > self.max_wait_seconds:
+            self._stats["rejected"] += 1
+            raise RateLimitExceeded(f"rate limit queue wait exceeds {self.max_wait_seconds}s")
+
+        start = time.monotonic()
+        self._queued_requests += 1
+        self._queued_tokens += tokens
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queued_requests)
+        try:
+            await asyncio.wait_for(self._take(tokens), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            self._stats["rejected"] += 1
+            raise RateLimitExceeded(f"waited {self.max_wait_seconds}s for rate limit")
+        finally:
+            self._queued_requests -= 1
+            self._queued_tokens -= tokens
+
+        self._waits.append(time.monotonic() - start)
+        self._stats["admitted"] += 1
+
+    async def _take(self, tokens: int):
+        async with self._turn:
+            while True:
+                self._requests.refill()
+                self._tokens.refill()
+                delay = max(self._requests.seconds_until(1), self._tokens.seconds_until(tokens))
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            if not self._requests.unlimited:
+                self._requests.available -= self._requests.cost(1)
+            if not self._tokens.unlimited:
+                self._tokens.available -= self._tokens.cost(tokens)
+
+    def settle(self, reserved: int, used: int):
+        """Return the unused part of a token reservation (e.g. a short completion)"""
+        if self._tokens.unlimited or used >= reserved:
+            return
+        self._tokens.refill()
+        self._tokens.available = min(self._tokens.capacity, self._tokens.available + (reserved - used))
+
+    def drain(self):
+        """Empty both buckets after the provider answered 429 despite the limiter"""
+        for bucket in (self._requests, self._tokens):
+            bucket.refill()
+            bucket.available = 0.0
+
+    def _expected_wait(self, tokens: int) -> float:
+        """Seconds until the queue ahead and this request have been served"""
+        self._requests.refill()
+        self._tokens.refill()
+        waits = []
+        for bucket, needed in ((self._requests, self._queued_requests + 1), (self._tokens, self._queued_tokens + tokens)):
+            if not bucket.unlimited:
+                waits.append(max(0.0, (needed - bucket.available) / bucket.rate))
+        return max(waits, default=0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, admission counters and wait-time percentiles"""
+        ordered = sorted(self._waits)
+
+        def percentile(p: float):
+            if not ordered:
+                return None
+            return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+        return {
+            **self._stats,
+            "queue_depth": self._queued_requests,
+            "queued_tokens": self._queued_tokens,
+            "wait_p50_seconds": percentile(50),
+            "wait_p95_seconds": percentile(95),
+            "wait_max_seconds": ordered[-1] if ordered else None
+        }
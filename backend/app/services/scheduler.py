@@ -6,9 +6,13 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from datetime import datetime, timezone, timedelta
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from loguru import logger
+from sqlalchemy import func
+from pathlib import Path
 import httpx
+import json
+import asyncio
 
 from app.database import SessionLocal
 from app.models.user import User
@@ -82,6 +86,97 @@ def get_urgent_tasks() -> List[Dict[str, Any]]:
         db.close()
 
 
+def load_rag_sync_watermark() -> Optional[datetime]:
+    """
+    Load the time of the last successful incremental RAG sync
+    
+    Returns:
+        Watermark datetime, or None if no sync has completed yet
+    """
+    state_path = Path(settings.RAG_SYNC_STATE_PATH)
+    try:
+        state = json.loads(state_path.read_text())
+        return datetime.fromisoformat(state["watermark"])
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable RAG sync state {state_path}: {e}")
+        return None
+
+
+def save_rag_sync_watermark(watermark: datetime) -> None:
+    """
+    Persist the RAG sync watermark so restarts resume incrementally
+    
+    Args:
+        watermark: Database time the sync run that just completed started
+                   at, minus the overlap margin
+    """
+    state_path = Path(settings.RAG_SYNC_STATE_PATH)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    state_path.write_text(json.dumps({"watermark": watermark.isoformat()}))
+
+
+def get_database_now() -> datetime:
+    """
+    Current time on the database server, the clock task timestamps come from
+    
+    Returns:
+        Timezone-aware UTC datetime
+    """
+    db = SessionLocal()
+    try:
+        now = db.query(func.now()).scalar()
+    finally:
+        db.close()
+    if isinstance(now, str):
+        now = datetime.fromisoformat(now)
+    # Backends without time zones (e.g. SQLite) report naive UTC
+    return now.replace(tzinfo=timezone.utc) if now.tzinfo is None else now.astimezone(timezone.utc)
+
+
+def get_changed_tasks(since: Optional[datetime]) -> Tuple[List[Dict[str, Any]], Dict[int, List[int]]]:
+    """
+    Get tasks created or modified since the given watermark
+    
+    Args:
+        since: Only return tasks touched at or after this time (None = all tasks)
+        
+    Returns:
+        Tuple of (active task dicts to index, completed/cancelled task ids to drop keyed by user ID)
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(Task)
+        if since is not None:
+            query = query.filter(func.coalesce(Task.updated_at, Task.created_at) >= since)
+        
+        active, closed = [], {}
+        for task in query.all():
+            if task.status in (TaskStatus.COMPLETED, TaskStatus.CANCELLED):
+                closed.setdefault(task.user_id, []).append(task.id)
+            else:
+                active.append(task.to_dict())
+        
+        return active, closed
+    finally:
+        db.close()
+
+
+def get_existing_task_ids() -> List[int]:
+    """
+    Get the ids of all tasks still present in the database
+    
+    Returns:
+        List of task IDs
+    """
+    db = SessionLocal()
+    try:
+        return [task_id for (task_id,) in db.query(Task.id).all()]
+    finally:
+        db.close()
+
+
 async def trigger_n8n_workflow(workflow_name: str, payload: Dict[str, Any]) -> bool:
     """
     Trigger an n8n workflow via webhook
@@ -185,6 +280,9 @@ async def generate_plan_for_user(user_id: int, date: str) -> bool:
             db.add(new_plan)
         
         db.commit()
+        
+        from app.utils.context import invalidate_recent_context
+        invalidate_recent_context(user_id)
         logger.info(f"✅ Generated plan for user {user_id} on {date}")
         return True
         
@@ -292,44 +390,110 @@ async def deadline_reminders():
 
 
 @scheduler.scheduled_job('interval', minutes=30, timezone='Africa/Nairobi')
-async def sync_tasks_to_rag():
+async def sync_tasks_to_rag(full: bool = False):
     """
-    Sync all pending tasks to RAG database for context awareness
-    Runs every 30 minutes to keep the vector database updated
+    Incrementally sync tasks to RAG database for context awareness
+    Runs every 30 minutes and only touches tasks changed since the last run:
+    changed tasks are re-embedded (if their content hash differs) and
+    completed or cancelled tasks are removed from the vector database.
+    
+    Args:
+        full: Ignore the watermark, re-check every task and drop vectors
+              of tasks that no longer exist in the database
     """
-    logger.info("🔄 Starting RAG sync job...")
+    logger.info(f"🔄 Starting {'full' if full else 'incremental'} RAG sync job...")
     
     # Only run if RAG service is available
     try:
-        from app.services.rag_service import RAGService
-        rag = RAGService()
+        from app.services.rag_service import get_rag_service
+        rag = get_rag_service()
     except Exception as e:
         logger.warning(f"RAG service not available, skipping sync: {e}")
         return
     
-    db = SessionLocal()
     try:
-        # Get all non-completed tasks
-        tasks = db.query(Task).filter(
-            Task.status != TaskStatus.COMPLETED
-        ).all()
+        # Watermark on the database clock, minus an overlap so rows from
+        # transactions still open at run start (timestamped earlier, committed
+        # later) are picked up next run; re-checking them is a no-op upsert
+        run_started = await asyncio.to_thread(get_database_now)
+        since = None if full else load_rag_sync_watermark()
+        
+        # Database and vector work is blocking, keep it off the event loop
+        active_tasks, closed_task_ids = await asyncio.to_thread(get_changed_tasks, since)
         
-        synced_count = 0
+        # Embed and upsert in batches, skipping tasks whose content is unchanged
+        embedded_count = 0
+        for start in range(0, len(active_tasks), rag.batch_size):
+            embedded_count += await asyncio.to_thread(
+                rag.sync_tasks,
+                active_tasks[start:start + rag.batch_size],
+                settings.RAG_RETENTION_TASK_DAYS
+            )
+        
+        removed_count = 0
+        for user_id, task_ids in closed_task_ids.items():
+            removed_count += await asyncio.to_thread(rag.delete_tasks_from_context, task_ids, user_id)
+        
+        # Hard-deleted rows leave no trace in the watermark query, so only a
+        # full run reconciles the index against the tasks table
+        if since is None:
+            indexed = await asyncio.to_thread(rag.get_indexed_task_ids)
+            existing = await asyncio.to_thread(get_existing_task_ids)
+            orphaned = set(indexed) - set(existing)
+            removed_count += await asyncio.to_thread(rag.delete_tasks_from_context, sorted(orphaned))
         
-        for task in tasks:
-            try:
-                # Add or update task in RAG
-                rag.add_task_to_context(task.user_id, task.to_dict())
-                synced_count += 1
-            except Exception as e:
-                logger.warning(f"Failed to sync task {task.id} to RAG: {e}")
+        save_rag_sync_watermark(run_started - timedelta(seconds=settings.RAG_SYNC_OVERLAP_SECONDS))
         
-        logger.info(f"✅ RAG sync completed: {synced_count}/{len(tasks)} tasks synced")
+        logger.info(
+            f"✅ RAG sync completed: {len(active_tasks)} changed, "
+            f"{embedded_count} embedded, {removed_count} removed"
+        )
         
     except Exception as e:
         logger.error(f"RAG sync job failed: {e}")
-    finally:
-        db.close()
+
+
+@scheduler.scheduled_job('cron', hour=3, minute=0, timezone='Africa/Nairobi')
+async def full_rag_sync():
+    """
+    Nightly full RAG sync
+    Re-checks every task hash and removes vectors of deleted tasks
+    """
+    await sync_tasks_to_rag(full=True)
+
+
+@scheduler.scheduled_job('cron', hour=3, minute=30, timezone='Africa/Nairobi')
+async def compact_rag_store():
+    """
+    Apply RAG retention policies every night
+    Drops long-finished tasks, old plans and stale documents so the
+    vector index stays sized to the live working set
+    """
+    logger.info("🧹 Starting RAG compaction job...")
+    
+    try:
+        from app.services.rag_service import get_rag_service
+        rag = get_rag_service()
+    except Exception as e:
+        logger.warning(f"RAG service not available, skipping compaction: {e}")
+        return
+    
+    try:
+        report = await asyncio.to_thread(rag.apply_retention, {
+            "task": settings.RAG_RETENTION_TASK_DAYS,
+            "plan": settings.RAG_RETENTION_PLAN_DAYS,
+            "document": settings.RAG_RETENTION_DOCUMENT_DAYS
+        })
+        
+        logger.info(
+            f"✅ RAG compaction completed: {report['vectors_before']} → {report['vectors_after']} vectors, "
+            f"{report['bytes_before'] / 1e6:.1f} → {report['bytes_after'] / 1e6:.1f} MB on disk, "
+            f"deleted {report['deleted']}"
+        )
+        return report
+        
+    except Exception as e:
+        logger.error(f"RAG compaction job failed: {e}")
 
 
 # ============================================================================
@@ -404,7 +568,13 @@ async def trigger_deadline_reminder_job():
     await deadline_reminders()
 
 
-async def trigger_rag_sync_job():
+async def trigger_rag_compaction_job():
+    """Manually trigger RAG compaction (for testing)"""
+    logger.info("Manually triggering RAG compaction...")
+    return await compact_rag_store()
+
+
+async def trigger_rag_sync_job(full: bool = False):
     """Manually trigger RAG sync (for testing)"""
     logger.info("Manually triggering RAG sync...")
-    await sync_tasks_to_rag()
\ No newline at end of file
+    await sync_tasks_to_rag(full=full)
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Single-flight coalescing for async calls
+Concurrent callers asking for the same key share one in-flight task:
+the first caller starts it, later callers await the same result (or the
+same exception) instead of issuing a duplicate request. The call is
+cancelled only once every caller waiting on it has been cancelled.
+"""
+
+from typing import Any, Awaitable, Callable, Dict
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() for key unless an identical call is already in flight"""
+        self._stats["calls"] += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+        else:
+            self._stats["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+
+        # Shielded so one caller giving up does not cancel the shared call
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError as e:
+            if self._waiters[task] == 1 and not task.done():
+                # Keep the cancel message (e.g. why the call was abandoned)
+                task.cancel(e.args[0] if e.args else None)
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def _forget(self, key: str, task: asyncio.Task):
+        """Drop a finished task, retrieving its exception so it is never reported unhandled"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Call counters and number of calls currently in flight"""
+        return {**self._stats, "inflight": len(self._inflight)}
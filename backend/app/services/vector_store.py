@@ -0,0 +1,676 @@
+"""
+Vector store backends for the RAG service
+All stores keep one record per id with its embedding, text and metadata
+(metadata always carries ``user_id``) and answer user-scoped nearest
+neighbour queries. Distances are squared L2 everywhere, matching Chroma's
+default, so results are comparable across backends.
+
+- ChromaVectorStore: chromadb.PersistentClient, optionally sharded
+- NumpyVectorStore: in-process exact search, memory-mapped per-user files
+- PgVectorStore: pgvector table next to the relational data
+"""
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from threading import RLock
+from typing import List, Dict, Any, Optional, Iterator
+from loguru import logger
+import hashlib
+import json
+import os
+
+COLLECTION_PREFIX = "user_context"
+
+
+class VectorStore(ABC):
+    @abstractmethod
+    def upsert(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ):
+        """Insert or replace records; every metadata dict must contain user_id"""
+        pass
+
+    @abstractmethod
+    def query(
+        self,
+        user_id: int,
+        embeddings: List[List[float]],
+        top_k: int,
+        where: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Nearest neighbours of each embedding among one user's records
+
+        ``where`` is a dict of metadata equality conditions. Returns one
+        list of {"id", "text", "metadata", "distance"} per embedding,
+        closest first.
+        """
+        pass
+
+    @abstractmethod
+    def get(self, ids: List[str], user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Fetch {"id", "text", "metadata"} for the ids that exist"""
+        pass
+
+    @abstractmethod
+    def delete(self, ids: List[str], user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Delete records by id; returns {"id", "metadata"} of what was removed"""
+        pass
+
+    @abstractmethod
+    def delete_where(self, user_id: int, where: Dict[str, Any]) -> int:
+        """Delete a user's records matching metadata conditions"""
+        pass
+
+    @abstractmethod
+    def scan(self, where: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate {"id", "metadata"} of every record (optionally filtered)"""
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        """Total number of records"""
+        pass
+
+    def disk_usage(self) -> int:
+        """Bytes used on disk (0 if unknown)"""
+        return 0
+
+    def warm_up(self):
+        """Touch the store so lazy initialisation happens before traffic"""
+        self.count()
+
+    def reindex(self, batch_size: int = 256) -> Dict[str, int]:
+        """Re-layout stored records (only sharded stores need this)"""
+        return {"scanned": 0, "moved": 0, "collections_dropped": 0}
+
+    def close(self):
+        """Release resources"""
+        pass
+
+
+def _matches(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Metadata equality filter shared by the in-process stores"""
+    return not where or all(metadata.get(key) == value for key, value in where.items())
+
+
+def _directory_size(directory: str) -> int:
+    """Size of all files below a directory in bytes"""
+    return sum(path.stat().st_size for path in Path(directory).rglob("*") if path.is_file())
+
+
+# ============================================================================
+# Chroma
+# ============================================================================
+
+class ChromaVectorStore(VectorStore):
+    def __init__(self, persist_directory: str, sharding: str = "none", shard_buckets: int = 64):
+        """
+        Args:
+            persist_directory: chromadb.PersistentClient path
+            sharding: "none" (one shared collection), "user" (one collection
+                per user) or "bucket" (shard_buckets collections keyed by a
+                hash of the user id)
+            shard_buckets: Number of buckets for "bucket" sharding
+        """
+        import chromadb
+
+        if sharding not in ("none", "user", "bucket"):
+            raise ValueError(f"Unknown RAG sharding mode: {sharding}")
+
+        self.persist_directory = persist_directory
+        self.sharding = sharding
+        self.shard_buckets = shard_buckets
+        self.client = chromadb.PersistentClient(path=persist_directory)
+        self._collections: Dict[str, Any] = {}
+
+        # Get or create the shared (unsharded) collection
+        self.collection = self._get_collection(COLLECTION_PREFIX)
+
+        logger.info(f"Chroma vector store ready (sharding: {sharding})")
+
+    def _get_collection(self, name: str):
+        """Get or create a collection by name, memoised per store"""
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self.client.get_or_create_collection(
+                name=name,
+                metadata={"description": "User tasks, plans, and preferences"}
+            )
+            self._collections[name] = collection
+        return collection
+
+    def _shard_name(self, user_id: int) -> str:
+        """Name of the collection holding a user's vectors"""
+        if self.sharding == "user":
+            return f"{COLLECTION_PREFIX}_u{user_id}"
+        if self.sharding == "bucket":
+            digest = hashlib.sha1(str(user_id).encode("utf-8")).hexdigest()
+            return f"{COLLECTION_PREFIX}_b{int(digest, 16) % self.shard_buckets:03d}"
+        return COLLECTION_PREFIX
+
+    def _collection_for(self, user_id: int):
+        """Collection a user's documents are routed to"""
+        return self._get_collection(self._shard_name(user_id))
+
+    def _all_collections(self) -> List[Any]:
+        """Every RAG collection in the store, whatever layout wrote it"""
+        names = []
+        for entry in self.client.list_collections():
+            # Older Chroma returns Collection objects, newer returns names
+            name = getattr(entry, "name", entry)
+            if name == COLLECTION_PREFIX or name.startswith(f"{COLLECTION_PREFIX}_"):
+                names.append(name)
+        return [self._get_collection(name) for name in names]
+
+    def _candidates(self, user_id: Optional[int]) -> List[Any]:
+        """Collections that may hold a user's ids (all shards if unknown)"""
+        if user_id is not None:
+            return [self._collection_for(user_id)]
+        if self.sharding == "none":
+            return [self.collection]
+        return self._all_collections()
+
+    @staticmethod
+    def _where(user_id: Optional[int], where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Chroma needs $and as soon as more than one condition is given"""
+        clauses = [{"user_id": user_id}] if user_id is not None else []
+        clauses += [{key: value} for key, value in (where or {}).items()]
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        # One upsert per target collection (a single one when unsharded)
+        by_shard: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            by_shard.setdefault(self._shard_name(metadata["user_id"]), []).append(i)
+
+        for name, rows in by_shard.items():
+            self._get_collection(name).upsert(
+                ids=[ids[i] for i in rows],
+                embeddings=[embeddings[i] for i in rows],
+                documents=[documents[i] for i in rows],
+                metadatas=[metadatas[i] for i in rows]
+            )
+
+    def query(self, user_id, embeddings, top_k, where=None):
+        results = self._collection_for(user_id).query(
+            query_embeddings=embeddings,
+            n_results=top_k,
+            where=self._where(user_id, where)
+        )
+
+        formatted = []
+        for row in range(len(embeddings)):
+            formatted.append([
+                {
+                    "id": results['ids'][row][i],
+                    "text": results['documents'][row][i],
+                    "metadata": results['metadatas'][row][i],
+                    "distance": results['distances'][row][i]  # Lower is better
+                }
+                for i in range(len(results['ids'][row]))
+            ])
+        return formatted
+
+    def get(self, ids, user_id=None):
+        records = []
+        for collection in self._candidates(user_id):
+            found = collection.get(ids=ids, where=self._where(user_id, None), include=["documents", "metadatas"])
+            records += [
+                {"id": doc_id, "text": text, "metadata": metadata}
+                for doc_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])
+            ]
+        return records
+
+    def delete(self, ids, user_id=None):
+        deleted = []
+        for collection in self._candidates(user_id):
+            found = collection.get(ids=ids, where=self._where(user_id, None), include=["metadatas"])
+            if found["ids"]:
+                collection.delete(ids=found["ids"])
+                deleted += [
+                    {"id": doc_id, "metadata": metadata}
+                    for doc_id, metadata in zip(found["ids"], found["metadatas"])
+                ]
+        return deleted
+
+    def delete_where(self, user_id, where):
+        collection = self._collection_for(user_id)
+        condition = self._where(user_id, where)
+        found = collection.get(where=condition, include=[])
+        if found["ids"]:
+            collection.delete(ids=found["ids"])
+        return len(found["ids"])
+
+    def scan(self, where=None):
+        for collection in self._all_collections():
+            found = collection.get(where=self._where(None, where), include=["metadatas"])
+            for doc_id, metadata in zip(found["ids"], found["metadatas"]):
+                yield {"id": doc_id, "metadata": metadata}
+
+    def count(self):
+        return sum(collection.count() for collection in self._all_collections())
+
+    def disk_usage(self):
+        return _directory_size(self.persist_directory)
+
+    def warm_up(self):
+        self.collection.count()
+
+    def reindex(self, batch_size: int = 256) -> Dict[str, int]:
+        """
+        Move every stored vector into the collection the current sharding
+        mode routes it to
+
+        Embeddings are copied as stored, so nothing is re-encoded. Shard
+        collections left empty afterwards are dropped.
+        """
+        stats = {"scanned": 0, "moved": 0, "collections_dropped": 0}
+
+        for source in self._all_collections():
+            source_ids = source.get(include=[])["ids"]
+            stats["scanned"] += len(source_ids)
+
+            for start in range(0, len(source_ids), batch_size):
+                chunk = source.get(
+                    ids=source_ids[start:start + batch_size],
+                    include=["documents", "metadatas", "embeddings"]
+                )
+
+                by_target: Dict[str, List[int]] = {}
+                for i, metadata in enumerate(chunk["metadatas"]):
+                    target = self._shard_name(metadata["user_id"])
+                    if target != source.name:
+                        by_target.setdefault(target, []).append(i)
+
+                for target, rows in by_target.items():
+                    self._get_collection(target).upsert(
+                        ids=[chunk["ids"][i] for i in rows],
+                        documents=[chunk["documents"][i] for i in rows],
+                        metadatas=[chunk["metadatas"][i] for i in rows],
+                        embeddings=[chunk["embeddings"][i] for i in rows]
+                    )
+                    source.delete(ids=[chunk["ids"][i] for i in rows])
+                    stats["moved"] += len(rows)
+
+            if source.name != COLLECTION_PREFIX and source.count() == 0:
+                self.client.delete_collection(source.name)
+                self._collections.pop(source.name, None)
+                stats["collections_dropped"] += 1
+
+        return stats
+
+
+# ============================================================================
+# NumPy flat index
+# ============================================================================
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact brute-force search over per-user NumPy matrices
+
+    Each user has ``user_<id>.npy`` (float32 vectors, opened memory-mapped)
+    and ``user_<id>.json`` (ids, texts, metadata). For corpora of a few
+    hundred vectors per user a flat scan beats any ANN index. Writes rewrite
+    the user's files atomically.
+    """
+
+    def __init__(self, directory: str):
+        import numpy as np
+        self._np = np
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._partitions: Dict[int, Dict[str, Any]] = {}
+        self._lock = RLock()
+        logger.info(f"NumPy vector store ready at {directory}")
+
+    def _paths(self, user_id: int):
+        return self.directory / f"user_{user_id}.npy", self.directory / f"user_{user_id}.json"
+
+    def _user_ids(self) -> List[int]:
+        return sorted(int(path.stem[len("user_"):]) for path in self.directory.glob("user_*.json"))
+
+    def _partition(self, user_id: int) -> Dict[str, Any]:
+        """Load (and memoise) one user's records"""
+        partition = self._partitions.get(user_id)
+        if partition is None:
+            vector_path, record_path = self._paths(user_id)
+            if record_path.exists():
+                records = json.loads(record_path.read_text())
+                vectors = self._np.load(vector_path, mmap_mode="r")
+            else:
+                records = {"ids": [], "documents": [], "metadatas": []}
+                vectors = None
+            partition = {**records, "vectors": vectors}
+            self._partitions[user_id] = partition
+        return partition
+
+    def _save(self, user_id: int, partition: Dict[str, Any]):
+        """Atomically persist a partition and re-open its vectors memory-mapped"""
+        vector_path, record_path = self._paths(user_id)
+
+        if not partition["ids"]:
+            vector_path.unlink(missing_ok=True)
+            record_path.unlink(missing_ok=True)
+            self._partitions.pop(user_id, None)
+            return
+
+        tmp_vectors = vector_path.with_suffix(".npy.tmp")
+        with open(tmp_vectors, "wb") as f:
+            self._np.save(f, self._np.ascontiguousarray(partition["vectors"], dtype=self._np.float32))
+        tmp_records = record_path.with_suffix(".json.tmp")
+        tmp_records.write_text(json.dumps({
+            "ids": partition["ids"],
+            "documents": partition["documents"],
+            "metadatas": partition["metadatas"]
+        }, default=str))
+        os.replace(tmp_vectors, vector_path)
+        os.replace(tmp_records, record_path)
+
+        partition["vectors"] = self._np.load(vector_path, mmap_mode="r")
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        np = self._np
+        by_user: Dict[int, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            by_user.setdefault(metadata["user_id"], []).append(i)
+
+        with self._lock:
+            for user_id, rows in by_user.items():
+                partition = self._partition(user_id)
+                positions = {doc_id: pos for pos, doc_id in enumerate(partition["ids"])}
+                vectors = (
+                    np.array(partition["vectors"], dtype=np.float32)
+                    if partition["vectors"] is not None
+                    else np.zeros((0, len(embeddings[rows[0]])), dtype=np.float32)
+                )
+
+                new_vectors = []
+                for i in rows:
+                    vector = np.asarray(embeddings[i], dtype=np.float32)
+                    if ids[i] in positions:
+                        pos = positions[ids[i]]
+                        vectors[pos] = vector
+                        partition["documents"][pos] = documents[i]
+                        partition["metadatas"][pos] = metadatas[i]
+                    else:
+                        positions[ids[i]] = len(partition["ids"])
+                        partition["ids"].append(ids[i])
+                        partition["documents"].append(documents[i])
+                        partition["metadatas"].append(metadatas[i])
+                        new_vectors.append(vector)
+
+                if new_vectors:
+                    vectors = np.vstack([vectors, np.stack(new_vectors)])
+                partition["vectors"] = vectors
+                self._save(user_id, partition)
+
+    def query(self, user_id, embeddings, top_k, where=None):
+        np = self._np
+        with self._lock:
+            partition = self._partition(user_id)
+            if not partition["ids"]:
+                return [[] for _ in embeddings]
+
+            candidates = np.array([
+                pos for pos, metadata in enumerate(partition["metadatas"]) if _matches(metadata, where)
+            ], dtype=np.int64)
+            if candidates.size == 0:
+                return [[] for _ in embeddings]
+
+            vectors = np.asarray(partition["vectors"])[candidates]
+            queries = np.asarray(embeddings, dtype=np.float32)
+
+            # Squared L2: |q|^2 + |v|^2 - 2 q.v, for all queries at once
+            distances = (
+                (queries ** 2).sum(axis=1)[:, None]
+                + (vectors ** 2).sum(axis=1)[None, :]
+                - 2 * queries @ vectors.T
+            )
+            distances = np.maximum(distances, 0)
+
+            k = min(top_k, candidates.size)
+            results = []
+            for row in distances:
+                nearest = np.argpartition(row, k - 1)[:k] if k < row.size else np.arange(row.size)
+                nearest = nearest[np.argsort(row[nearest])]
+                results.append([
+                    {
+                        "id": partition["ids"][candidates[i]],
+                        "text": partition["documents"][candidates[i]],
+                        "metadata": partition["metadatas"][candidates[i]],
+                        "distance": float(row[i])
+                    }
+                    for i in nearest
+                ])
+            return results
+
+    def get(self, ids, user_id=None):
+        wanted = set(ids)
+        records = []
+        with self._lock:
+            for uid in ([user_id] if user_id is not None else self._user_ids()):
+                partition = self._partition(uid)
+                for pos, doc_id in enumerate(partition["ids"]):
+                    if doc_id in wanted:
+                        records.append({
+                            "id": doc_id,
+                            "text": partition["documents"][pos],
+                            "metadata": partition["metadatas"][pos]
+                        })
+        return records
+
+    def _remove(self, user_id: int, keep) -> List[Dict[str, Any]]:
+        """Drop every record of a user for which keep(id, metadata) is False"""
+        partition = self._partition(user_id)
+        kept = [pos for pos, (doc_id, metadata) in enumerate(zip(partition["ids"], partition["metadatas"])) if keep(doc_id, metadata)]
+        if len(kept) == len(partition["ids"]):
+            return []
+
+        kept_set = set(kept)
+        removed = [
+            {"id": doc_id, "metadata": metadata}
+            for pos, (doc_id, metadata) in enumerate(zip(partition["ids"], partition["metadatas"]))
+            if pos not in kept_set
+        ]
+        partition["ids"] = [partition["ids"][pos] for pos in kept]
+        partition["documents"] = [partition["documents"][pos] for pos in kept]
+        partition["metadatas"] = [partition["metadatas"][pos] for pos in kept]
+        partition["vectors"] = self._np.asarray(partition["vectors"])[kept]
+        self._save(user_id, partition)
+        return removed
+
+    def delete(self, ids, user_id=None):
+        wanted = set(ids)
+        deleted = []
+        with self._lock:
+            for uid in ([user_id] if user_id is not None else self._user_ids()):
+                deleted += self._remove(uid, lambda doc_id, metadata: doc_id not in wanted)
+        return deleted
+
+    def delete_where(self, user_id, where):
+        with self._lock:
+            return len(self._remove(user_id, lambda doc_id, metadata: not _matches(metadata, where)))
+
+    def scan(self, where=None):
+        with self._lock:
+            user_ids = self._user_ids()
+        for user_id in user_ids:
+            with self._lock:
+                partition = self._partition(user_id)
+                records = [
+                    {"id": doc_id, "metadata": metadata}
+                    for doc_id, metadata in zip(partition["ids"], partition["metadatas"])
+                    if _matches(metadata, where)
+                ]
+            yield from records
+
+    def count(self):
+        with self._lock:
+            return sum(len(self._partition(user_id)["ids"]) for user_id in self._user_ids())
+
+    def disk_usage(self):
+        return _directory_size(str(self.directory))
+
+    def close(self):
+        with self._lock:
+            self._partitions.clear()
+
+
+# ============================================================================
+# pgvector
+# ============================================================================
+
+class PgVectorStore(VectorStore):
+    """
+    pgvector table living next to the tasks and plans tables
+
+    Queries are exact scans over one user's rows (via the user_id index),
+    which is the right trade-off for per-user corpora of a few hundred
+    vectors.
+    """
+
+    def __init__(self, engine, dimension: int, table: str = "rag_vectors"):
+        from sqlalchemy import text
+        self._text = text
+        self.engine = engine
+        self.table = table
+
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                f"id TEXT PRIMARY KEY, "
+                f"user_id INTEGER NOT NULL, "
+                f"document TEXT NOT NULL, "
+                f"metadata JSONB NOT NULL DEFAULT '{{}}'::jsonb, "
+                f"embedding vector({dimension}) NOT NULL)"
+            ))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {table}_user_id_idx ON {table} (user_id)"))
+
+        logger.info(f"pgvector store ready (table: {table}, dimension: {dimension})")
+
+    @staticmethod
+    def _vector(embedding: List[float]) -> str:
+        """pgvector text representation"""
+        return "[" + ",".join(str(float(value)) for value in embedding) + "]"
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        rows = [
+            {
+                "id": doc_id,
+                "user_id": metadata["user_id"],
+                "document": document,
+                "metadata": json.dumps(metadata, default=str),
+                "embedding": self._vector(embedding)
+            }
+            for doc_id, embedding, document, metadata in zip(ids, embeddings, documents, metadatas)
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(self._text(
+                f"INSERT INTO {self.table} (id, user_id, document, metadata, embedding) "
+                f"VALUES (:id, :user_id, :document, CAST(:metadata AS jsonb), CAST(:embedding AS vector)) "
+                f"ON CONFLICT (id) DO UPDATE SET user_id = EXCLUDED.user_id, document = EXCLUDED.document, "
+                f"metadata = EXCLUDED.metadata, embedding = EXCLUDED.embedding"
+            ), rows)
+
+    def query(self, user_id, embeddings, top_k, where=None):
+        statement = self._text(
+            f"SELECT id, document, metadata, power(embedding <-> CAST(:query AS vector), 2) AS distance "
+            f"FROM {self.table} "
+            f"WHERE user_id = :user_id AND metadata @> CAST(:where AS jsonb) "
+            f"ORDER BY embedding <-> CAST(:query AS vector) LIMIT :top_k"
+        )
+        results = []
+        with self.engine.connect() as conn:
+            for embedding in embeddings:
+                rows = conn.execute(statement, {
+                    "query": self._vector(embedding),
+                    "user_id": user_id,
+                    "where": json.dumps(where or {}, default=str),
+                    "top_k": top_k
+                }).fetchall()
+                results.append([
+                    {"id": row.id, "text": row.document, "metadata": row.metadata, "distance": float(row.distance)}
+                    for row in rows
+                ])
+        return results
+
+    def get(self, ids, user_id=None):
+        condition = " AND user_id = :user_id" if user_id is not None else ""
+        with self.engine.connect() as conn:
+            rows = conn.execute(self._text(
+                f"SELECT id, document, metadata FROM {self.table} WHERE id = ANY(:ids){condition}"
+            ), {"ids": list(ids), "user_id": user_id}).fetchall()
+        return [{"id": row.id, "text": row.document, "metadata": row.metadata} for row in rows]
+
+    def delete(self, ids, user_id=None):
+        condition = " AND user_id = :user_id" if user_id is not None else ""
+        with self.engine.begin() as conn:
+            rows = conn.execute(self._text(
+                f"DELETE FROM {self.table} WHERE id = ANY(:ids){condition} RETURNING id, metadata"
+            ), {"ids": list(ids), "user_id": user_id}).fetchall()
+        return [{"id": row.id, "metadata": row.metadata} for row in rows]
+
+    def delete_where(self, user_id, where):
+        with self.engine.begin() as conn:
+            result = conn.execute(self._text(
+                f"DELETE FROM {self.table} WHERE user_id = :user_id AND metadata @> CAST(:where AS jsonb)"
+            ), {"user_id": user_id, "where": json.dumps(where, default=str)})
+        return result.rowcount
+
+    def scan(self, where=None, batch_size: int = 1000):
+        # Keyset pagination keeps memory bounded on large tables
+        after = ""
+        while True:
+            with self.engine.connect() as conn:
+                rows = conn.execute(self._text(
+                    f"SELECT id, metadata FROM {self.table} "
+                    f"WHERE id > :after AND metadata @> CAST(:where AS jsonb) ORDER BY id LIMIT :limit"
+                ), {"after": after, "where": json.dumps(where or {}, default=str), "limit": batch_size}).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield {"id": row.id, "metadata": row.metadata}
+            after = rows[-1].id
+
+    def count(self):
+        with self.engine.connect() as conn:
+            return conn.execute(self._text(f"SELECT count(*) FROM {self.table}")).scalar()
+
+    def disk_usage(self):
+        with self.engine.connect() as conn:
+            return conn.execute(self._text("SELECT pg_total_relation_size(:table)"), {"table": self.table}).scalar()
+
+
+def create_vector_store(
+    backend: str,
+    persist_directory: str,
+    sharding: str = "none",
+    shard_buckets: int = 64,
+    dimension: int = 384
+) -> VectorStore:
+    """
+    Build the vector store selected in settings
+
+    Args:
+        backend: "chroma", "numpy" or "pgvector"
+        persist_directory: Base directory for on-disk stores
+        sharding: Chroma collection layout (see ChromaVectorStore)
+        shard_buckets: Number of buckets for "bucket" sharding
+        dimension: Embedding dimension (pgvector column type)
+    """
+    if backend == "chroma":
+        return ChromaVectorStore(persist_directory, sharding=sharding, shard_buckets=shard_buckets)
+    if backend == "numpy":
+        return NumpyVectorStore(os.path.join(persist_directory, "numpy_index"))
+    if backend == "pgvector":
+        from app.database import engine
+        return PgVectorStore(engine, dimension)
+    raise ValueError(f"Unknown vector store backend: {backend}")
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Iterable, Iterator, Tuple
 import re
 
 class TextChunker:
@@ -35,3 +35,23 @@ def chunk_with_overlap(text: str, chunk_size: int = 500, overlap: int = 50) -> L
             start += (chunk_size - overlap)
         
         return chunks
+
+    @staticmethod
+    def iter_page_chunks(
+        pages: Iterable[Tuple[int, str]],
+        max_chunk_size: int = 500
+    ) -> Iterator[Tuple[int, int, str]]:
+        """
+        Stream (page_number, chunk_index, chunk) from (page_number, text) pairs
+
+        Only one page is held at a time, and sentences longer than
+        max_chunk_size are cut so every chunk stays bounded.
+        """
+        for page_number, page_text in pages:
+            chunk_index = 0
+            for chunk in TextChunker.chunk_by_sentences(page_text, max_chunk_size):
+                for start in range(0, len(chunk), max_chunk_size):
+                    piece = chunk[start:start + max_chunk_size].strip()
+                    if piece:
+                        yield page_number, chunk_index, piece
+                        chunk_index += 1
@@ -1,24 +1,75 @@
-from app.services.rag_service import RAGService
-from typing import Dict, List
+from app.services.rag_service import get_rag_service, format_task_text, format_plan_text
+from app.services.query_cache import QueryResultCache
+from app.database import SessionLocal
+from app.models.task import Task, TaskStatus
+from app.models.plan import Plan
+from app.config import settings
+from typing import Dict, List, Any
+import asyncio
+
+# Recent context is read straight from the database and cached per user
+_recent_context_cache = QueryResultCache(
+    max_entries=settings.QUERY_CACHE_SIZE,
+    ttl_seconds=settings.RECENT_CONTEXT_TTL_SECONDS
+)
 
 async def get_user_context(user_id: int, query: str = None) -> str:
     """Retrieve and format user context for LLM"""
-    rag = RAGService()
-    
     # Get relevant documents
     if query:
-        results = rag.query(user_id, query, top_k=5)
-    else:
-        # Get recent context
-        results = rag.collection.query(
-            query_embeddings=None,
-            where={"user_id": user_id},
-            n_results=10
+        results = await get_rag_service().aquery(user_id, query, top_k=5)
+        return "\n".join(
+            f"- {result['text']} (relevance: {1 - result['distance']:.2f})"
+            for result in results
         )
     
-    # Format context
-    context_parts = []
-    for result in results:
-        context_parts.append(f"- {result['text']} (relevance: {1 - result['distance']:.2f})")
+    # Get recent context, no embedding or vector search needed
+    results = await get_recent_context(user_id)
+    return "\n".join(f"- {result['text']}" for result in results)
+
+async def get_recent_context(user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+    """The user's most urgent open tasks and latest plans, cached per user"""
+    cache_key = _recent_context_cache.make_key(user_id, "", limit, None)
+    cached = _recent_context_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
-    return "\n".join(context_parts)
+    # Not cached if a write invalidated the user while we were reading
+    generation = _recent_context_cache.generation(user_id)
+    results = await asyncio.to_thread(_load_recent_context, user_id, limit)
+    _recent_context_cache.put(cache_key, results, generation)
+    return results
+
+def invalidate_recent_context(user_id: int):
+    """
+    Drop the cached recent context after a user's tasks or plans change
+
+    Call after every commit that writes a user's tasks or plans (task
+    routes, scheduler plan generation, MCP task tools).
+    """
+    _recent_context_cache.invalidate_user(user_id)
+
+def _load_recent_context(user_id: int, limit: int) -> List[Dict[str, Any]]:
+    """Read open tasks (soonest deadline first) and the latest plans"""
+    db = SessionLocal()
+    try:
+        tasks = db.query(Task).filter(
+            Task.user_id == user_id,
+            Task.status.in_([TaskStatus.PENDING, TaskStatus.IN_PROGRESS])
+        ).order_by(Task.deadline.asc()).limit(limit).all()
+        
+        plans = db.query(Plan).filter(
+            Plan.user_id == user_id
+        ).order_by(Plan.date.desc()).limit(2).all()
+        
+        results = [
+            {"text": format_task_text(task.to_dict()), "metadata": {"type": "task", "task_id": task.id}}
+            for task in tasks
+        ]
+        results += [
+            {"text": format_plan_text(plan.to_dict()), "metadata": {"type": "plan", "plan_id": plan.id}}
+            for plan in plans
+        ]
+        return results
+    finally:
+        db.close()
@@ -0,0 +1,256 @@
+"""
+Token-budgeted prompt assembly
+Prompts are built from named sections (system, context, history, input,
+...). Fixed sections are always kept; flexible sections share what is left
+of the model's token budget and are trimmed item by item - by relevance or
+by recency - instead of being cut at a character offset.
+"""
+
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Any
+from loguru import logger
+import heapq
+import math
+import re
+from app.config import settings
+
+# Hard context limits; the effective budget is PROMPT_TOKEN_BUDGET below these
+MODEL_CONTEXT_LIMITS = {
+    "gemini-2.0-flash-exp": 1_048_576,
+    "gpt-4o-mini": 128_000,
+}
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """tiktoken encoding for a model (o200k for non-OpenAI models), None if unavailable"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Token count of text for a model (about 4 characters per token without tiktoken)"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str) -> str:
+    """First max_tokens tokens of text"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+_DATE_PATTERN = re.compile(
+    r"\b(\d{4}-\d{2}-\d{2}|\d{1,2}[/.]\d{1,2}([/.]\d{2,4})?|"
+    r"jan(uary)?|feb(ruary)?|mar(ch)?|apr(il)?|may|june?|july?|aug(ust)?|sep(t|tember)?|oct(ober)?|nov(ember)?|dec(ember)?|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b",
+    re.IGNORECASE
+)
+_DEADLINE_PATTERN = re.compile(
+    r"\b(due|deadline|submit|submission|assignment|homework|exam|midterm|final|quiz|project|essay|lab|presentation)\b",
+    re.IGNORECASE
+)
+
+
+def deadline_relevance(text: str) -> float:
+    """Heuristic score for how likely a chunk is to mention assignments and dates"""
+    return 2.0 * len(_DEADLINE_PATTERN.findall(text)) + len(_DATE_PATTERN.findall(text))
+
+
+class ChunkSelector:
+    """
+    Keep the highest-scoring chunks of a stream within a token limit
+
+    Lets callers stream a long document once while holding only the chunks
+    that may end up in a prompt; ``selected()`` returns them in document order.
+    """
+
+    def __init__(self, max_tokens: int, model: str, score: Callable[[str], float] = deadline_relevance):
+        self.max_tokens = max_tokens
+        self.model = model
+        self.score = score
+        self._heap: List[tuple] = []  # (score, -position, tokens, text)
+        self._tokens = 0
+        self._position = 0
+
+    def add(self, text: str):
+        tokens = count_tokens(text, self.model)
+        # Earlier chunks win ties, so a document with no signal keeps its beginning
+        heapq.heappush(self._heap, (self.score(text), -self._position, tokens, text))
+        self._position += 1
+        self._tokens += tokens
+        while self._tokens > self.max_tokens and len(self._heap) > 1:
+            self._tokens -= heapq.heappop(self._heap)[2]
+
+    def selected(self) -> List[str]:
+        return [text for _, _, _, text in sorted(self._heap, key=lambda entry: -entry[1])]
+
+
+class BuiltPrompt:
+    def __init__(self, text: str, token_count: int, sections: Dict[str, Dict[str, int]]):
+        self.text = text
+        self.token_count = token_count
+        self.sections = sections
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class PromptBuilder:
+    def __init__(self, model: str, budget: Optional[int] = None, reserve_output: int = 0):
+        """
+        Args:
+            model: Model the prompt is for (selects tokenizer and context limit)
+            budget: Prompt token budget (default PROMPT_TOKEN_BUDGET)
+            reserve_output: Tokens kept free for the completion
+        """
+        self.model = model
+        limit = MODEL_CONTEXT_LIMITS.get(model, 128_000) - reserve_output
+        self.budget = min(budget or settings.PROMPT_TOKEN_BUDGET, limit)
+        self._sections: List[Dict[str, Any]] = []
+
+    def add(
+        self,
+        name: str,
+        text: Optional[str] = None,
+        items: Optional[Iterable[str]] = None,
+        strategy: str = "fixed",
+        scores: Optional[List[float]] = None,
+        weight: float = 1.0,
+        template: str = "{content}",
+        separator: str = "\n",
+        keep_order: bool = False
+    ) -> "PromptBuilder":
+        """
+        Append a section
+
+        Args:
+            name: Section name (reported in ``BuiltPrompt.sections``)
+            text: Content of a single-item section
+            items: Content as separately droppable items
+            strategy: "fixed" (always kept whole), "relevance" (keep the
+                best-scoring items; without scores items are taken as
+                ranked best first) or "recency" (items are oldest first,
+                keep the newest)
+            scores: Relevance score per item, higher is better
+            weight: Share of the flexible budget relative to other sections
+            template: Wrapper text; "{content}" is replaced by the kept items
+            separator: Joins kept items
+            keep_order: Emit kept relevance items in their original order
+        """
+        if strategy not in ("fixed", "relevance", "recency"):
+            raise ValueError(f"Unknown prompt section strategy: {strategy}")
+        self._sections.append({
+            "name": name,
+            "items": [text] if text is not None else list(items or []),
+            "strategy": strategy,
+            "scores": scores,
+            "weight": weight,
+            "template": template,
+            "separator": separator,
+            "keep_order": keep_order
+        })
+        return self
+
+    def build(self) -> BuiltPrompt:
+        """Fit every section into the budget and render the prompt"""
+        kept: Dict[str, List[str]] = {}
+        flexible = []
+        used = len(self._sections)  # blank lines between sections
+
+        for section in self._sections:
+            if section["strategy"] == "fixed":
+                kept[section["name"]] = section["items"]
+                used += count_tokens(self._render(section, section["items"]), self.model)
+            else:
+                used += count_tokens(self._render(section, []), self.model)
+                section["item_tokens"] = [count_tokens(item, self.model) for item in section["items"]]
+                flexible.append(section)
+
+        allocations = self._allocate(flexible, max(0, self.budget - used))
+        for section in flexible:
+            kept[section["name"]] = self._select(section, allocations[section["name"]])
+
+        report = {}
+        rendered = []
+        for section in self._sections:
+            content = self._render(section, kept[section["name"]])
+            rendered.append(content)
+            report[section["name"]] = {
+                "tokens": count_tokens(content, self.model),
+                "items": len(kept[section["name"]]),
+                "dropped": len(section["items"]) - len(kept[section["name"]])
+            }
+
+        text = "\n\n".join(part for part in rendered if part.strip())
+        prompt = BuiltPrompt(text, count_tokens(text, self.model), report)
+        logger.debug(f"Built prompt for {self.model}: {prompt.token_count}/{self.budget} tokens {report}")
+        return prompt
+
+    @staticmethod
+    def _render(section: Dict[str, Any], items: List[str]) -> str:
+        return section["template"].replace("{content}", section["separator"].join(items))
+
+    @staticmethod
+    def _allocate(sections: List[Dict[str, Any]], available: int) -> Dict[str, int]:
+        """Split tokens by weight, handing what small sections leave to the others"""
+        allocations = {section["name"]: 0 for section in sections}
+        needs = {
+            section["name"]: sum(section["item_tokens"]) + len(section["items"])  # + separators
+            for section in sections
+        }
+        open_sections = [section for section in sections if needs[section["name"]] > 0]
+
+        while open_sections and available > 0:
+            total_weight = sum(section["weight"] for section in open_sections)
+            satisfied = [
+                section for section in open_sections
+                if needs[section["name"]] <= available * section["weight"] / total_weight
+            ]
+            if not satisfied:
+                for section in open_sections:
+                    allocations[section["name"]] = int(available * section["weight"] / total_weight)
+                break
+            for section in satisfied:
+                allocations[section["name"]] = needs[section["name"]]
+                available -= needs[section["name"]]
+                open_sections.remove(section)
+
+        return allocations
+
+    def _select(self, section: Dict[str, Any], allocation: int) -> List[str]:
+        """Items of a flexible section that fit its allocation"""
+        items, item_tokens = section["items"], section["item_tokens"]
+        if not items:
+            return []
+
+        if section["strategy"] == "recency":
+            order = list(range(len(items) - 1, -1, -1))
+        elif section["scores"] is not None:
+            order = sorted(range(len(items)), key=lambda i: -section["scores"][i])
+        else:
+            order = list(range(len(items)))
+
+        chosen, spent = [], 0
+        for i in order:
+            if spent + item_tokens[i] + 1 <= allocation:
+                chosen.append(i)
+                spent += item_tokens[i] + 1
+
+        if not chosen:
+            # Nothing fits whole: keep the start of the best item rather than nothing
+            return [truncate_tokens(items[order[0]], max(0, allocation - 1), self.model)] if allocation > 1 else []
+
+        if section["strategy"] == "recency" or section["keep_order"]:
+            chosen.sort()
+        return [items[i] for i in chosen]
@@ -0,0 +1,108 @@
+"""
+Embedding backend benchmark
+Measures load time, encode throughput and peak RSS of each backend. Every
+backend runs in its own subprocess so memory numbers are not polluted by
+the others.
+
+Usage (from backend/):
+    python -m benchmarks.embedding_backends --output results.json
+"""
+
+from typing import Dict, Any, List
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+BACKENDS = ["torch", "onnx", "onnx-int8"]
+
+
+def synthetic_texts(count: int) -> List[str]:
+    """Task-like strings of realistic length"""
+    courses = ["Math 101", "CS 201", "History 110", "Biology 150", "Economics 220"]
+    return [
+        f"Task: Assignment {i} for {courses[i % len(courses)]}. Deadline: 2025-11-{i % 28 + 1:02d}. "
+        f"Course: {courses[i % len(courses)]}. Description: Read chapter {i % 12 + 1} and answer "
+        f"questions {i % 20 + 1}-{i % 20 + 10}"
+        for i in range(count)
+    ]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_backend(backend: str, count: int, batch_size: int) -> Dict[str, Any]:
+    """Benchmark a single backend in the current process"""
+    from app.services.embedding_backends import create_embedding_backend
+
+    texts = synthetic_texts(count)
+
+    start = time.perf_counter()
+    model = create_embedding_backend(backend, "all-MiniLM-L6-v2")
+    load_seconds = time.perf_counter() - start
+
+    # Warm-up pass so lazy allocations are not timed
+    model.encode(texts[:batch_size], batch_size=batch_size)
+
+    single_latencies = []
+    for text in texts[:50]:
+        start = time.perf_counter()
+        model.encode([text], batch_size=1)
+        single_latencies.append(time.perf_counter() - start)
+    single_latencies.sort()
+
+    start = time.perf_counter()
+    model.encode(texts, batch_size=batch_size)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "texts": count,
+        "batch_size": batch_size,
+        "load_seconds": round(load_seconds, 3),
+        "throughput_texts_per_second": round(count / batch_seconds, 1),
+        "single_p50_ms": round(single_latencies[len(single_latencies) // 2] * 1000, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--backend", choices=BACKENDS, help="Run a single backend in-process")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_backend(args.backend, args.texts, args.batch_size)))
+        return
+
+    results = []
+    for backend in BACKENDS:
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.embedding_backends", "--backend", backend,
+             "--texts", str(args.texts), "--batch-size", str(args.batch_size)],
+            capture_output=True,
+            text=True
+        )
+        if completed.returncode != 0:
+            results.append({"backend": backend, "error": completed.stderr.strip().splitlines()[-1:]})
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    report = json.dumps({"results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+RAG retrieval benchmark
+Builds synthetic student corpora (tasks, plans and uploaded document
+chunks) for 10, 1k and 100k users and measures RAGService ingestion
+throughput, single-write and query latency percentiles, recall@k, on-disk
+size and peak RSS. Every scale runs in its own subprocess against a fresh
+store.
+
+By default the embeddings come from an offline feature-hashing backend, so
+the benchmark needs no network or model download; pass --embedding torch /
+onnx / onnx-int8 to benchmark a real model that is already cached locally.
+
+Usage (from backend/):
+    python -m benchmarks.rag --scales 10 1k --vector-store numpy --output results.json
+"""
+
+from typing import Dict, Any, List, Tuple
+import argparse
+import hashlib
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.embedding_backends import EmbeddingBackend
+from benchmarks.embedding_backends import peak_rss_mb
+
+SCALES = {"10": 10, "1k": 1000, "100k": 100000}
+EMBEDDINGS = ["hashing", "torch", "onnx", "onnx-int8"]
+VECTOR_STORES = ["chroma", "numpy", "pgvector"]
+
+COURSES = ["Math 101", "CS 201", "History 110", "Biology 150", "Economics 220", "Physics 120"]
+KINDS = ["essay", "problem set", "lab report", "reading", "project milestone", "quiz prep"]
+TOPICS = [
+    "linear algebra", "recursion", "the French revolution", "cell division", "supply and demand",
+    "kinematics", "graph search", "photosynthesis", "the cold war", "probability", "hash tables",
+    "game theory", "thermodynamics", "genetics", "the industrial revolution", "sorting algorithms",
+]
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """Offline stand-in model: signed feature hashing of words and word pairs"""
+
+    def __init__(self, dimension: int = 384):
+        super().__init__("hashing")
+        self.dimension = dimension
+
+    @property
+    def name(self) -> str:
+        return f"hashing-{self.dimension}"
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = text.lower().replace(".", " ").replace(",", " ").split()
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                digest = int.from_bytes(hashlib.md5(feature.encode("utf-8")).digest()[:8], "little")
+                vectors[row, digest % self.dimension] += 1.0 if digest >> 63 else -1.0
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.tolist()
+
+
+# ============================================================================
+# Synthetic corpus
+# ============================================================================
+
+def user_corpus(user_id: int, seed: int, tasks: int, plans: int, pages: int) -> Dict[str, Any]:
+    """Deterministic tasks, plans and document pages for one user"""
+    rng = random.Random(seed * 1_000_003 + user_id)
+
+    user_tasks = []
+    for i in range(tasks):
+        course, kind, topic = rng.choice(COURSES), rng.choice(KINDS), rng.choice(TOPICS)
+        user_tasks.append({
+            "id": user_id * 1000 + i,
+            "user_id": user_id,
+            "title": f"{course} {kind} on {topic}",
+            "course": course,
+            "deadline": f"2025-{rng.randint(9, 12):02d}-{rng.randint(1, 28):02d}T23:59:00",
+            "description": f"Finish the {kind} covering {topic} and {rng.choice(TOPICS)}",
+            "priority": rng.choice(["low", "medium", "high"]),
+            "status": "pending",
+        })
+
+    user_plans = [
+        {
+            "id": user_id * 1000 + i,
+            "date": f"2025-10-{i + 1:02d}",
+            "schedule_summary": ", ".join(rng.choice(user_tasks)["title"] for _ in range(3)) if user_tasks else "free day",
+        }
+        for i in range(plans)
+    ]
+
+    document_pages = [
+        (page, " ".join(
+            f"Lecture notes on {rng.choice(TOPICS)} for {rng.choice(COURSES)}: "
+            f"key idea {rng.randint(1, 99)} relates {rng.choice(TOPICS)} to {rng.choice(TOPICS)}."
+            for _ in range(8)
+        ))
+        for page in range(1, pages + 1)
+    ]
+
+    return {"tasks": user_tasks, "plans": user_plans, "pages": document_pages}
+
+
+def user_queries(corpus: Dict[str, Any], rng: random.Random) -> Tuple[str, str]:
+    """A question about one of the user's tasks, and the text it should retrieve"""
+    from app.services.rag_service import format_task_text
+
+    task = rng.choice(corpus["tasks"])
+    question = f"When is my {task['course']} {task['title'].split(' ', 2)[-1]} due?"
+    return question, format_task_text(task)
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 of latencies in seconds, reported in milliseconds"""
+    if not samples:
+        return {}
+    ordered = np.array(samples) * 1000
+    return {f"p{p}": round(float(np.percentile(ordered, p)), 3) for p in (50, 95, 99)}
+
+
+# ============================================================================
+# Single scale
+# ============================================================================
+
+def run_scale(args) -> Dict[str, Any]:
+    """Build and measure one corpus in the current process"""
+    from app.config import settings
+    from app.services.query_cache import QueryResultCache
+    from app.services.rag_service import RAGService, format_task_text, format_plan_text
+    from app.utils.chunking import TextChunker
+
+    users = SCALES[args.scale]
+    workdir = tempfile.mkdtemp(prefix=f"wizai-rag-bench-{args.scale}-", dir=args.workdir)
+
+    settings.VECTOR_STORE_BACKEND = args.vector_store
+    settings.RAG_SHARDING = args.sharding
+    settings.EMBEDDING_CACHE_PATH = f"{workdir}/embedding_cache.sqlite3"
+    embedding_backend = HashingEmbeddingBackend() if args.embedding == "hashing" else None
+    if embedding_backend is None:
+        settings.EMBEDDING_BACKEND = args.embedding
+
+    rag = RAGService(
+        persist_directory=f"{workdir}/store",
+        batch_size=args.batch_size,
+        embedding_backend=embedding_backend
+    )
+    # Measure the store, not the result cache
+    rag.query_cache = QueryResultCache(max_entries=0)
+
+    # Ingestion: tasks and plans in bulk, documents streamed per user
+    counts = {"tasks": 0, "plans": 0, "chunks": 0}
+    seconds = {"tasks": 0.0, "plans": 0.0, "chunks": 0.0}
+    block = max(1, 2000 // max(1, args.tasks_per_user))
+    for first_user in range(1, users + 1, block):
+        corpora = [
+            (user_id, user_corpus(user_id, args.seed, args.tasks_per_user, args.plans_per_user, args.pages_per_user))
+            for user_id in range(first_user, min(first_user + block, users + 1))
+        ]
+
+        tasks = [task for _, corpus in corpora for task in corpus["tasks"]]
+        start = time.perf_counter()
+        rag.add_tasks_to_context_batch(tasks)
+        seconds["tasks"] += time.perf_counter() - start
+        counts["tasks"] += len(tasks)
+
+        plans = [
+            {
+                "user_id": user_id,
+                "text": format_plan_text(plan),
+                "doc_id": f"plan_{plan['id']}",
+                "metadata": {"type": "plan", "plan_id": plan["id"], "date": plan["date"]},
+            }
+            for user_id, corpus in corpora for plan in corpus["plans"]
+        ]
+        start = time.perf_counter()
+        rag.add_documents_batch(plans)
+        seconds["plans"] += time.perf_counter() - start
+        counts["plans"] += len(plans)
+
+        for user_id, corpus in corpora:
+            if corpus["pages"]:
+                start = time.perf_counter()
+                counts["chunks"] += rag.ingest_document(user_id, f"bench-{user_id}", "notes.pdf", iter(corpus["pages"]))["chunks"]
+                seconds["chunks"] += time.perf_counter() - start
+
+    ingest = {
+        f"{kind}_per_second": round(counts[kind] / seconds[kind], 1) if seconds[kind] else None
+        for kind in counts
+    }
+    ingest.update(counts)
+    ingest["total_seconds"] = round(sum(seconds.values()), 3)
+
+    # Queries against random users, with recall against the generating task
+    # and against an exact search over the user's own vectors
+    rng = random.Random(args.seed)
+    query_users = [rng.randint(1, users) for _ in range(args.queries)]
+    latencies, hits, overlaps = [], 0, []
+    for user_id in query_users:
+        corpus = user_corpus(user_id, args.seed, args.tasks_per_user, args.plans_per_user, args.pages_per_user)
+        question, expected = user_queries(corpus, rng)
+
+        start = time.perf_counter()
+        results = rag.query(user_id, question, top_k=args.top_k)
+        latencies.append(time.perf_counter() - start)
+
+        returned = [result["text"] for result in results]
+        hits += expected in returned
+
+        texts = (
+            [format_task_text(task) for task in corpus["tasks"]]
+            + [format_plan_text(plan) for plan in corpus["plans"]]
+            + [chunk for _, _, chunk in TextChunker.iter_page_chunks(corpus["pages"], settings.DOCUMENT_CHUNK_SIZE)]
+        )
+        vectors = np.array(rag.embed(texts))
+        query_vector = np.array(rag.embed([question])[0])
+        exact = [texts[i] for i in np.argsort(((vectors - query_vector) ** 2).sum(axis=1))[:args.top_k]]
+        overlaps.append(len(set(exact) & set(returned)) / max(1, min(args.top_k, len(texts))))
+
+    batch_queries = [(user_id, f"What is due for {rng.choice(COURSES)} this week?") for user_id in query_users]
+    start = time.perf_counter()
+    rag.query_many(batch_queries, top_k=args.top_k)
+    batch_seconds = time.perf_counter() - start
+
+    # Single writes through the task and document helpers
+    add_task_latencies, add_document_latencies = [], []
+    for i in range(args.single_writes):
+        user_id = rng.randint(1, users)
+        start = time.perf_counter()
+        rag.add_task_to_context(user_id, {
+            "id": 10 ** 9 + i,
+            "title": f"Extra {rng.choice(KINDS)} on {rng.choice(TOPICS)} #{i}",
+            "deadline": "2025-12-01T23:59:00",
+            "course": rng.choice(COURSES),
+        })
+        add_task_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        rag.add_document(user_id, f"Reminder {i}: review {rng.choice(TOPICS)}", {"type": "note"})
+        add_document_latencies.append(time.perf_counter() - start)
+
+    # A no-op incremental sync over one block of unchanged tasks
+    sync_tasks = [
+        task
+        for user_id in range(1, min(block, users) + 1)
+        for task in user_corpus(user_id, args.seed, args.tasks_per_user, args.plans_per_user, args.pages_per_user)["tasks"]
+    ]
+    start = time.perf_counter()
+    resynced = rag.sync_tasks(sync_tasks)
+    sync_seconds = time.perf_counter() - start
+
+    result = {
+        "scale": args.scale,
+        "users": users,
+        "embedding": args.embedding,
+        "vector_store": args.vector_store,
+        "sharding": args.sharding,
+        "vectors": rag.count(),
+        "ingest": ingest,
+        "query_ms": percentiles(latencies),
+        "query_many_per_second": round(len(batch_queries) / batch_seconds, 1) if batch_seconds else None,
+        f"recall_at_{args.top_k}": round(hits / len(query_users), 4) if query_users else None,
+        f"index_recall_at_{args.top_k}": round(float(np.mean(overlaps)), 4) if overlaps else None,
+        "add_task_to_context_ms": percentiles(add_task_latencies),
+        "add_document_ms": percentiles(add_document_latencies),
+        "sync_unchanged": {"tasks": len(sync_tasks), "reembedded": resynced, "seconds": round(sync_seconds, 3)},
+        "disk_bytes": rag.disk_usage(),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    rag.close()
+    if args.keep_stores:
+        result["workdir"] = workdir
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RAG ingestion and retrieval")
+    parser.add_argument("--scale", choices=list(SCALES), help="Run a single scale in-process")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=list(SCALES))
+    parser.add_argument("--embedding", choices=EMBEDDINGS, default="hashing")
+    parser.add_argument("--vector-store", choices=VECTOR_STORES, default="chroma")
+    parser.add_argument("--sharding", choices=["none", "user", "bucket"], default="none")
+    parser.add_argument("--tasks-per-user", type=int, default=8)
+    parser.add_argument("--plans-per-user", type=int, default=3)
+    parser.add_argument("--pages-per-user", type=int, default=2)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--single-writes", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", help="Parent directory for the generated stores")
+    parser.add_argument("--keep-stores", action="store_true", help="Keep the generated stores on disk")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    if args.scale:
+        print(json.dumps(run_scale(args)))
+        return
+
+    passthrough = [
+        "--embedding", args.embedding, "--vector-store", args.vector_store, "--sharding", args.sharding,
+        "--tasks-per-user", str(args.tasks_per_user), "--plans-per-user", str(args.plans_per_user),
+        "--pages-per-user", str(args.pages_per_user), "--queries", str(args.queries),
+        "--single-writes", str(args.single_writes), "--top-k", str(args.top_k),
+        "--batch-size", str(args.batch_size), "--seed", str(args.seed),
+    ]
+    if args.workdir:
+        passthrough += ["--workdir", args.workdir]
+    if args.keep_stores:
+        passthrough.append("--keep-stores")
+
+    results = []
+    for scale in args.scales:
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.rag", "--scale", scale, *passthrough],
+            capture_output=True,
+            text=True
+        )
+        if completed.returncode != 0:
+            results.append({"scale": scale, "error": completed.stderr.strip().splitlines()[-1:]})
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    report = json.dumps({"config": vars(args), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
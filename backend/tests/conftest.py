@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+# Make the `app` package importable when running pytest from the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+
+@pytest.fixture
+def rag(tmp_path, monkeypatch):
+    """RAGService over a NumPy store with the offline hashing embedding model"""
+    pytest.importorskip("numpy")
+    from app.services import rag_service
+    from app.services.vector_store import NumpyVectorStore
+    from benchmarks.rag import HashingEmbeddingBackend
+
+    monkeypatch.setattr(rag_service.settings, "EMBEDDING_CACHE_PATH", "")
+    service = rag_service.RAGService(
+        batch_size=2,
+        vector_store=NumpyVectorStore(str(tmp_path / "numpy")),
+        embedding_backend=HashingEmbeddingBackend(dimension=32)
+    )
+    yield service
+    service.close()
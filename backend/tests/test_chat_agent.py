@@ -0,0 +1,43 @@
+"""
+Tests for the chat agent's prompt assembly
+"""
+
+import asyncio
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("mcp")
+
+from app.agents.chat_agent import ChatAgent
+from app.config import settings
+from app.services.llm_service import ModelProvider
+
+
+class FakeLLMService:
+    def route_model(self, task_type):
+        return ModelProvider.OPENAI
+
+
+class FakeMCPServer:
+    async def search_context(self, user_id, query):
+        return {"results": [{"id": "task_1", "text": "Essay due Friday " * 200, "distance": 0.1}]}
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr(settings, "PROMPT_TOKEN_BUDGET", 1500)
+    agent = ChatAgent.__new__(ChatAgent)
+    agent.name, agent.role, agent.backstory = "ConversationalAssistant", "Chat", "Helps"
+    agent.llm_service = FakeLLMService()
+    agent.mcp_server = FakeMCPServer()
+    return agent
+
+
+def test_user_message_survives_an_over_budget_history(agent):
+    message = "Can you move my " + "very important " * 350 + "essay session to Thursday evening?"
+    history = [{"role": "user", "content": "earlier question " * 50}] * 40
+
+    prompt, _ = asyncio.run(agent._build_prompt({"user_id": 1, "message": message, "chat_history": history}))
+
+    assert f"User Message: {message}" in prompt.text
+    assert prompt.sections["history"]["items"] < len(history)
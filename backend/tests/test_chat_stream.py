@@ -0,0 +1,145 @@
+"""
+Tests for the streaming chat endpoint's server-sent events
+"""
+
+from types import SimpleNamespace
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.routers import chat
+from app.utils.auth import get_current_user
+
+
+class FakeSession:
+    """Session with no chat history that accepts writes"""
+
+    def __init__(self):
+        self.added = []
+
+    def query(self, *args):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def order_by(self, *args):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    def all(self):
+        return []
+
+    def add(self, row):
+        self.added.append(row)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeAgent:
+    def __init__(self, events, error=None):
+        self.events = events
+        self.error = error
+
+    async def execute_stream(self, task, context):
+        for event in self.events:
+            yield dict(event)
+        if self.error is not None:
+            raise self.error
+
+
+@pytest.fixture
+def client(monkeypatch):
+    saved = FakeSession()
+    monkeypatch.setattr(chat, "SessionLocal", lambda: saved)
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/chat")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+    app.dependency_overrides[get_db] = FakeSession
+    client = TestClient(app)
+    client.saved = saved
+    return client
+
+
+def parse_events(body: str):
+    """Split an SSE body into (event, data) pairs"""
+    events = []
+    for block in body.split("\n\n"):
+        if block:
+            lines = dict(line.split(": ", 1) for line in block.split("\n"))
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stalled_stream_ends_with_error_event(client, monkeypatch):
+    agent = FakeAgent([{"type": "token", "text": "Hel"}], error=asyncio.TimeoutError())
+    monkeypatch.setattr(chat, "_chat_agent", agent)
+
+    response = client.post("/api/chat/stream", json={"message": "hi"})
+
+    assert response.status_code == 200
+    assert parse_events(response.text) == [
+        ("token", {"text": "Hel"}),
+        ("error", {"detail": "Assistant is unavailable"})
+    ]
+    assert client.saved.added == []
+
+
+def test_stream_frames_context_tokens_and_done(client, monkeypatch):
+    llm_call = {"model": "gpt-4o-mini", "provider": "openai", "prompt_tokens": 40, "completion_tokens": 2}
+    agent = FakeAgent([
+        {"type": "context", "context_used": 1},
+        {"type": "token", "text": "Hel"},
+        {"type": "token", "text": "lo"},
+        {
+            "type": "done",
+            "success": True,
+            "response": "Hello",
+            "agent": "chat_agent",
+            "context_used": 1,
+            "prompt_tokens": 40,
+            "retrieved_docs": [{"id": "task_1"}],
+            "llm_call": llm_call
+        }
+    ])
+    monkeypatch.setattr(chat, "_chat_agent", agent)
+
+    response = client.post("/api/chat/stream", json={"message": "hi", "session_id": "s1"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["x-accel-buffering"] == "no"
+    assert response.text.endswith("\n\n")
+    assert parse_events(response.text) == [
+        ("context", {"context_used": 1}),
+        ("token", {"text": "Hel"}),
+        ("token", {"text": "lo"}),
+        ("done", {
+            "success": True,
+            "response": "Hello",
+            "agent": "chat_agent",
+            "context_used": 1,
+            "prompt_tokens": 40,
+            "session_id": "s1"
+        })
+    ]
+
+    # Usage details go to the history instead of the browser
+    user_row, assistant_row = client.saved.added
+    assert (user_row.role, user_row.content, user_row.session_id) == ("user", "hi", "s1")
+    assert (assistant_row.role, assistant_row.content) == ("assistant", "Hello")
+    assert assistant_row.context_used["retrieved_docs"] == [{"id": "task_1"}]
+    assert assistant_row.context_used["tokens"] == 42
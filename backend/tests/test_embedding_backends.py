@@ -0,0 +1,43 @@
+"""
+Parity tests for the ONNX embedding backends
+Compares every backend against the PyTorch SentenceTransformer output
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+
+from app.services.embedding_backends import create_embedding_backend
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+SAMPLES = [
+    "Task: Math 101 Homework. Deadline: 2025-10-20. Course: Math 101. Description: Problems 1-15",
+    "Daily plan for 2025-10-21. Schedule: 3 tasks scheduled",
+    "What do I have due this week?",
+    "CS project submission: build a web app with authentication and a REST API " * 20,
+    "",
+]
+
+
+@pytest.fixture(scope="module")
+def reference_vectors():
+    return np.array(create_embedding_backend("torch", MODEL_NAME).encode(SAMPLES))
+
+
+@pytest.mark.parametrize("backend,min_similarity", [
+    ("onnx", 0.999),
+    ("onnx-int8", 0.98),
+])
+def test_backend_matches_pytorch(backend, min_similarity, reference_vectors):
+    vectors = np.array(create_embedding_backend(backend, MODEL_NAME).encode(SAMPLES, batch_size=2))
+
+    assert vectors.shape == reference_vectors.shape
+
+    similarity = (vectors * reference_vectors).sum(axis=1) / (
+        np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference_vectors, axis=1)
+    )
+    assert similarity.min() >= min_similarity, f"{backend}: cosine similarities {similarity}"
@@ -0,0 +1,61 @@
+"""
+Tests for the two-level embedding cache
+"""
+
+import asyncio
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.services.embedding_cache import EmbeddingCache
+
+
+def test_memory_hits_do_not_wait_for_the_disk(tmp_path):
+    cache = EmbeddingCache("model", db_path=str(tmp_path / "cache.sqlite3"))
+    cache.put_many(["hot"], [[1.0, 2.0]])
+
+    async def main():
+        # A commit in progress on the batcher thread holds the disk lock
+        with cache._db_lock:
+            return await asyncio.wait_for(cache.aget_many(["hot"]), timeout=1)
+
+    assert asyncio.run(main()) == [[1.0, 2.0]]
+    cache.close()
+
+
+def test_async_lookup_reads_the_disk_level(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = EmbeddingCache("model", db_path=path)
+    writer.put_many(["a"], [[0.5, 0.25]])
+    writer.close()
+
+    cache = EmbeddingCache("model", db_path=path)
+    assert asyncio.run(cache.aget_many(["a", "b"])) == [[0.5, 0.25], None]
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["misses"]) == (1, 1)
+    cache.close()
+
+
+def test_disk_level_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache("model", max_entries=1, db_path=path, max_disk_entries=2, write_batch=1)
+    cache.put_many(["a"], [[1.0]])
+    cache.put_many(["b"], [[2.0]])
+    assert cache.get_many(["a"]) == [[1.0]]  # disk hit: "a" is now more recent than "b"
+    cache.put_many(["c"], [[3.0]])
+    cache.close()
+
+    reopened = EmbeddingCache("model", db_path=path)
+    assert reopened.get_many(["a", "b", "c"]) == [[1.0], None, [3.0]]
+    reopened.close()
+
+
+def test_existing_cache_is_trimmed_to_the_cap(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = EmbeddingCache("model", db_path=path)
+    writer.put_many([f"text {i}" for i in range(10)], [[float(i)] for i in range(10)])
+    writer.close()
+
+    capped = EmbeddingCache("model", max_entries=0, db_path=path, max_disk_entries=4)
+    assert sum(vector is not None for vector in capped.get_many([f"text {i}" for i in range(10)])) == 4
+    capped.close()
@@ -0,0 +1,76 @@
+"""
+Tests for the two-level LLM response cache
+"""
+
+import asyncio
+
+from app.services import llm_cache
+from app.services.llm_cache import LLMResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock.time)
+    cache = LLMResponseCache(ttl_seconds=60, db_path=str(tmp_path / "cache.sqlite3"))
+    cache.put("key", "answer")
+
+    clock.now += 59
+    assert cache.get("key") == "answer"
+    clock.now += 2
+    assert cache.get("key") is None
+    assert cache.stats()["misses"] == 1
+    cache.close()
+
+
+def test_memory_and_disk_are_size_bounded(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = LLMResponseCache(max_entries=2, max_disk_entries=3, db_path=path, write_batch=1)
+    for i in range(5):
+        cache.put(f"key{i}", f"answer {i}")
+    assert cache.stats()["memory_entries"] == 2
+    cache.close()
+
+    # A fresh instance only sees the disk level: the three most recent survive
+    reopened = LLMResponseCache(max_entries=2, db_path=path)
+    assert [reopened.get(f"key{i}") for i in range(5)] == [None, None, "answer 2", "answer 3", "answer 4"]
+    reopened.close()
+
+
+def test_disk_hits_keep_entries_from_eviction(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = LLMResponseCache(max_entries=1, max_disk_entries=2, db_path=path, write_batch=1)
+    cache.put("old", "kept")
+    cache.put("other", "evicted")
+    assert cache.get("old") == "kept"  # disk hit: last_used is flushed with the next write
+    cache.put("new", "answer")
+    cache.close()
+
+    reopened = LLMResponseCache(db_path=path)
+    assert reopened.get("old") == "kept"
+    assert reopened.get("other") is None
+    reopened.close()
+
+
+def test_async_access_goes_through_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+
+    async def main():
+        cache = LLMResponseCache(max_entries=1, db_path=path)
+        await cache.aput("a", "first")
+        await cache.aput("b", "second")
+        answers = (await cache.aget("a"), await cache.aget("missing"))
+        cache.close()
+        return answers, cache.stats()
+
+    answers, stats = asyncio.run(main())
+    assert answers == ("first", None)
+    assert stats["disk_hits"] == 1
+    assert stats["misses"] == 1
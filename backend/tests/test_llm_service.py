@@ -0,0 +1,247 @@
+"""
+Tests for LLMService failover: deadlines, hedging and the circuit breaker
+
+Provider calls are replaced by fakes on the service instance; the provider
+SDKs still need to be importable.
+"""
+
+from types import SimpleNamespace
+import asyncio
+import contextlib
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("openai")
+
+from app.services import llm_service
+from app.services.llm_service import LLMService, ModelProvider
+from app.services.provider_stats import ProviderStats
+from app.services.single_flight import SingleFlight
+
+HANG = 3600
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(llm_service, "get_openai_client", lambda: None)
+    monkeypatch.setattr(llm_service, "get_llm_cache", lambda: None)
+    for provider in ModelProvider:
+        monkeypatch.setitem(
+            llm_service._provider_stats,
+            provider,
+            ProviderStats(consecutive_failures=3, cooldown_seconds=60)
+        )
+    monkeypatch.setattr(llm_service, "_single_flight", SingleFlight())
+    monkeypatch.setattr(llm_service, "_provider_semaphores", {})
+    monkeypatch.setattr(llm_service, "_rate_limiters", {})
+    monkeypatch.setattr(llm_service, "_task_latencies", {})
+    return LLMService()
+
+
+def fake_provider(service, provider, delay=0.0, calls=None):
+    """Replace a provider call with one answering after ``delay`` seconds"""
+    async def generate(prompt, temperature, max_tokens):
+        if calls is not None:
+            calls.append(provider)
+        await asyncio.sleep(delay)
+        return f"{provider.value} answer", (10, 5)
+
+    setattr(service, f"_{provider.value}_generate", generate)
+
+
+def test_hung_provider_opens_breaker_and_routing_moves(service):
+    fake_provider(service, ModelProvider.GEMINI, delay=HANG)
+    fake_provider(service, ModelProvider.OPENAI)
+
+    async def main():
+        for i in range(3):
+            with contextlib.suppress(asyncio.TimeoutError):
+                await service.generate(f"prompt {i}", task_type="extraction", deadline=0.05, use_cache=False)
+
+    asyncio.run(main())
+    gemini = llm_service._provider_stats[ModelProvider.GEMINI].stats()
+    assert gemini["window_errors"] == 3
+    assert gemini["breaker"] == "open"
+    assert service.route_model("extraction") == ModelProvider.OPENAI
+
+
+def test_hedge_loser_is_not_counted_as_failure(service, monkeypatch):
+    monkeypatch.setattr(llm_service.settings, "LLM_HEDGE_DEFAULT_DELAY_SECONDS", 0.01)
+    fake_provider(service, ModelProvider.GEMINI, delay=0.5)
+    fake_provider(service, ModelProvider.OPENAI)
+
+    answer = asyncio.run(service.generate("prompt", task_type="extraction", hedge=True, use_cache=False))
+
+    assert answer == "openai answer"
+    gemini = llm_service._provider_stats[ModelProvider.GEMINI].stats()
+    assert gemini["window_errors"] == 0
+    assert gemini["breaker"] == "closed"
+
+
+def test_hung_primary_falls_back_within_the_deadline(service):
+    calls = []
+    fake_provider(service, ModelProvider.GEMINI, delay=HANG, calls=calls)
+    fake_provider(service, ModelProvider.OPENAI, calls=calls)
+
+    answer = asyncio.run(service.generate("prompt", task_type="extraction", deadline=0.2, use_cache=False))
+
+    assert answer == "openai answer"
+    assert calls == [ModelProvider.GEMINI, ModelProvider.OPENAI]
+    assert llm_service._provider_stats[ModelProvider.GEMINI].stats()["window_errors"] == 1
+
+
+def test_deadline_bounds_the_whole_call(service):
+    fake_provider(service, ModelProvider.GEMINI, delay=HANG)
+    fake_provider(service, ModelProvider.OPENAI, delay=HANG)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with pytest.raises(asyncio.TimeoutError):
+            await service.generate("prompt", task_type="extraction", deadline=0.1, use_cache=False)
+        return loop.time() - start
+
+    assert asyncio.run(main()) < 0.5
+
+
+def test_hedge_fires_and_loser_returns_its_token_reservation(service, monkeypatch):
+    monkeypatch.setattr(llm_service.settings, "LLM_HEDGE_DEFAULT_DELAY_SECONDS", 0.01)
+    # Room for a single 1000-token completion per 10s burst
+    monkeypatch.setattr(llm_service.settings, "LLM_TOKENS_PER_MINUTE_GEMINI", 6600)
+    monkeypatch.setattr(llm_service.settings, "LLM_RATE_LIMIT_MAX_WAIT_SECONDS", 0.5)
+    fake_provider(service, ModelProvider.GEMINI, delay=0.5)
+    fake_provider(service, ModelProvider.OPENAI)
+    fired = llm_service._hedge_stats["hedges_fired"]
+
+    async def main():
+        answer = await service.generate("prompt", task_type="extraction", hedge=True, use_cache=False)
+        # Rejected if the cancelled Gemini request had kept its 1000 completion tokens
+        await llm_service.rate_limiter(ModelProvider.GEMINI).acquire(1000)
+        return answer
+
+    assert asyncio.run(main()) == "openai answer"
+    assert llm_service._hedge_stats["hedges_fired"] == fired + 1
+
+
+def test_calls_are_attributed_to_the_request_endpoint(service, monkeypatch):
+    app = pytest.importorskip("app.main").app
+    from fastapi.testclient import TestClient
+    from app.services.llm_telemetry import LLMTelemetry
+
+    monkeypatch.setattr(llm_service, "_telemetry", LLMTelemetry())
+    fake_provider(service, ModelProvider.GEMINI)
+
+    async def ask():
+        return {"answer": await service.generate("prompt", task_type="extraction", use_cache=False)}
+
+    app.add_api_route("/test/llm-endpoint", ask)
+    try:
+        client = TestClient(app)
+        assert client.get("/test/llm-endpoint").json() == {"answer": "gemini answer"}
+        metrics = client.get("/metrics/llm").json()
+    finally:
+        app.router.routes.pop()
+
+    assert metrics["calls"]["by_endpoint"]["GET /test/llm-endpoint"]["calls"] == 1
+    assert "background" not in metrics["calls"]["by_endpoint"]
+
+
+def test_use_cache_false_bypasses_the_response_cache(service, tmp_path):
+    from app.services.llm_cache import LLMResponseCache
+
+    calls = []
+    fake_provider(service, ModelProvider.GEMINI, calls=calls)
+    service.cache = LLMResponseCache(db_path=str(tmp_path / "cache.sqlite3"))
+
+    async def main():
+        await service.generate("prompt", task_type="extraction")
+        await service.generate("prompt", task_type="extraction")
+        await service.generate("prompt", task_type="extraction", use_cache=False)
+
+    asyncio.run(main())
+    stats = service.cache.stats()
+    service.cache.close()
+    assert len(calls) == 2
+    assert stats["writes"] == 1
+    assert stats["memory_hits"] == 1
+
+
+def fake_stream(service, provider, chunks, delays):
+    """Replace a provider stream with one yielding ``chunks`` after the given per-chunk delays"""
+    async def stream(prompt, temperature, max_tokens):
+        for chunk, delay in zip(chunks, delays):
+            await asyncio.sleep(delay)
+            yield chunk
+
+    setattr(service, f"_{provider.value}_stream", stream)
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+def test_stream_stalled_before_first_token_falls_back(service):
+    fake_stream(service, ModelProvider.GEMINI, ["never"], [HANG])
+    fake_stream(service, ModelProvider.OPENAI, ["openai ", "answer"], [0, 0])
+
+    stream = service.stream("prompt", task_type="quick_chat", deadline=0.2, use_cache=False)
+
+    assert asyncio.run(collect(stream)) == ["openai ", "answer"]
+    assert llm_service._provider_stats[ModelProvider.GEMINI].stats()["window_errors"] == 1
+
+
+def test_stream_stalled_between_chunks_times_out(service):
+    fake_stream(service, ModelProvider.GEMINI, ["first ", "never"], [0, HANG])
+    received = []
+
+    async def main():
+        async for chunk in service.stream("prompt", task_type="quick_chat", deadline=0.1, use_cache=False):
+            received.append(chunk)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(main())
+    assert received == ["first "]
+    assert llm_service._provider_stats[ModelProvider.GEMINI].stats()["window_errors"] == 1
+
+
+def test_services_share_one_pooled_openai_client(monkeypatch):
+    created = []
+
+    class FakeAsyncOpenAI:
+        def __init__(self, **kwargs):
+            created.append(kwargs)
+
+    monkeypatch.setattr(llm_service, "AsyncOpenAI", FakeAsyncOpenAI)
+    monkeypatch.setattr(llm_service, "_openai_client", None)
+    monkeypatch.setattr(llm_service, "get_llm_cache", lambda: None)
+    monkeypatch.setattr(llm_service.settings, "LOCAL_LLM_MODE", "")
+
+    first, second = LLMService(), LLMService()
+
+    assert first.openai is second.openai is llm_service.get_openai_client()
+    assert len(created) == 1
+    http_client = created[0]["http_client"]
+    assert isinstance(http_client, llm_service.httpx.AsyncClient)
+    assert http_client.timeout.connect == llm_service.settings.LLM_CONNECT_TIMEOUT_SECONDS
+
+
+def test_provider_semaphore_caps_in_flight_requests(service, monkeypatch):
+    monkeypatch.setattr(llm_service.settings, "LLM_MAX_CONCURRENCY_OPENAI", 2)
+    in_flight, peak = [0], [0]
+
+    async def create(**kwargs):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        message = SimpleNamespace(content="openai answer")
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=message)])
+
+    service.openai = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def main():
+        return await asyncio.gather(*(service._openai_generate(f"prompt {i}", 0.7, 100) for i in range(6)))
+
+    answers = asyncio.run(main())
+    assert [text for text, _ in answers] == ["openai answer"] * 6
+    assert peak[0] == 2
@@ -0,0 +1,65 @@
+"""
+Tests for per-call LLM telemetry aggregation
+"""
+
+from app.services.llm_telemetry import LLMTelemetry, estimate_cost, set_endpoint, reset_endpoint, current_endpoint
+
+
+def _record(**overrides):
+    record = {
+        "user_id": 1,
+        "agent": "ConversationalAssistant",
+        "endpoint": "POST /api/chat/",
+        "task_type": "quick_chat",
+        "provider": "gemini",
+        "model": "gemini-2.0-flash-exp",
+        "cache_hit": False,
+        "fallback": False,
+        "success": True,
+        "error": None,
+        "prompt_tokens": 1000,
+        "completion_tokens": 200,
+        "cost_usd": estimate_cost("gemini-2.0-flash-exp", 1000, 200),
+        "ttfb_ms": 120.0,
+        "latency_ms": 800.0
+    }
+    record.update(overrides)
+    return record
+
+
+def test_calls_are_broken_down_by_model_agent_and_endpoint():
+    telemetry = LLMTelemetry()
+    telemetry.record(_record())
+    telemetry.record(_record(provider="openai", model="gpt-4o-mini", fallback=True))
+    telemetry.record(_record(agent="ScheduleMaster", endpoint="background", cache_hit=True, prompt_tokens=0, completion_tokens=0, cost_usd=0.0))
+
+    stats = telemetry.stats()
+    assert stats["total"]["calls"] == 3
+    assert stats["total"]["fallbacks"] == 1
+    assert stats["total"]["cache_hits"] == 1
+    assert stats["by_model"]["gemini:gemini-2.0-flash-exp"]["calls"] == 2
+    assert stats["by_agent"]["ConversationalAssistant"]["prompt_tokens"] == 2000
+    assert stats["by_endpoint"]["background"]["calls"] == 1
+
+
+def test_failed_calls_do_not_skew_latency():
+    telemetry = LLMTelemetry()
+    telemetry.record(_record(latency_ms=500.0))
+    telemetry.record(_record(success=False, error="TimeoutError", latency_ms=45000.0))
+
+    total = telemetry.stats()["total"]
+    assert total["errors"] == 1
+    assert total["latency_p95_ms"] == 500.0
+
+
+def test_cost_uses_model_prices():
+    assert estimate_cost("gpt-4o-mini", 1_000_000, 1_000_000) == 0.75
+    assert estimate_cost("unknown-model", 1000, 1000) == 0.0
+
+
+def test_endpoint_context():
+    assert current_endpoint() == "background"
+    token = set_endpoint("POST /api/documents/upload")
+    assert current_endpoint() == "POST /api/documents/upload"
+    reset_endpoint(token)
+    assert current_endpoint() == "background"
@@ -0,0 +1,58 @@
+"""
+Tests for the offline LLM provider used in load tests
+"""
+
+import asyncio
+import json
+import pytest
+
+from app.services.local_llm import LocalLLMProvider, LocalProviderError
+
+
+def test_scripted_responses_match_agent_schemas():
+    provider = LocalLLMProvider(latency_median_seconds=0.001, latency_p95_seconds=0.002)
+
+    extraction = asyncio.run(provider.generate('Return JSON with: {"assignments": []}', 0.7, 1000))
+    plan = asyncio.run(provider.generate('{"date": "2025-03-04", "schedule": [], "productivity_score": 0}', 0.3, 1000))
+
+    assert set(json.loads(extraction)) == {"assignments", "events", "confidence"}
+    assert json.loads(plan)["date"] == "2025-03-04"
+
+
+def test_seeded_failures_are_reproducible():
+    def outcomes():
+        provider = LocalLLMProvider(latency_median_seconds=0.001, latency_p95_seconds=0.001, error_rate=0.3, rate_limit_rate=0.2, seed=7)
+        results = []
+        for _ in range(20):
+            try:
+                asyncio.run(provider.generate("hello", 0.7, 50))
+                results.append(200)
+            except LocalProviderError as e:
+                results.append(e.status_code)
+        return results
+
+    first = outcomes()
+    assert first == outcomes()
+    assert 429 in first and 500 in first and 200 in first
+
+
+def test_stream_reassembles_to_the_full_response():
+    provider = LocalLLMProvider(latency_median_seconds=0.001, latency_p95_seconds=0.002, stream_chunk_words=2)
+
+    async def collect():
+        return [chunk async for chunk in provider.stream("hi", 0.7, 1000)]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) > 1
+    assert "".join(chunks) == asyncio.run(provider.generate("hi", 0.7, 1000))
+
+
+def test_record_then_replay(tmp_path):
+    cassette = tmp_path / "llm.jsonl"
+    recorder = LocalLLMProvider(mode="record", cassette_path=str(cassette))
+    recorder.record("gemini", "gemini-2.0-flash-exp", "What is due?", 0.7, 1000, "Essay on Friday", 1.2)
+
+    player = LocalLLMProvider(mode="replay", cassette_path=str(cassette))
+    assert asyncio.run(player.generate("What  is due?", 0.7, 1000)) == "Essay on Friday"
+    with pytest.raises(LocalProviderError):
+        asyncio.run(player.generate("Something else", 0.7, 1000))
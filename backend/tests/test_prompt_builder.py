@@ -0,0 +1,68 @@
+"""
+Tests for token-budgeted prompt assembly
+"""
+
+from app.utils.prompt_builder import ChunkSelector, PromptBuilder, count_tokens
+
+MODEL = "gpt-4o-mini"
+
+
+def test_fixed_sections_fit_and_are_counted():
+    prompt = PromptBuilder(MODEL, budget=1000).add("system", "You are helpful.").add("input", "Hi").build()
+
+    assert prompt.text == "You are helpful.\n\nHi"
+    assert prompt.token_count == count_tokens(prompt.text, MODEL)
+
+
+def test_relevance_section_drops_lowest_scores_and_keeps_order():
+    items = ["alpha " * 20, "beta " * 20, "gamma " * 20]
+    prompt = (
+        PromptBuilder(MODEL, budget=count_tokens(items[0], MODEL) * 2 + 10)
+        .add("input", items=items, strategy="relevance", scores=[1, 0, 5], keep_order=True)
+        .build()
+    )
+
+    assert prompt.sections["input"]["dropped"] == 1
+    assert prompt.text.index("alpha") < prompt.text.index("gamma")
+    assert "beta" not in prompt.text
+    assert prompt.token_count <= count_tokens(items[0], MODEL) * 2 + 10
+
+
+def test_recency_section_keeps_newest_in_chronological_order():
+    history = [f"user: message number {i} " + "x " * 30 for i in range(10)]
+    budget = count_tokens(history[0], MODEL) * 3 + 5
+    prompt = PromptBuilder(MODEL, budget=budget).add("history", items=history, strategy="recency").build()
+
+    assert prompt.sections["history"]["items"] == 3
+    assert prompt.text.index("number 7") < prompt.text.index("number 8") < prompt.text.index("number 9")
+
+
+def test_weights_leave_room_for_input():
+    prompt = (
+        PromptBuilder(MODEL, budget=200)
+        .add("context", items=["context " * 50] * 5, strategy="relevance")
+        .add("input", "User Message: when is my essay due?", strategy="relevance", weight=4)
+        .build()
+    )
+
+    assert "when is my essay due?" in prompt.text
+    assert prompt.token_count <= 200
+
+
+def test_oversized_item_is_truncated_not_dropped():
+    prompt = PromptBuilder(MODEL, budget=50).add("input", "word " * 500, strategy="relevance").build()
+
+    assert prompt.sections["input"]["items"] == 1
+    assert 0 < prompt.token_count <= 50
+
+
+def test_chunk_selector_keeps_deadline_chunks_in_document_order():
+    selector = ChunkSelector(max_tokens=count_tokens("filler " * 20, MODEL) * 2, model=MODEL)
+    selector.add("Essay 1 is due on 2024-03-01.")
+    for _ in range(5):
+        selector.add("filler " * 20)
+    selector.add("The final exam is on May 10.")
+
+    selected = selector.selected()
+    assert selected[0].startswith("Essay 1")
+    assert selected[-1].startswith("The final exam")
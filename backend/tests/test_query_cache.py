@@ -0,0 +1,28 @@
+"""
+Tests for the per-user RAG query result cache
+"""
+
+from app.services.query_cache import QueryResultCache
+
+
+def test_put_after_invalidation_is_skipped():
+    cache = QueryResultCache()
+    key = cache.make_key(1, "What is due?", 5, None)
+
+    generation = cache.generation(1)
+    cache.invalidate_user(1)  # an ingest lands while the search runs
+    cache.put(key, [{"text": "stale"}], generation)
+    assert cache.get(key) is None
+
+    cache.put(key, [{"text": "fresh"}], cache.generation(1))
+    assert cache.get(key) == [{"text": "fresh"}]
+
+
+def test_invalidation_is_per_user():
+    cache = QueryResultCache()
+    generation = cache.generation(2)
+    cache.invalidate_user(1)
+
+    key = cache.make_key(2, "plans", 5, None)
+    cache.put(key, [{"text": "ok"}], generation)
+    assert cache.get(key) == [{"text": "ok"}]
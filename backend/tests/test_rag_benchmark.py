@@ -0,0 +1,30 @@
+"""
+Smoke test for the RAG benchmark entry point at a tiny scale
+"""
+
+import json
+import sys
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.config import settings
+from benchmarks import rag as rag_benchmark
+
+
+def test_single_scale_runs_end_to_end(tmp_path, monkeypatch, capsys):
+    # run_scale points the global settings at its own store
+    for name in ("VECTOR_STORE_BACKEND", "RAG_SHARDING", "EMBEDDING_CACHE_PATH", "EMBEDDING_BACKEND"):
+        monkeypatch.setattr(settings, name, getattr(settings, name))
+    monkeypatch.setattr(sys, "argv", [
+        "benchmarks.rag", "--scale", "10", "--vector-store", "numpy",
+        "--queries", "5", "--single-writes", "2", "--workdir", str(tmp_path)
+    ])
+
+    rag_benchmark.main()
+
+    result = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert result["users"] == 10
+    assert result["ingest"]["chunks"] > 0
+    assert result["recall_at_5"] > 0
+    assert result["sync_unchanged"]["reembedded"] == 0
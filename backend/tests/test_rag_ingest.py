@@ -0,0 +1,41 @@
+"""
+Tests for document ingestion into the RAG store
+"""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+
+def _chunks(rag, user_id=1):
+    return sorted(
+        (record["metadata"]["filename"], record["id"])
+        for record in rag.store.scan(where={"user_id": user_id, "type": "document"})
+    )
+
+
+def test_same_named_documents_coexist(rag):
+    rag.ingest_document(1, "hash-a", "notes.pdf", [(1, "first version")])
+    rag.ingest_document(1, "hash-b", "notes.pdf", [(1, "another file")])
+    assert len(_chunks(rag)) == 2
+
+
+def test_reupload_replaces_previous_chunks(rag):
+    rag.ingest_document(1, "hash-a", "notes.pdf", [(1, "one"), (2, "two"), (3, "three")])
+    rag.ingest_document(1, "hash-a", "notes.pdf", [(1, "one two three")])
+    assert len(_chunks(rag)) == 1
+
+
+def test_failed_ingest_keeps_previous_version(rag):
+    rag.ingest_document(1, "hash-a", "notes.pdf", [(1, "one"), (2, "two"), (3, "three")])
+    before = _chunks(rag)
+
+    def pages():
+        yield 1, "one"
+        yield 2, "two"
+        yield 3, "three"
+        raise OSError("OCR failed")
+
+    with pytest.raises(OSError):
+        rag.ingest_document(1, "hash-a", "notes.pdf", pages())
+    assert _chunks(rag) == before
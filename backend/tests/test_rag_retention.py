@@ -0,0 +1,57 @@
+"""
+Tests for the RAG retention policy
+"""
+
+from datetime import datetime, timedelta
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.services.rag_service import RAGService
+
+NOW = datetime(2025, 11, 20, 12, 0)
+CUTOFF = NOW - timedelta(days=14)
+OLD = (NOW - timedelta(days=30)).isoformat()
+RECENT = (NOW - timedelta(days=2)).isoformat()
+
+
+@pytest.mark.parametrize("doc_type, metadata, expired", [
+    # Open tasks are kept however overdue
+    ("task", {"status": "pending", "deadline": OLD, "timestamp": OLD}, False),
+    ("task", {"status": "in_progress", "deadline": OLD}, False),
+    ("task", {"deadline": OLD}, False),
+    # Finished tasks expire once written or due before the cutoff
+    ("task", {"status": "completed", "deadline": RECENT, "timestamp": OLD}, True),
+    ("task", {"status": "cancelled", "deadline": OLD, "timestamp": RECENT}, True),
+    ("task", {"status": "completed", "deadline": RECENT, "timestamp": RECENT}, False),
+    ("task", {"status": "completed", "deadline": "2025-10-01T23:59:00+03:00"}, True),
+    # Plans by plan date, everything else by write time
+    ("plan", {"date": "2025-10-01", "timestamp": RECENT}, True),
+    ("plan", {"date": "2025-11-19", "timestamp": OLD}, False),
+    ("document", {"timestamp": OLD}, True),
+    ("document", {"timestamp": RECENT}, False),
+    ("document", {"timestamp": "not a date"}, False),
+])
+def test_retention_policy(doc_type, metadata, expired):
+    assert RAGService._is_expired(doc_type, metadata, CUTOFF) is expired
+
+
+def test_apply_retention_deletes_only_expired_vectors(rag):
+    tasks = [
+        {"id": 1, "user_id": 1, "title": "Overdue essay", "deadline": "2025-01-10T23:59:00", "status": "pending"},
+        {"id": 2, "user_id": 1, "title": "Old quiz", "deadline": "2025-01-10T23:59:00", "status": "completed"},
+        {"id": 3, "user_id": 2, "title": "Upcoming lab", "deadline": "2099-01-10T23:59:00", "status": "completed"},
+    ]
+    rag.add_tasks_to_context_batch(tasks)
+    rag.add_plan_to_context(1, {"id": 1, "date": "2025-01-01", "schedule_summary": "study"})
+    rag.add_plan_to_context(1, {"id": 2, "date": "2099-01-01", "schedule_summary": "study"})
+
+    # Everything was written now; judge it a month later
+    report = rag.apply_retention(
+        {"task": 14, "plan": 30, "document": 0},
+        now=datetime.utcnow() + timedelta(days=31)
+    )
+
+    assert report["deleted"] == {"task": 2, "plan": 1}
+    assert (report["vectors_before"], report["vectors_after"]) == (5, 2)
+    assert sorted(record["id"] for record in rag.store.scan()) == ["plan_2", "task_1"]
@@ -0,0 +1,98 @@
+"""
+Tests for RAGService batching, sync and the shared instance
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+import pytest
+
+
+def _tasks(count, user_id=1):
+    return [
+        {"id": i, "user_id": user_id, "title": f"Essay {i}", "deadline": "2025-12-01T23:59:00", "course": "History 110"}
+        for i in range(count)
+    ]
+
+
+def test_batch_add_upserts_once_per_batch(rag, monkeypatch):
+    upserts, encodes = [], []
+    upsert, encode = rag.store.upsert, rag.embedding_model.encode
+    monkeypatch.setattr(rag.store, "upsert", lambda **kwargs: upserts.append(len(kwargs["ids"])) or upsert(**kwargs))
+    monkeypatch.setattr(rag.embedding_model, "encode", lambda texts, batch_size=32: encodes.append(len(texts)) or encode(texts))
+
+    doc_ids = rag.add_tasks_to_context_batch(_tasks(5), batch_size=2)
+
+    assert doc_ids == [f"task_{i}" for i in range(5)]
+    assert upserts == [2, 2, 1]
+    assert encodes == [2, 2, 1]
+    assert rag.count() == 5
+
+
+def test_batch_add_replaces_existing_ids(rag):
+    rag.add_tasks_to_context_batch(_tasks(3))
+    rag.add_tasks_to_context_batch(_tasks(3))
+    assert rag.count() == 3
+
+
+def test_async_batch_add_matches_sync(rag):
+    doc_ids = asyncio.run(rag.aadd_documents_batch([
+        {"user_id": 1, "text": f"note {i}", "doc_id": f"note_{i}", "metadata": {"type": "note"}}
+        for i in range(3)
+    ]))
+    assert doc_ids == ["note_0", "note_1", "note_2"]
+    assert rag.count() == 3
+
+
+def test_sync_reembeds_only_changed_tasks(rag, monkeypatch):
+    tasks = _tasks(4)
+    assert rag.sync_tasks(tasks) == 4
+
+    upserted = []
+    upsert = rag.store.upsert
+    monkeypatch.setattr(rag.store, "upsert", lambda **kwargs: upserted.extend(kwargs["ids"]) or upsert(**kwargs))
+    assert rag.sync_tasks(tasks) == 0
+    assert upserted == []
+
+    tasks[2] = {**tasks[2], "title": "Essay 2 (revised)"}
+    tasks[3] = {**tasks[3], "status": "in_progress"}
+    assert rag.sync_tasks(tasks) == 2
+    assert sorted(upserted) == ["task_2", "task_3"]
+    assert rag.get_task_hashes([2], 1)[2] == rag._task_document(tasks[2])["metadata"]["content_hash"]
+
+
+def test_sync_looks_hashes_up_per_user(rag, monkeypatch):
+    rag.sync_tasks(_tasks(2, user_id=1))
+    lookups = []
+    get = rag.store.get
+    monkeypatch.setattr(rag.store, "get", lambda ids, user_id=None: lookups.append(user_id) or get(ids, user_id))
+
+    tasks = _tasks(2, user_id=1) + [{**task, "id": task["id"] + 10} for task in _tasks(2, user_id=2)]
+    assert rag.sync_tasks(tasks) == 2
+    assert sorted(lookups) == [1, 2]
+
+
+def test_shared_service_is_created_once_under_concurrency(monkeypatch):
+    rag_service = pytest.importorskip("app.services.rag_service")
+    created = []
+
+    class SlowService:
+        def __init__(self, persist_directory):
+            time.sleep(0.05)  # model load
+            created.append(self)
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(rag_service, "RAGService", SlowService)
+    monkeypatch.setattr(rag_service, "_rag_service", None)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        services = list(pool.map(lambda _: rag_service.get_rag_service(), range(16)))
+
+    assert len(created) == 1
+    assert all(service is created[0] for service in services)
+
+    rag_service.shutdown_rag_service()
+    assert created[0].closed
+    assert rag_service.get_rag_service() is not created[0]
@@ -0,0 +1,63 @@
+"""
+Tests for the incremental RAG task sync job
+"""
+
+from datetime import datetime, timedelta, timezone
+import asyncio
+import pytest
+
+pytest.importorskip("apscheduler")
+pytest.importorskip("sqlalchemy")
+
+from app.services import rag_service, scheduler
+
+
+class FakeRAG:
+    batch_size = 64
+
+    def __init__(self):
+        self.synced = []
+
+    def sync_tasks(self, tasks, retention_days=0):
+        self.synced += tasks
+        return len(tasks)
+
+    def delete_tasks_from_context(self, task_ids, user_id=None):
+        return len(task_ids)
+
+    def get_indexed_task_ids(self):
+        return []
+
+
+@pytest.fixture
+def sync_env(tmp_path, monkeypatch):
+    rag = FakeRAG()
+    monkeypatch.setattr(rag_service, "get_rag_service", lambda: rag)
+    monkeypatch.setattr(scheduler.settings, "RAG_SYNC_STATE_PATH", str(tmp_path / "state.json"))
+    monkeypatch.setattr(scheduler.settings, "RAG_SYNC_OVERLAP_SECONDS", 300)
+    return rag
+
+
+def test_watermark_comes_from_the_database_clock_minus_overlap(sync_env, monkeypatch):
+    db_now = datetime(2025, 11, 20, 9, 0, tzinfo=timezone.utc)
+    seen = []
+    monkeypatch.setattr(scheduler, "get_database_now", lambda: db_now)
+    monkeypatch.setattr(scheduler, "get_changed_tasks", lambda since: seen.append(since) or ([], {}))
+    monkeypatch.setattr(scheduler, "get_existing_task_ids", lambda: [])
+
+    asyncio.run(scheduler.sync_tasks_to_rag())
+    asyncio.run(scheduler.sync_tasks_to_rag())
+
+    assert scheduler.load_rag_sync_watermark() == db_now - timedelta(minutes=5)
+    assert seen == [None, db_now - timedelta(minutes=5)]
+
+
+def test_database_now_is_utc_aware(monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    monkeypatch.setattr(scheduler, "SessionLocal", sessionmaker(bind=create_engine("sqlite://")))
+    now = scheduler.get_database_now()
+
+    assert now.tzinfo is not None
+    assert abs(now - datetime.now(timezone.utc)) < timedelta(minutes=1)
@@ -0,0 +1,80 @@
+"""
+Tests for per-provider token-bucket rate limiting
+"""
+
+import asyncio
+import time
+import pytest
+
+from app.services.rate_limiter import ProviderRateLimiter, RateLimitExceeded
+
+
+def test_requests_are_paced_at_the_quota():
+    # 1200/min = 20/s with a burst of one request
+    limiter = ProviderRateLimiter(requests_per_minute=1200, tokens_per_minute=0, burst_seconds=0.05)
+
+    async def main():
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire(1) for _ in range(5)))
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(main())
+    assert elapsed >= 0.18
+    assert limiter.stats()["admitted"] == 5
+
+
+def test_waiters_are_served_in_arrival_order():
+    limiter = ProviderRateLimiter(requests_per_minute=1200, tokens_per_minute=0, burst_seconds=0.05)
+    order = []
+
+    async def caller(i):
+        await limiter.acquire(1)
+        order.append(i)
+
+    async def main():
+        tasks = []
+        for i in range(5):
+            tasks.append(asyncio.create_task(caller(i)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == [0, 1, 2, 3, 4]
+
+
+def test_token_quota_limits_large_requests():
+    # 6000 tokens/min = 100/s; the second 100-token request waits about a second
+    limiter = ProviderRateLimiter(requests_per_minute=0, tokens_per_minute=6000, burst_seconds=1, max_wait_seconds=0.5)
+
+    async def main():
+        await limiter.acquire(100)
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire(100)
+
+    asyncio.run(main())
+    assert limiter.stats()["rejected"] == 1
+
+
+def test_settle_returns_unused_tokens():
+    limiter = ProviderRateLimiter(requests_per_minute=0, tokens_per_minute=6000, burst_seconds=1, max_wait_seconds=0.1)
+
+    async def main():
+        await limiter.acquire(100)
+        limiter.settle(reserved=100, used=10)
+        await limiter.acquire(80)
+
+    asyncio.run(main())
+    assert limiter.stats()["admitted"] == 2
+
+
+def test_stats_report_queue_and_waits():
+    limiter = ProviderRateLimiter(requests_per_minute=1200, tokens_per_minute=0, burst_seconds=0.05)
+
+    async def main():
+        await asyncio.gather(*(limiter.acquire(1) for _ in range(3)))
+
+    asyncio.run(main())
+    stats = limiter.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] >= 2
+    assert stats["wait_max_seconds"] >= 0.09
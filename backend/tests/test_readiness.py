@@ -0,0 +1,60 @@
+"""
+Tests for the /ready probe around the RAG warm-up
+"""
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+from fastapi.testclient import TestClient
+
+from app.services import rag_service
+
+
+class FakeRAG:
+    def __init__(self, error=None):
+        self.error = error
+
+    def warm_up(self):
+        if self.error is not None:
+            raise self.error
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(rag_service.settings, "RAG_WARM_START", True)
+    monkeypatch.setattr(rag_service, "_readiness", {"ready": False, "error": None, "metrics": {}})
+    # No context manager: startup (database, scheduler, real warm-up) is not run
+    return TestClient(app)
+
+
+def test_ready_after_warm_up(client, monkeypatch):
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming_up"
+
+    monkeypatch.setattr(rag_service, "get_rag_service", lambda: FakeRAG())
+    rag_service.warm_up_rag_service()
+
+    response = client.get("/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert set(body["metrics"]) == {"load_seconds", "warm_up_seconds", "total_seconds"}
+
+
+def test_failed_warm_up_stays_unready(client, monkeypatch):
+    monkeypatch.setattr(rag_service, "get_rag_service", lambda: FakeRAG(RuntimeError("model download failed")))
+    rag_service.warm_up_rag_service()
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["error"] == "model download failed"
+
+
+def test_ready_without_warm_start(client, monkeypatch):
+    monkeypatch.setattr(rag_service.settings, "RAG_WARM_START", False)
+    assert client.get("/ready").json() == {"status": "ready", "rag": "lazy"}
@@ -0,0 +1,124 @@
+"""
+Tests that task writes drop the cached recent context
+"""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import asyncio
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import get_db
+from app import models  # noqa: F401 - configures the User relationships
+from app.models.task import Task, TaskStatus
+from app.utils import context
+from app.utils.auth import get_current_user
+
+
+class FakeRAG:
+    def __init__(self):
+        self.added = []
+
+    async def aadd_task_to_context(self, user_id, task):
+        self.added.append((user_id, task["id"]))
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Count database reads behind get_recent_context"""
+    calls = []
+
+    def load(user_id, limit):
+        calls.append(user_id)
+        return [{"text": f"read {len(calls)}", "metadata": {}}]
+
+    monkeypatch.setattr(context, "_load_recent_context", load)
+    monkeypatch.setattr(context, "_recent_context_cache", context.QueryResultCache(max_entries=10, ttl_seconds=300))
+    return calls
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Task.__table__.create(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def test_create_task_invalidates_recent_context(loads, session_factory, monkeypatch):
+    from app.routers import tasks
+
+    rag = FakeRAG()
+    monkeypatch.setattr(tasks, "get_rag_service", lambda: rag)
+
+    async def no_workflow(name, payload):
+        return True
+
+    monkeypatch.setattr(tasks, "trigger_n8n_workflow", no_workflow)
+
+    app = FastAPI()
+    app.include_router(tasks.router, prefix="/api/tasks")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, email="student@example.com")
+    app.dependency_overrides[get_db] = lambda: session_factory()
+
+    asyncio.run(context.get_recent_context(1))
+    asyncio.run(context.get_recent_context(2))
+    assert asyncio.run(context.get_recent_context(1))[0]["text"] == "read 1"
+
+    deadline = (datetime.now(timezone.utc) + timedelta(days=2)).isoformat()
+    response = TestClient(app).post("/api/tasks/", json={"title": "Essay", "deadline": deadline})
+    assert response.status_code == 200
+    assert rag.added == [(1, response.json()["id"])]
+
+    # The writer's entry is re-read, other users keep theirs
+    assert asyncio.run(context.get_recent_context(1))[0]["text"] == "read 3"
+    asyncio.run(context.get_recent_context(2))
+    assert loads == [1, 2, 1]
+
+
+class FakeToolServer:
+    """Collects the functions registered as MCP tools"""
+
+    def __init__(self):
+        self.tools = {}
+
+    def tool(self):
+        def register(fn):
+            self.tools[fn.__name__] = fn
+            return fn
+        return register
+
+
+def test_mcp_update_task_status_invalidates_recent_context(loads, session_factory):
+    pytest.importorskip("mcp")
+    from app.mcp.server import WizAIMCPServer
+
+    db = session_factory()
+    db.add(Task(user_id=7, title="Lab report", deadline=datetime.now(timezone.utc)))
+    db.commit()
+    task_id = db.query(Task).first().id
+
+    server = WizAIMCPServer.__new__(WizAIMCPServer)
+    server.server = FakeToolServer()
+    server.db = db
+    server.register_tools()
+
+    asyncio.run(context.get_recent_context(7))
+    result = asyncio.run(server.server.tools["update_task_status"](task_id, TaskStatus.COMPLETED))
+    assert result["success"] is True
+    asyncio.run(context.get_recent_context(7))
+    assert loads == [7, 7]
+
+    # An unknown task writes nothing, so the cache stays warm
+    assert asyncio.run(server.server.tools["update_task_status"](999, TaskStatus.COMPLETED))["success"] is False
+    asyncio.run(context.get_recent_context(7))
+    assert loads == [7, 7]
+    db.close()
@@ -0,0 +1,86 @@
+"""
+Tests for single-flight coalescing of identical in-flight calls
+"""
+
+import asyncio
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("prompt", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["answer"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 5, "executions": 1, "coalesced": 4, "inflight": 0}
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("prompt", fail) for _ in range(3)), return_exceptions=True)
+        retry = await flight.do("prompt", lambda: asyncio.sleep(0, result="ok"))
+        return results, retry
+
+    results, retry = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert retry == "ok"
+    assert flight.stats()["executions"] == 2
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("prompt", fetch))
+        second = asyncio.ensure_future(flight.do("prompt", fetch))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "answer"
+
+
+def test_call_is_cancelled_when_every_caller_gives_up():
+    flight = SingleFlight()
+    cancelled = []
+
+    async def fetch():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        caller = asyncio.ensure_future(flight.do("prompt", fetch))
+        await asyncio.sleep(0.005)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert cancelled == [True]
+    assert flight.stats()["inflight"] == 0
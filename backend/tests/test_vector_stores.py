@@ -0,0 +1,231 @@
+"""
+Conformance tests for the vector store backends
+Every backend must return the same results for the same operations.
+pgvector runs only when WIZAI_TEST_PGVECTOR_URL points at a database
+with the vector extension available.
+"""
+
+import os
+import uuid
+import pytest
+
+from app.services.vector_store import ChromaVectorStore, NumpyVectorStore, PgVectorStore
+
+DIMENSION = 4
+
+
+def _chroma(tmp_path):
+    pytest.importorskip("chromadb")
+    return ChromaVectorStore(str(tmp_path / "chroma"))
+
+
+def _chroma_sharded(tmp_path):
+    pytest.importorskip("chromadb")
+    return ChromaVectorStore(str(tmp_path / "chroma"), sharding="bucket", shard_buckets=4)
+
+
+def _numpy(tmp_path):
+    pytest.importorskip("numpy")
+    return NumpyVectorStore(str(tmp_path / "numpy"))
+
+
+def _pgvector(tmp_path):
+    url = os.getenv("WIZAI_TEST_PGVECTOR_URL")
+    if not url:
+        pytest.skip("WIZAI_TEST_PGVECTOR_URL not set")
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+    engine = sqlalchemy.create_engine(url)
+    return PgVectorStore(engine, DIMENSION, table=f"rag_vectors_test_{uuid.uuid4().hex[:8]}")
+
+
+@pytest.fixture(params=[_chroma, _chroma_sharded, _numpy, _pgvector], ids=["chroma", "chroma-bucket", "numpy", "pgvector"])
+def make_store(request, tmp_path):
+    stores = []
+
+    def factory():
+        store = request.param(tmp_path)
+        stores.append(store)
+        return store
+
+    yield factory
+
+    for store in stores:
+        if isinstance(store, PgVectorStore):
+            from sqlalchemy import text
+            with store.engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {store.table}"))
+        store.close()
+
+
+def _seed(store):
+    store.upsert(
+        ids=["task_1", "task_2", "plan_1", "task_3"],
+        embeddings=[
+            [1.0, 0.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0, 0.0],
+            [0.9, 0.1, 0.0, 0.0],
+            [1.0, 0.0, 0.0, 0.0],
+        ],
+        documents=["Math homework", "CS project", "Monday plan", "Other user's task"],
+        metadatas=[
+            {"user_id": 1, "type": "task", "task_id": 1},
+            {"user_id": 1, "type": "task", "task_id": 2},
+            {"user_id": 1, "type": "plan", "plan_id": 1},
+            {"user_id": 2, "type": "task", "task_id": 3},
+        ]
+    )
+
+
+def test_query_orders_by_squared_l2(make_store):
+    store = make_store()
+    _seed(store)
+
+    results = store.query(1, [[1.0, 0.0, 0.0, 0.0]], top_k=3)[0]
+
+    assert [r["id"] for r in results] == ["task_1", "plan_1", "task_2"]
+    assert results[0]["text"] == "Math homework"
+    assert results[0]["metadata"]["task_id"] == 1
+    assert results[0]["distance"] == pytest.approx(0.0, abs=1e-5)
+    assert results[1]["distance"] == pytest.approx(0.02, abs=1e-4)
+
+
+def test_query_is_scoped_to_user_and_filter(make_store):
+    store = make_store()
+    _seed(store)
+
+    assert [r["id"] for r in store.query(2, [[1.0, 0.0, 0.0, 0.0]], top_k=5)[0]] == ["task_3"]
+
+    tasks_only = store.query(1, [[1.0, 0.0, 0.0, 0.0]], top_k=5, where={"type": "task"})[0]
+    assert [r["id"] for r in tasks_only] == ["task_1", "task_2"]
+
+    assert store.query(3, [[1.0, 0.0, 0.0, 0.0]], top_k=5) == [[]]
+
+
+def test_query_many_embeddings(make_store):
+    store = make_store()
+    _seed(store)
+
+    results = store.query(1, [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0]], top_k=1)
+
+    assert [[r["id"] for r in row] for row in results] == [["task_1"], ["task_2"]]
+
+
+def test_upsert_replaces_existing_id(make_store):
+    store = make_store()
+    _seed(store)
+
+    store.upsert(
+        ids=["task_1"],
+        embeddings=[[0.0, 0.0, 1.0, 0.0]],
+        documents=["Math homework (updated)"],
+        metadatas=[{"user_id": 1, "type": "task", "task_id": 1, "status": "completed"}]
+    )
+
+    assert store.count() == 4
+    [record] = store.get(["task_1"], 1)
+    assert record["text"] == "Math homework (updated)"
+    assert record["metadata"]["status"] == "completed"
+    assert store.query(1, [[0.0, 0.0, 1.0, 0.0]], top_k=1)[0][0]["id"] == "task_1"
+
+
+def test_get_with_and_without_user(make_store):
+    store = make_store()
+    _seed(store)
+
+    assert {r["id"] for r in store.get(["task_1", "task_3", "missing"])} == {"task_1", "task_3"}
+    assert [r["id"] for r in store.get(["task_1", "task_3"], 2)] == ["task_3"]
+
+
+def test_delete_returns_removed_records(make_store):
+    store = make_store()
+    _seed(store)
+
+    deleted = store.delete(["task_2", "task_3", "missing"])
+
+    assert {r["id"] for r in deleted} == {"task_2", "task_3"}
+    assert {r["metadata"]["user_id"] for r in deleted} == {1, 2}
+    assert store.count() == 2
+    assert store.delete(["task_1"], user_id=2) == []
+
+
+def test_delete_where(make_store):
+    store = make_store()
+    _seed(store)
+
+    assert store.delete_where(1, {"type": "task"}) == 2
+    assert {r["id"] for r in store.scan()} == {"plan_1", "task_3"}
+
+
+def test_scan_with_filter(make_store):
+    store = make_store()
+    _seed(store)
+
+    assert {r["id"] for r in store.scan(where={"type": "task"})} == {"task_1", "task_2", "task_3"}
+    assert store.count() == 4
+
+
+def test_data_survives_reopen(make_store, tmp_path):
+    store = make_store()
+    if isinstance(store, PgVectorStore):
+        pytest.skip("pgvector persistence is the database's job")
+    _seed(store)
+    store.close()
+
+    reopened = make_store()
+
+    assert reopened.count() == 4
+    assert reopened.query(1, [[0.0, 1.0, 0.0, 0.0]], top_k=1)[0][0]["id"] == "task_2"
+
+
+def _names(store):
+    return sorted(getattr(entry, "name", entry) for entry in store.client.list_collections())
+
+
+@pytest.mark.parametrize("sharding,expected", [
+    ("user", {1: "user_context_u1", 2: "user_context_u2"}),
+    ("bucket", None),
+])
+def test_sharded_upsert_routes_by_user(tmp_path, sharding, expected):
+    pytest.importorskip("chromadb")
+    store = ChromaVectorStore(str(tmp_path / "chroma"), sharding=sharding, shard_buckets=4)
+    _seed(store)
+
+    names = {user_id: store._shard_name(user_id) for user_id in (1, 2)}
+    if expected:
+        assert names == expected
+    counts = {}
+    for user_id, rows in ((1, 3), (2, 1)):
+        counts[names[user_id]] = counts.get(names[user_id], 0) + rows
+    for name, rows in counts.items():
+        assert store._get_collection(name).count() == rows
+    # Nothing lands in the shared collection
+    assert store.collection.count() == 0
+    assert [hit["id"] for hit in store.query(2, [[1.0, 0.0, 0.0, 0.0]], top_k=5)[0]] == ["task_3"]
+    store.close()
+
+
+def test_reindex_round_trip_keeps_results(tmp_path):
+    pytest.importorskip("chromadb")
+    path = str(tmp_path / "chroma")
+    query = [[1.0, 0.0, 0.0, 0.0]]
+
+    store = ChromaVectorStore(path)
+    _seed(store)
+    before = {user_id: store.query(user_id, query, top_k=5)[0] for user_id in (1, 2)}
+    store.close()
+
+    store = ChromaVectorStore(path, sharding="user")
+    assert store.reindex(batch_size=2) == {"scanned": 4, "moved": 4, "collections_dropped": 0}
+    assert store.collection.count() == 0
+    assert {"user_context_u1", "user_context_u2"} <= set(_names(store))
+    assert {user_id: store.query(user_id, query, top_k=5)[0] for user_id in (1, 2)} == before
+    # A second pass finds everything already in place
+    assert store.reindex()["moved"] == 0
+    store.close()
+
+    store = ChromaVectorStore(path)
+    stats = store.reindex()
+    assert (stats["moved"], stats["collections_dropped"]) == (4, 2)
+    assert store.collection.count() == 4
+    assert {user_id: store.query(user_id, query, top_k=5)[0] for user_id in (1, 2)} == before
+    store.close()